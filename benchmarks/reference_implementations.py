@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Implementaciones de referencia
+
+    Algoritmos originales del sistema, término a término y sin ninguna optimización. Las pruebas de rendimiento (run_benchmarks)
+    y las pruebas de equivalencia (tests) comparan con ellos los resultados de las versiones optimizadas:
+        -reference_longest_common_substring: longest common substring mediante la tabla de sufijos completa.
+        -reference_compare_sentences: semejanza (método average) entre un concepto y una sentencia.
+        -reference_best_kw_threshold_values: búsqueda de los kw_threshold_value recorriendo el corpus para cada valor candidato.
+'''
+
+import numpy as np
+
+
+#Longest common substring mediante la tabla de sufijos completa.
+def reference_longest_common_substring(X, Y):
+    m, n=len(X), len(Y)
+    LCSuff = [[0 for k in range(n+1)] for l in range(m+1)]
+
+    result = 0
+    for i in range(m + 1):
+        for j in range(n + 1):
+            if (i == 0 or j == 0):
+                LCSuff[i][j] = 0
+            elif (X[i-1] == Y[j-1]):
+                LCSuff[i][j] = LCSuff[i-1][j-1] + 1
+                result = max(result, LCSuff[i][j])
+            else:
+                LCSuff[i][j] = 0
+
+    return result
+
+#Semejanza (método average) entre un concepto y una sentencia, término a término.
+def reference_compare_sentences(concept_vect, concept_others, sent_vect, sent_others):
+    num_terms=0
+    for x in concept_others:
+        max_value=0
+        for y in sent_others:
+            curr=reference_longest_common_substring(x, y)/((len(x)+len(y))/2)
+            if curr > max_value:
+                max_value=curr
+
+        num_terms+=max_value
+
+    average_vects=0
+    for x in concept_vect:
+        best=0
+        for y in sent_vect:
+            curr=float(np.dot(x, y)/(np.linalg.norm(x)*np.linalg.norm(y)))
+            if curr > best:
+                best=curr
+
+        average_vects+=best
+
+    return (num_terms + average_vects)/(len(concept_vect)+len(concept_others))
+
+#Búsqueda de los kw_threshold_value probando los 101 valores enteros entre 0 y 100 sobre todo el corpus.
+def reference_best_kw_threshold_values(results, expected_results):
+    thresholds=dict()
+    for crit in range(len(expected_results[0])):
+        best_value, best_acc=0, 0
+
+        for value in range(101):
+            acc=0
+            for result, expected in zip(results, expected_results):
+                percentage=result[crit][1]*100
+
+                if percentage>=value and expected[crit]=='OK':
+                    acc+=1
+                elif percentage < value and expected[crit]=='KO':
+                    acc+=1
+
+            if acc >= best_acc:
+                best_value=value
+                best_acc=acc
+
+        thresholds[crit]=best_value/100
+
+    return thresholds
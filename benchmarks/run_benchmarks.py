@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Pruebas de rendimiento del sistema
+
+    Mide el tiempo de cada etapa del sistema sobre datos sintéticos (ver synthetic_data), sin conexión y sin los modelos reales:
+        -Preprocesamiento: Text_Preprocessing_Module.process_sentence (y su versión por lotes), según la longitud del documento.
+        -Comparación: Text_Analyzer.compare_sentences frente al motor de semejanza vectorizado, según la longitud del documento.
+        -Criterios: Criteria_Checker.check_criterion (con y sin criterios compilados y orden adaptativo), según el número de subcriterios.
+        -Aprendizaje: Learning_Module.get_best_kw_threshold_values, según el tamaño del corpus.
+        -Sistema: System.multiple_executions, autoconfigure y retune, según el tamaño del corpus.
+
+    Además de los tiempos, cada etapa compara los resultados de las versiones optimizadas con los de la implementación de referencia
+    (los algoritmos originales del sistema, ver reference_implementations) e indica cuánto difieren (número de discrepancias o diferencia
+    máxima).
+
+    De forma predeterminada se utiliza un lematizador sustituto. Si se indica un modelo de Spacy (--spacy-model), se utiliza dicho modelo.
+
+    Uso:
+        python benchmarks/run_benchmarks.py [--lengths 10 50 200] [--subcriteria 2 5 10] [--sizes 100 1000 10000]
+                                            [--repeat 3] [--seed 0] [--spacy-model es_core_news_sm] [--output informe.json]
+'''
+
+import os
+import sys
+
+BENCHMARKS_DIR=os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from synthetic_data import Synthetic_Corpus_Generator, Stub_Lemmatizer
+from reference_implementations import reference_compare_sentences, reference_longest_common_substring, reference_best_kw_threshold_values
+from criteria_checker import Criteria_Checker
+from learning_module import Learning_Module
+from oov_similarity import longest_common_substring_length
+from utilities import configuration, split_sentences
+import argparse
+import json
+import random
+import tempfile
+import time
+import numpy as np
+
+
+class Benchmark_Suite():
+
+    def __init__(self,
+                 workdir='',        #Directorio en el que se generan los ficheros (modelo, stopwords, corpus, etc).
+                 seed=0,            #Semilla de los datos sintéticos.
+                 spacy_model='',    #Modelo de Spacy. Si no se indica, se utiliza el lematizador sustituto.
+                 repeat=3           #Número de repeticiones de cada medida. Se conserva la más rápida.
+                 ):
+
+        self._workdir=workdir
+        self._seed=seed
+        self._spacy_model=spacy_model
+        self._repeat=repeat
+
+        self._generator=Synthetic_Corpus_Generator(seed=seed)
+        self._model_file=self._generator.write_embedding_model(os.path.join(workdir, 'model'))
+        self._stopwords_file=os.path.join(workdir, 'stopwords.txt')
+        self._generator.write_stopwords(self._stopwords_file)
+
+        self._cc=Criteria_Checker(**self._get_model_arguments())
+        self._ta=self._cc.text_analyzer
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Ejecuta todas las etapas.
+
+        Input:
+            -lengths: List. Número de sentencias de los documentos (etapas de preprocesamiento y comparación).
+            -subcriteria: List. Número de subcriterios por criterio (etapa de criterios).
+            -sizes: List. Número de documentos del corpus (etapas de aprendizaje y sistema).
+
+        Output:
+            -Dict. Informe con los resultados de cada etapa.
+    '''
+    def run(self, lengths, subcriteria, sizes):
+        return {'configuration': {'seed': self._seed,
+                                  'lemmatizer': self._spacy_model if self._spacy_model!='' else 'stub',
+                                  'repeat': self._repeat},
+                'preprocessing': [self.benchmark_preprocessing(length) for length in lengths],
+                'comparison': [self.benchmark_comparison(length) for length in lengths],
+                'criteria': [self.benchmark_criteria(num_subcriteria) for num_subcriteria in subcriteria],
+                'learning': [self.benchmark_learning(size) for size in sizes],
+                'system': self.benchmark_system(sizes)}
+
+    #Preprocesamiento de las sentencias de un documento, sentencia a sentencia y por lotes.
+    def benchmark_preprocessing(self, length):
+        text=self._get_text(length)
+        sentences=list(split_sentences(text))
+        module=self._ta._text_pre_processing_module
+
+        result={'sentences': len(sentences)}
+        result['process_sentence_s'], single= self._time(lambda: [module.process_sentence(x) for x in sentences], self._clear_caches)
+        result['process_sentences_s'], batch= self._time(lambda: module.process_sentences(sentences), self._clear_caches)
+        result['cached_s'], _= self._time(lambda: [module.process_sentence(x) for x in sentences])
+        result['mismatches']=sum(x != y for x, y in zip(single, batch))
+
+        return result
+
+    #Semejanza de varios conceptos con cada sentencia de un documento: sentencia a sentencia, referencia y motor vectorizado.
+    def benchmark_comparison(self, length):
+        document=self._cc.pre_process_text(self._get_text(length))
+        sentences=list(document)
+        concepts=[self._ta.transform(x) for subcriteria in self._generator.generate_criteria().values() for x in subcriteria]
+        concepts=[concept for concept in concepts if concept[0] is not False]
+
+        def compare():
+            return [[self._ta.compare_sentences(cv, co, sv, so) for sv, so in sentences] for cv, co in concepts]
+
+        def reference():
+            return [[reference_compare_sentences(cv, co, sv, so) for sv, so in sentences] for cv, co in concepts]
+
+        def vectorized():
+            return [self._ta.compare_concept_with_document(cv, co, document) for cv, co in concepts]
+
+        result={'sentences': len(sentences), 'concepts': len(concepts)}
+        result['compare_sentences_s'], compared= self._time(compare, self._clear_caches)
+        result['reference_s'], expected= self._time(reference)
+        result['vectorized_s'], scores= self._time(vectorized, self._clear_caches)
+        result['max_abs_diff']=max([0.0] + [float(np.max(np.abs(np.array(x, dtype=np.float64)-np.array(y, dtype=np.float64))))
+                                            for x, y in zip(expected, compared) if len(x)>0]
+                                          + [float(np.max(np.abs(np.array(x, dtype=np.float64)-y)))
+                                            for x, y in zip(expected, scores) if len(x)>0])
+
+        #Términos fuera del vocabulario: longest common substring frente a la tabla de sufijos original.
+        terms=[term for _, others in sentences for term in others][:200]
+        pairs=[(x, y) for x in terms[:20] for y in terms]
+        result['lcs_pairs']=len(pairs)
+        result['lcs_s'], lengths= self._time(lambda: [longest_common_substring_length(x, y) for x, y in pairs])
+        result['reference_lcs_s'], expected_lengths= self._time(lambda: [reference_longest_common_substring(x, y) for x, y in pairs])
+        result['lcs_mismatches']=sum(x != y for x, y in zip(lengths, expected_lengths))
+
+        return result
+
+    #Evaluación de los criterios en un corpus: sin compilar, compilados, con filas top-k y con orden adaptativo.
+    def benchmark_criteria(self, num_subcriteria, num_documents=20, length=20):
+        criteria=self._generator.generate_criteria(subcriteria_per_criterion=num_subcriteria)
+        corpus=self._generator.generate_corpus(num_documents=num_documents, num_sentences=length)
+        documents=self._cc.pre_process_texts([text for text, _ in corpus.values()])
+
+        def check(compiled_criteria=None, **flags):
+            results=list()
+            for document in documents:
+                document.concept_results.clear()
+                self._cc.subcriteria_statistics.register_document()
+                results.append([self._cc.check_criterion(pos, subcriteria, document, compiled_criteria=compiled_criteria, **flags)
+                                for pos, subcriteria in enumerate(criteria.values())])
+            return results
+
+        result={'subcriteria': num_subcriteria, 'documents': num_documents}
+        result['compile_s'], compiled= self._time(lambda: self._cc.compile_criteria(criteria))
+
+        top_k=configuration['concept_rows_top_k']
+        configuration['concept_rows_top_k']=5
+        compiled_top_k=self._cc.compile_criteria(criteria)
+        configuration['concept_rows_top_k']=top_k
+
+        full={'autoconfigure_flag': True, 'get_found': True}
+        result['uncompiled_s'], reference= self._time(lambda: check(**full), self._clear_caches)
+        result['compiled_s'], optimized= self._time(lambda: check(compiled, **full))
+        _, optimized_top_k= self._time(lambda: check(compiled_top_k, **full))
+        result['mismatches']=self._count_mismatches(reference, optimized)
+        result['top_k_mismatches']=self._count_mismatches(reference, optimized_top_k)
+
+        #Orden de los subcriterios: tan solo se compara el resultado OK/KO, que es lo que devuelve el sistema en este modo.
+        for name, adaptive in (('file_order', False), ('adaptive_order', True)):
+            self._cc.subcriteria_statistics.reset_counters()
+            result[name+'_s'], decisions= self._time(lambda: check(compiled, adaptive_order=adaptive))
+            result[name+'_subcriteria_per_document']=self._cc.subcriteria_statistics.get_counters()['subcriteria_per_document']
+
+            if adaptive:
+                result['adaptive_mismatches']=self._count_mismatches([[x[0] for x in doc] for doc in baseline],
+                                                                     [[x[0] for x in doc] for doc in decisions])
+            else:
+                baseline=decisions
+
+        return result
+
+    #Búsqueda de los kw_threshold_value: búsqueda ordenada frente a la búsqueda original (101 recorridos del corpus).
+    def benchmark_learning(self, size, num_criteria=5, max_reference_size=20000):
+        rng=random.Random(self._seed)
+        results=[[('OK', rng.randint(0, 6)/6) for _ in range(num_criteria)] for _ in range(size)]
+        expected=[[rng.choice(['OK', 'KO']) for _ in range(num_criteria)] for _ in range(size)]
+        lm=Learning_Module()
+
+        result={'documents': size}
+        result['sorted_sweep_s'], thresholds= self._time(lambda: lm.get_best_kw_threshold_values(results=results, expected_results=expected))
+
+        #La implementación de referencia es cuadrática en la práctica: tan solo se ejecuta en los corpus pequeños.
+        if size <= max_reference_size:
+            result['reference_s'], expected_thresholds= self._time(lambda: reference_best_kw_threshold_values(results, expected), repeat=1)
+            result['mismatches']=sum(thresholds[x] != expected_thresholds[x] for x in expected_thresholds)
+
+        return result
+
+    #Evaluación y autoconfiguración de corpus completos mediante el controlador del sistema.
+    def benchmark_system(self, sizes):
+        #Cualquier error al importar (no solo ImportError: también SyntaxError, OSError de una dependencia nativa, etc) omite
+        #esta etapa sin perder los resultados de las demás.
+        try:
+            from system import System
+        except Exception as exception:
+            return {'skipped': 'No se puede importar System: '+type(exception).__name__+': '+str(exception)}
+
+        criteria=self._generator.generate_criteria()
+        criteria_file=os.path.join(self._workdir, 'criteria.txt')
+        self._generator.write_criteria_file(criteria_file, criteria)
+
+        results=list()
+        for size in sizes:
+            corpus=self._generator.generate_corpus(num_documents=size)
+            corpus_file=os.path.join(self._workdir, 'corpus_'+str(size)+'.csv')
+            evaluations_file=os.path.join(self._workdir, 'evaluations_'+str(size)+'.csv')
+            self._generator.write_corpus_csv(corpus_file, corpus)
+            self._generator.write_evaluations_csv(evaluations_file, self._generator.generate_evaluations(corpus, criteria), criteria)
+
+            system=System(criteria_file=criteria_file, **self._get_model_arguments())
+            adaptive=configuration['adaptive_subcriteria_order']
+
+            result={'documents': size}
+            result['multiple_executions_cold_s'], first= self._time(lambda: system.multiple_executions(csv_file_content=corpus_file), repeat=1)
+            result['multiple_executions_warm_s'], _= self._time(lambda: system.multiple_executions(csv_file_content=corpus_file))
+
+            configuration['adaptive_subcriteria_order']=False
+            _, reference= self._time(lambda: system.multiple_executions(csv_file_content=corpus_file), repeat=1)
+            configuration['adaptive_subcriteria_order']=adaptive
+            result['mismatches']=self._count_mismatches(reference, first)
+
+            result['autoconfigure_s'], _= self._time(lambda: system.autoconfigure(csv_file_contents=corpus_file,
+                                                                                  csv_file_evaluations=evaluations_file), repeat=1)
+            result['retune_s'], _= self._time(lambda: system.retune(csv_file_evaluations=evaluations_file))
+            system.close_workers()
+
+            results.append(result)
+
+        return results
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Parámetros de construcción de los componentes del sistema (modelo sintético y lematizador).
+    def _get_model_arguments(self):
+        return {'pre_trained_model_file': self._model_file,
+                'model_type': self._spacy_model,
+                'stopwords_file': self._stopwords_file,
+                'nlp': None if self._spacy_model!='' else Stub_Lemmatizer()}
+
+    #Devuelve un documento sintético con el número de sentencias indicado.
+    def _get_text(self, length):
+        return list(self._generator.generate_corpus(num_documents=1, num_sentences=length).values())[0][0]
+
+    #Vacía las cachés del preprocesamiento, de modo que cada medida parte del mismo estado.
+    def _clear_caches(self):
+        self._ta._text_pre_processing_module._sentence_cache.clear()
+        self._ta._linguistic_model._lemma_cache.clear()
+        self._ta._oov_similarity_engine._cache.clear()
+
+    #Ejecuta una función varias veces y devuelve el menor tiempo y el último resultado. setup se ejecuta (sin medirse) antes de cada repetición.
+    def _time(self, function, setup=None, repeat=None):
+        best, result= None, None
+        for _ in range(self._repeat if repeat is None else repeat):
+            if setup is not None:
+                setup()
+
+            start=time.perf_counter()
+            result=function()
+            elapsed=time.perf_counter()-start
+
+            best=elapsed if best is None else min(best, elapsed)
+
+        return best, result
+
+    #Número de resultados distintos entre dos colecciones de resultados (con tolerancia en los valores reales).
+    def _count_mismatches(self, expected, obtained):
+        mismatches=abs(len(expected)-len(obtained))
+        for x, y in zip(expected, obtained):
+            mismatches+=0 if _equivalent(x, y) else 1
+
+        return mismatches
+
+
+#Compara dos resultados (listas, tuplas, strings o números), con tolerancia en los valores reales.
+def _equivalent(x, y, tolerance=1e-5):
+    if isinstance(x, (list, tuple)) and isinstance(y, (list, tuple)):
+        return len(x)==len(y) and all(_equivalent(a, b, tolerance) for a, b in zip(x, y))
+
+    if isinstance(x, (bool, str, np.bool_)) or isinstance(y, (bool, str, np.bool_)):
+        return x==y
+
+    return abs(float(x)-float(y)) <= tolerance
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description='Pruebas de rendimiento del sistema sobre datos sintéticos.')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[10, 50, 200], help='Sentencias por documento.')
+    parser.add_argument('--subcriteria', type=int, nargs='+', default=[2, 5, 10], help='Subcriterios por criterio.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000], help='Documentos por corpus.')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones de cada medida.')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los datos sintéticos.')
+    parser.add_argument('--spacy-model', default='', help='Modelo de Spacy. Si no se indica, se utiliza el lematizador sustituto.')
+    parser.add_argument('--output', default='', help='Fichero en el que se almacena el informe (JSON).')
+    arguments=parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report=Benchmark_Suite(workdir=workdir,
+                               seed=arguments.seed,
+                               spacy_model=arguments.spacy_model,
+                               repeat=arguments.repeat).run(arguments.lengths, arguments.subcriteria, arguments.sizes)
+
+    if arguments.output!='':
+        with open(arguments.output, 'w', encoding='utf-8') as file_pointer:
+            json.dump(report, file_pointer, indent=2)
+
+    print(json.dumps(report, indent=2))
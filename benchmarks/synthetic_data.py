@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Datos sintéticos para las pruebas de rendimiento
+
+    Permite ejecutar las pruebas de rendimiento sin conexión, sin el modelo de Spacy en español y sin el modelo pre-entrenado de
+    Word2vec. Incluye:
+        -Synthetic_Corpus_Generator: genera, de forma determinista (a partir de una semilla), un corpus con apariencia de español,
+        los criterios asociados, las evaluaciones esperadas, las stopwords y un modelo de vectorización reducido.
+        -Stub_Lemmatizer: lematizador sustituto con la interfaz de un pipeline de Spacy. Cada término es su propio lema.
+
+    El corpus combina palabras funcionales reales del español (que, además, son stopwords y permiten que el detector de idioma
+    identifique los textos como español), términos de contenido agrupados por temas, acrónimos (términos fuera del vocabulario)
+    y números. Cada tema tiene un centro en el espacio vectorial y los vectores de sus términos se distribuyen a su alrededor, de
+    modo que los términos de un mismo tema son semejantes entre sí.
+'''
+
+from words_model import save_native_model
+import numpy as np
+import random
+import re
+
+
+#Palabras funcionales del español. Se utilizan como stopwords.
+FUNCTION_WORDS=['de', 'la', 'que', 'el', 'en', 'y', 'a', 'los', 'del', 'se', 'las', 'por', 'un', 'para', 'con', 'no', 'una',
+                'su', 'al', 'lo', 'como', 'más', 'pero', 'sus', 'le', 'ya', 'o', 'este', 'porque', 'esta', 'entre', 'cuando',
+                'muy', 'sin', 'sobre', 'también', 'me', 'hasta', 'hay', 'donde', 'quien', 'desde', 'todo', 'nos', 'durante',
+                'todos', 'uno', 'les', 'ni', 'contra', 'otros', 'ese', 'eso', 'ante', 'ellos', 'esto', 'antes', 'algunos',
+                'unos', 'otro', 'otras', 'otra', 'tanto', 'esa', 'estos', 'mucho', 'quienes', 'nada', 'muchos', 'cual',
+                'poco', 'ella', 'estas', 'algunas', 'algo', 'nosotros', 'será', 'debe', 'puede', 'tiene', 'son', 'es']
+
+#Términos de contenido de cada tema.
+TOPICS={
+    'datos': ['datos', 'información', 'registro', 'fichero', 'archivo', 'tratamiento', 'almacenamiento', 'conservación',
+              'categoría', 'titular', 'responsable', 'encargado', 'cesión', 'transferencia', 'destinatario'],
+    'derechos': ['derecho', 'acceso', 'rectificación', 'supresión', 'oposición', 'portabilidad', 'limitación', 'olvido',
+                 'solicitud', 'ejercicio', 'interesado', 'reclamación', 'respuesta', 'plazo', 'procedimiento'],
+    'consentimiento': ['consentimiento', 'autorización', 'aceptación', 'voluntad', 'finalidad', 'legitimación', 'contrato',
+                       'interés', 'obligación', 'revocación', 'menor', 'tutor', 'firma', 'casilla', 'formulario'],
+    'seguridad': ['seguridad', 'cifrado', 'contraseña', 'copia', 'incidente', 'brecha', 'notificación', 'riesgo', 'medida',
+                  'control', 'auditoría', 'protocolo', 'servidor', 'red', 'vulnerabilidad'],
+    'empresa': ['empresa', 'cliente', 'proveedor', 'empleado', 'servicio', 'producto', 'factura', 'pedido', 'venta', 'compra',
+                'departamento', 'oficina', 'gerente', 'presupuesto', 'proyecto'],
+    'salud': ['salud', 'paciente', 'médico', 'hospital', 'historia', 'diagnóstico', 'receta', 'análisis', 'cita', 'consulta',
+              'enfermedad', 'síntoma', 'vacuna', 'clínica', 'urgencia'],
+    'educación': ['alumno', 'profesor', 'colegio', 'curso', 'asignatura', 'examen', 'nota', 'matrícula', 'clase',
+                  'universidad', 'título', 'beca', 'horario', 'aula', 'tutoría'],
+    'normativa': ['ley', 'reglamento', 'artículo', 'norma', 'disposición', 'sanción', 'multa', 'autoridad', 'agencia',
+                  'tribunal', 'sentencia', 'recurso', 'infracción', 'inspección', 'cumplimiento']
+}
+
+#Sílabas con las que se generan términos adicionales de cada tema.
+SYLLABLES=['da', 'to', 're', 'ci', 'ón', 'pro', 'te', 'la', 'mi', 'na', 'sa', 'co', 'per', 'lo', 'ti', 'va', 'ri', 'gue',
+           'ma', 'ne', 'bli', 'cu', 'dor', 'mien', 'tra', 'les', 'fi', 'cha', 'gi', 'ven']
+
+LETTERS='ABCDEFGHIJKLMNOPRSTUV'
+
+
+class Synthetic_Corpus_Generator():
+
+    def __init__(self,
+                 seed=0,                #Semilla. Los mismos parámetros generan siempre los mismos datos.
+                 words_per_topic=40,    #Número de términos de contenido de cada tema (reales y generados).
+                 acronyms_per_topic=5,  #Número de acrónimos (términos fuera del vocabulario) de cada tema.
+                 oov_ratio=0.1,         #Proporción de términos de contenido que no forman parte del modelo de vectorización.
+                 dimension=50           #Dimensión de los vectores del modelo.
+                 ):
+
+        self._seed=seed
+        self._dimension=dimension
+        rng=random.Random(seed)
+
+        self.topics=list(TOPICS.keys())
+
+        #Términos de contenido y acrónimos de cada tema.
+        self.topic_words=dict()
+        self.topic_acronyms=dict()
+        used=set(FUNCTION_WORDS)
+        for topic in self.topics:
+            words=[word for word in TOPICS[topic] if not word in used]
+            while len(words) < words_per_topic:
+                word=''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+                if not word in used and not word in words:
+                    words.append(word)
+            used.update(words)
+
+            acronyms=list()
+            while len(acronyms) < acronyms_per_topic:
+                acronym=''.join(rng.choice(LETTERS) for _ in range(rng.randint(3, 5)))
+                if not acronym.lower() in used:
+                    acronyms.append(acronym)
+                    used.add(acronym.lower())
+
+            self.topic_words[topic]=words
+            self.topic_acronyms[topic]=acronyms
+
+        #Términos de contenido que no forman parte del modelo de vectorización.
+        content_words=[word for topic in self.topics for word in self.topic_words[topic]]
+        self.oov_words=set(rng.sample(content_words, int(len(content_words)*oov_ratio)))
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Genera el modelo de vectorización y lo almacena en el formato binario propio del sistema (ver words_model).
+
+        Input:
+            -prefix: String. Ruta base del modelo.
+
+        Output:
+            -String. Ubicación del fichero .npy, que puede utilizarse directamente como modelo pre-entrenado del sistema.
+    '''
+    def write_embedding_model(self, prefix):
+        rng=np.random.RandomState(self._seed)
+
+        words, vectors= list(), list()
+        for topic in self.topics:
+            center=rng.normal(size=self._dimension)
+            for word in self.topic_words[topic]:
+                if not word in self.oov_words:
+                    words.append(word)
+                    vectors.append(center + rng.normal(scale=0.8, size=self._dimension))
+
+        vectors=np.array(vectors, dtype=np.float32)
+        vectors/=np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        save_native_model(prefix, words, vectors)
+
+        return prefix+'.npy'
+
+    '''
+        Almacena las stopwords (palabras funcionales) en un fichero con el formato utilizado por el sistema.
+
+        Input:
+            -filename: String. Ubicación del fichero.
+    '''
+    def write_stopwords(self, filename):
+        with open(filename, 'w', encoding='latin-1') as file_pointer:
+            file_pointer.write('\n'.join(FUNCTION_WORDS)+'\n')
+
+    '''
+        Genera una colección de documentos.
+
+        Input:
+            -num_documents: Int. Número de documentos.
+            -num_sentences: Int. Número de sentencias por documento.
+            -words_per_sentence: Int. Número medio de términos por sentencia.
+            -topics_per_document: Int. Número de temas que trata cada documento.
+
+        Output:
+            -Dict. Claves: nombres de los documentos. Valores: tuplas (contenido, temas tratados).
+    '''
+    def generate_corpus(self, num_documents=100, num_sentences=20, words_per_sentence=12, topics_per_document=2):
+        rng=random.Random(self._seed+1)
+
+        corpus=dict()
+        for pos in range(num_documents):
+            topics=rng.sample(self.topics, topics_per_document)
+            sentences=[self._generate_sentence(rng, topics, words_per_sentence) for _ in range(num_sentences)]
+
+            corpus['doc'+str(pos)]=('. '.join(sentences)+'.', topics)
+
+        return corpus
+
+    '''
+        Genera una colección de criterios: uno por tema, con subcriterios formados por términos del tema.
+
+        Input:
+            -num_criteria: Int. Número de criterios (como mucho, el número de temas).
+            -subcriteria_per_criterion: Int. Número de subcriterios de cada criterio.
+            -words_per_subcriterion: Int. Número máximo de términos de cada subcriterio.
+
+        Output:
+            -Dict. Claves: criterios. Valores: listas de subcriterios. Los criterios se llaman como su tema.
+    '''
+    def generate_criteria(self, num_criteria=4, subcriteria_per_criterion=5, words_per_subcriterion=3):
+        rng=random.Random(self._seed+2)
+
+        criteria=dict()
+        for topic in self.topics[:num_criteria]:
+            subcriteria=list()
+            while len(subcriteria) < subcriteria_per_criterion:
+                if rng.random() < 0.15:
+                    subcriterion=rng.choice(self.topic_acronyms[topic])
+                else:
+                    subcriterion=' '.join(rng.sample(self.topic_words[topic], rng.randint(1, words_per_subcriterion)))
+
+                if not subcriterion in subcriteria:
+                    subcriteria.append(subcriterion)
+
+            criteria[topic]=subcriteria
+
+        return criteria
+
+    '''
+        Genera las evaluaciones esperadas de un corpus: un criterio se cumple (OK) si el documento trata su tema.
+        Una pequeña proporción de las evaluaciones se invierte, como ocurre con las evaluaciones manuales.
+
+        Input:
+            -corpus: Dict. Corpus generado mediante generate_corpus.
+            -criteria: Dict. Criterios generados mediante generate_criteria.
+            -noise: Float. Proporción de evaluaciones invertidas.
+
+        Output:
+            -Dict. Claves: nombres de los documentos. Valores: lista de evaluaciones (OK/KO), una por criterio.
+    '''
+    def generate_evaluations(self, corpus, criteria, noise=0.05):
+        rng=random.Random(self._seed+3)
+
+        evaluations=dict()
+        for name, (_, topics) in corpus.items():
+            evaluations[name]=list()
+            for topic in criteria.keys():
+                expected=(topic in topics) != (rng.random() < noise)
+                evaluations[name].append('OK' if expected else 'KO')
+
+        return evaluations
+
+    '''
+        MÉTODOS DE ESCRITURA (formatos utilizados por el sistema)
+    '''
+
+    #Csv de contenidos: cabecera y una línea por documento. El nombre y el contenido son el tercer y el cuarto campo.
+    def write_corpus_csv(self, filename, corpus, separator='#'):
+        with open(filename, 'w', encoding='latin-1') as file_pointer:
+            file_pointer.write(separator.join(['id', 'source', 'name', 'content'])+'\n')
+            for pos, (name, (text, _)) in enumerate(corpus.items()):
+                file_pointer.write(separator.join([str(pos), 'synthetic', name, text])+'\n')
+
+    #Csv de evaluaciones: cabecera y una línea por documento con su nombre y la evaluación de cada criterio.
+    def write_evaluations_csv(self, filename, evaluations, criteria, separator='#'):
+        with open(filename, 'w', encoding='latin-1') as file_pointer:
+            file_pointer.write(separator.join(['name'] + list(criteria.keys()))+'\n')
+            for name, values in evaluations.items():
+                file_pointer.write(separator.join([name] + values)+'\n')
+
+    #Fichero de criterios: cada criterio empieza por -- y cada subcriterio por **.
+    def write_criteria_file(self, filename, criteria):
+        with open(filename, 'w', encoding='latin-1') as file_pointer:
+            for name, subcriteria in criteria.items():
+                file_pointer.write('--'+name+'\n')
+                for subcriterion in subcriteria:
+                    file_pointer.write('**'+subcriterion+'\n')
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Genera una sentencia: palabras funcionales, términos de los temas del documento, algún término de otro tema, acrónimos y números.
+    def _generate_sentence(self, rng, topics, words_per_sentence):
+        words=list()
+        for _ in range(max(1, int(rng.gauss(words_per_sentence, words_per_sentence/4)))):
+            draw=rng.random()
+
+            if draw < 0.4:
+                words.append(rng.choice(FUNCTION_WORDS))
+            elif draw < 0.85:
+                words.append(rng.choice(self.topic_words[rng.choice(topics)]))
+            elif draw < 0.93:
+                words.append(rng.choice(self.topic_words[rng.choice(self.topics)]))
+            elif draw < 0.98:
+                words.append(rng.choice(self.topic_acronyms[rng.choice(topics)]))
+            else:
+                words.append(str(rng.randint(1, 2030)))
+
+        words[0]=words[0].capitalize()
+
+        return ' '.join(words)
+
+
+'''
+    Lematizador sustituto con la interfaz de un pipeline de Spacy (llamada, pipe y lang). Separa los términos por espacios y
+    cada término es su propio lema. Permite ejecutar el sistema sin el modelo de Spacy (ver el parámetro nlp de Linguistic_Model).
+'''
+class Stub_Lemmatizer():
+
+    lang='es'
+
+    def __call__(self, text):
+        doc=list()
+        for match in re.finditer(r'\S+', text):
+            whitespace=' ' if match.end() < len(text) and text[match.end()].isspace() else ''
+            doc.append(Stub_Token(match.group(), len(doc), whitespace))
+
+        return doc
+
+    def pipe(self, texts, batch_size=1000):
+        for text in texts:
+            yield self(text)
+
+
+class Stub_Token():
+
+    def __init__(self, text, i, whitespace_):
+        self.text=text
+        self.lemma_=text
+        self.i=i
+        self.whitespace_=whitespace_
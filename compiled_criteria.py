@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Criterios compilados
+
+    Los subcriterios se preprocesan y vectorizan una única vez, cuando se establecen los criterios del sistema, en lugar de
+    hacerlo para cada documento evaluado.
+
+    Cada subcriterio se compila una sola vez aunque aparezca en varios criterios.
+
+    Además, cada término (del vocabulario) de los subcriterios se compara, en el momento de la compilación, con todo el
+    vocabulario del modelo mediante un único producto matriz-vector. El resultado (Similarity_Row) permite evaluar un
+    documento seleccionando los valores asociados a sus términos. De forma predeterminada, tan solo se conservan los términos
+    más semejantes (configuración 'concept_rows_top_k'): la semejanza con los demás términos del documento se calcula
+    explícitamente. La forma densa (top_k=0) evita todo producto escalar por documento, pero ocupa un float por término del
+    vocabulario y término de los subcriterios.
+'''
+
+from utilities import configuration
+import numpy as np
+
+
+class Compiled_Criteria():
+
+    def __init__(self,
+                 criteria=dict(),       #Diccionario de criterios. Claves: criterios. Valores: listas de subcriterios.
+                 text_analyzer=''       #Text_Analyzer utilizado para transformar los subcriterios.
+                 ):
+
+        self.criteria=criteria
+
+        vectors=text_analyzer.get_words_vectorization_model().get_vectors()
+
+        #Semejanza de cada término de los subcriterios con el vocabulario. Claves: identificador del término.
+        self._rows=dict()
+
+        #Diccionario cuyas claves son los subcriterios y los valores la tupla (concept_vect, concept_others, concept_rows).
+        self._concepts=dict()
+        for subcriteria in criteria.values():
+            for subcriterion in subcriteria:
+                if not subcriterion in self._concepts:
+                    self._concepts[subcriterion]=self._compile_concept(subcriterion, text_analyzer, vectors)
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Devuelve la representación procesada de un subcriterio.
+
+        Input:
+            -subcriterion: String. Subcriterio.
+
+        Output:
+            -Matriz de floats de 32 con los vectores de los términos del subcriterio (una fila por término). False si el subcriterio es irrelevante.
+            -List. Términos del subcriterio que no forman parte del vocabulario. False si el subcriterio es irrelevante.
+            Si el subcriterio no se ha compilado, lanza un KeyError.
+    '''
+    def get_concept(self, subcriterion):
+        return self._concepts[subcriterion][:2]
+
+    '''
+        Devuelve la semejanza precalculada de cada término (del vocabulario) de un subcriterio con todo el vocabulario.
+
+        Input:
+            -subcriterion: String. Subcriterio.
+
+        Output:
+            -List. Un Similarity_Row por cada fila de la matriz devuelta por get_concept. None si el subcriterio es irrelevante
+            o si el cálculo está desactivado en la configuración ('concept_similarity_rows').
+    '''
+    def get_concept_rows(self, subcriterion):
+        return self._concepts[subcriterion][2]
+
+    '''
+        Determina si los criterios compilados corresponden a los criterios introducidos.
+
+        Input:
+            -criteria: Dict. Colección de criterios.
+
+        Output:
+            -Boolean.
+    '''
+    def matches(self, criteria):
+        return self.criteria == criteria
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Transforma un subcriterio. Los vectores se agrupan en una única matriz para el motor de semejanza.
+    def _compile_concept(self, subcriterion, text_analyzer, vectors):
+        concept_ids, concept_others=text_analyzer.transform_to_ids(subcriterion)
+
+        if concept_ids is False:
+            return False, False, None
+
+        matrix=np.ascontiguousarray(vectors[np.array(concept_ids, dtype=np.int64)], dtype=np.float32)
+
+        rows=None
+        if configuration['concept_similarity_rows']:
+            rows=[self._get_row(term_id, vectors) for term_id in concept_ids]
+
+        return matrix, concept_others, rows
+
+    #Devuelve la semejanza de un término con el vocabulario. Cada término se calcula una única vez.
+    def _get_row(self, term_id, vectors):
+        if not term_id in self._rows:
+            self._rows[term_id]=Similarity_Row(vectors[term_id], vectors, top_k=configuration['concept_rows_top_k'])
+
+        return self._rows[term_id]
+
+
+'''
+    Semejanza de cosenos de un término con todos los términos del vocabulario.
+
+    Puede almacenarse de forma densa (un valor por término del vocabulario) o conservar tan solo los top_k términos más
+    semejantes. En el segundo caso, la semejanza con los términos restantes se calcula explícitamente cuando se necesita,
+    de modo que el resultado es siempre el mismo.
+'''
+class Similarity_Row():
+
+    def __init__(self,
+                 vector=None,   #Vector (normalizado) del término.
+                 vectors=None,  #Matriz (normalizada) del modelo de vectorización.
+                 top_k=0        #Número de términos conservados. Si es 0, se conservan todos (forma densa).
+                 ):
+
+        similarities=np.dot(vectors, vector).astype(np.float32)
+
+        self._vector=np.array(vector, dtype=np.float32)
+
+        if top_k <= 0 or top_k >= len(similarities):
+            self.ids=None
+            self.values=similarities
+        else:
+            self.ids=np.sort(np.argpartition(-similarities, top_k-1)[:top_k])
+            self.values=similarities[self.ids]
+
+    '''
+        Devuelve la semejanza del término con una colección de términos del vocabulario.
+
+        Input:
+            -token_ids: Array de enteros. Identificadores de los términos.
+            -vectors: Matriz de floats de 32 del modelo de vectorización. Tan solo se utiliza en la forma top_k, para los términos
+            que no forman parte de los top_k.
+
+        Output:
+            -Array de floats de 32. Semejanza con cada término, en el mismo orden.
+    '''
+    def gather(self, token_ids, vectors):
+        if self.ids is None:
+            return self.values[token_ids]
+
+        positions=np.minimum(np.searchsorted(self.ids, token_ids), len(self.ids)-1)
+        found=self.ids[positions]==token_ids
+
+        result=np.empty(len(token_ids), dtype=np.float32)
+        result[found]=self.values[positions[found]]
+        result[~found]=np.dot(vectors[token_ids[~found]], self._vector)
+
+        return result
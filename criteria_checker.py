@@ -8,23 +8,42 @@
 
 
 from text_analyzer import Text_Analyzer
-from utilities import configuration 
+from similarity_engine import Document_Matrix
+from compiled_criteria import Compiled_Criteria
+from document_cache import Document_Cache
+from subcriteria_statistics import Subcriteria_Statistics
+from instrumentation import NULL_INSTRUMENTATION
+from utilities import configuration, split_sentences
+import numpy as np
 
 class Criteria_Checker():
         
     def __init__(self,
                  pre_trained_model_file='',
                  model_type='',
-                 stopwords_file=''
+                 stopwords_file='',
+                 nlp=None,                      #Pipeline de Spacy ya cargado (ver Linguistic_Model).
+                 pipeline_profile='lemmatize'   #Perfil del pipeline de Spacy (ver Linguistic_Model).
                  ):
         
 
         
         self.text_analyzer=Text_Analyzer( pre_trained_model_file=pre_trained_model_file,
                                              model_type=model_type,
-                                             stopwords_file=stopwords_file)
+                                             stopwords_file=stopwords_file,
+                                             pipeline_profile=pipeline_profile,
+                                             nlp=nlp)
 
         print('Text analyzer loaded.')
+        
+        #Caché en disco de documentos preprocesados. Se crea al utilizarse (ver configuración 'document_cache_dir').
+        self._document_cache=None
+        
+        #Probabilidad de aparición y coste de cada subcriterio. Permiten ordenarlos para decidir antes el resultado.
+        self.subcriteria_statistics=Subcriteria_Statistics()
+        
+        #Instrumentación (ver Instrumentation y set_instrumentation).
+        self._instrumentation=NULL_INSTRUMENTATION
              
     '''
         MÉTODOS PRINCIPALES
@@ -36,9 +55,14 @@ class Criteria_Checker():
         Input:
             -criterion_pos: Int. Posición dentro de la totalidad de los criterios evaluados que ocupa el criterio actual.
             -subcriteria: List. Lista que almacena los subcriterios asociados al criterio evaluado.
-            -processed_text: String. Cadena de caracteres que representa el texto (ya procesado) en el cual queremos evaluar si se cumple el criterio.
+            -processed_text: Document_Matrix. Texto (ya procesado) en el cual queremos evaluar si se cumple el criterio. También admite la lista de sentencias procesadas.
             -autoconfigure_flag: Boolean. Determina si la ejecución forma parte del aprendizaje del sistema.
             -get_found: Boolean. Determina si la ejecución forma parte del análisis de los criterios utilizados por el sistema.
+            -compiled_criteria: Compiled_Criteria. Criterios compilados que contienen los subcriterios ya procesados. Si no se indican, los subcriterios se procesan en cada llamada.
+            -adaptive_order: Boolean. Indica que tan solo se necesita saber si se cumple el criterio (OK/KO). Si es True (y get_found y 
+            autoconfigure_flag son False), los subcriterios se evalúan en el orden que permite decidir antes el resultado (ver 
+            Subcriteria_Statistics) y la búsqueda se detiene también en cuanto el criterio ya no puede cumplirse. El Boolean devuelto
+            no cambia. El porcentaje no se calcula: se devuelve None.
             
         Output:
             Si get_found == True:
@@ -56,28 +80,60 @@ class Criteria_Checker():
                         subcriteria,
                         processed_text,
                         autoconfigure_flag=False,
-                        get_found=False
+                        get_found=False,
+                        compiled_criteria=None,
+                        adaptive_order=False
                         ):
         
         found_num=0
         found_concepts=[] #Lista con los criterios encontrados.
         
+        #El motor de semejanza trabaja sobre la representación matricial del documento.
+        if not isinstance(processed_text, Document_Matrix):
+            processed_text=self.text_analyzer.build_document_matrix(processed_text)
+        
         rest=len(subcriteria)
+        
+        adaptive=adaptive_order and configuration['adaptive_subcriteria_order'] and not (get_found or autoconfigure_flag)
+        
+        if adaptive:
+            #Los subcriterios ya evaluados en el documento (por otro criterio) no tienen coste.
+            evaluated={concept for concept, threshold_value in processed_text.concept_results if threshold_value==configuration['threshold_value']}
+            costs=[self._get_concept_cost(subcriterion, compiled_criteria) for subcriterion in subcriteria]
+            ordered_subcriteria=self.subcriteria_statistics.order(subcriteria, self._get_curr_threshold_value(criterion_pos), costs, evaluated)
+        else:
+            ordered_subcriteria=subcriteria
             
-        for subcriterion in subcriteria:
-            found, value= self._check_concept(subcriterion, processed_text)
+        self._instrumentation.count('criteria')
+            
+        for subcriterion in ordered_subcriteria:
+            found, value= self._check_concept(subcriterion, processed_text, compiled_criteria)
             rest-=1
             if found:
                 found_num+=1
                 found_concepts.append(subcriterion)
                             
                 if (not autoconfigure_flag) and self._got_result(criterion_pos, found_num, len(subcriteria), rest):
-                    if get_found:
+                    if rest>0:
+                        self._instrumentation.count('early_exits')
+                    
+                    if adaptive:
+                        return found_num/len(subcriteria)>= self._get_curr_threshold_value(criterion_pos), None
+                    elif get_found:
                         return found_num/len(subcriteria)>= self._get_curr_threshold_value(criterion_pos),(found_num/len(subcriteria)), found_concepts 
                     else:
                         return found_num/len(subcriteria)>= self._get_curr_threshold_value(criterion_pos),(found_num/len(subcriteria)) 
+            
+            #En el orden adaptativo, el resultado también se decide en cuanto no quedan suficientes subcriterios por encontrar.
+            elif adaptive and self._got_result(criterion_pos, found_num, len(subcriteria), rest):
+                if rest>0:
+                    self._instrumentation.count('early_exits')
+                    
+                return found_num/len(subcriteria)>= self._get_curr_threshold_value(criterion_pos), None
         
-        if get_found:
+        if adaptive:
+            return found_num/len(subcriteria)>= self._get_curr_threshold_value(criterion_pos), None
+        elif get_found:
             return found_num/len(subcriteria)>= self._get_curr_threshold_value(criterion_pos),(found_num/len(subcriteria)), found_concepts 
         else:
             return found_num/len(subcriteria)>= self._get_curr_threshold_value(criterion_pos),(found_num/len(subcriteria)) 
@@ -93,54 +149,216 @@ class Criteria_Checker():
             -text: String. Texto a procesar.
             
         Output:
-            -List. Lista cuyos elementos son las sentencias del texto procesado. Cada sentencia consiste en una tupla de dos elementos:
+            -Document_Matrix. Representación matricial del texto procesado. Puede recorrerse como una lista cuyos elementos son las sentencias del texto procesado. 
+            Cada sentencia consiste en una tupla de dos elementos:
                 -Una lista con las representaciones como vectores de los términos que aparecen en el espacio vectorial definido por el modelo de Word2vec utilizado.
                 -Una lista con los términos (string) que no aparecen en el espacio vectorial. 
         
     '''
         
     def pre_process_text(self, text):
-        result=list()
-        for paragraph in text.split('\n'):
-            for sentence in paragraph.split('.'):
-                sent_vect, sent_others=self.text_analyzer.transform(sentence)
+        return self.pre_process_texts([text])[0]
+    
+    '''
+        Preprocesa una colección de documentos. Es equivalente a aplicar pre_process_text sobre cada documento, pero las 
+        sentencias de todos los documentos se lematizan conjuntamente, por lotes.
+        
+        Si la caché de documentos está activada (configuración 'document_cache_dir'), los documentos ya preprocesados se cargan
+        desde el disco y tan solo se analizan los demás.
+        
+        Input:
+            -texts: List. Textos a procesar.
+            -batch_size: Int. Número de sentencias por lote de lematización. Si no se indica, se utiliza el valor de configuración 'spacy_batch_size'.
+            
+        Output:
+            -List. Un Document_Matrix por documento, en el mismo orden.
+    '''
+    def pre_process_texts(self, texts, batch_size=None):
+        document_cache=self._get_document_cache()
+        
+        instrumentation=self._instrumentation
+        
+        result=[None]*len(texts)
+        pending=list()
+        for pos, text in enumerate(texts):
+            cached=document_cache.get(text) if document_cache is not None else None
+            
+            if cached is not None:
+                result[pos]=self.text_analyzer.build_document_matrix_from_arrays(*cached)
+            else:
+                pending.append(pos)
                 
-                #Si sent_vect == False, el contenido de la línea es irrelevante (es un espacio en blanco, retorno de carro, etc)
-                if sent_vect!=False:
-                    result.append((sent_vect, sent_others))
+            if document_cache is not None:
+                instrumentation.select(pos)
+                instrumentation.count('document_cache_hits' if cached is not None else 'document_cache_misses')
+        
+        sentences, limits=list(), [0]
+        for pos in pending:
+            sentences.extend(split_sentences(texts[pos]))
+            limits.append(len(sentences))
+        
+        #Las sentencias de todos los documentos se procesan conjuntamente: el tiempo se reparte según el número de sentencias.
+        instrumentation.select(None)
+        transformed=self.text_analyzer.transform_many_to_ids(sentences, batch_size=batch_size) if len(sentences)>0 else []
+        instrumentation.distribute({pos: end-start for pos, start, end in zip(pending, limits[:-1], limits[1:])})
+        
+        for pos, start, end in zip(pending, limits[:-1], limits[1:]):
+            processed_text=list()
+            for sent_ids, sent_others in transformed[start:end]:
+                #Si sent_ids == False, el contenido de la línea es irrelevante (es un espacio en blanco, retorno de carro, etc)
+                if sent_ids is not False:
+                    processed_text.append((sent_ids, sent_others))
+            
+            if document_cache is not None:
+                document_cache.put(texts[pos], processed_text)
                     
+            result[pos]=self.text_analyzer.build_document_matrix_from_ids(processed_text)
+        
+        if instrumentation.enabled:
+            for pos, document in enumerate(result):
+                instrumentation.select(pos)
+                instrumentation.count('sentences', len(document))
+                instrumentation.count('terms', document.num_terms + len(document.oov_ids))
+                instrumentation.count('oov_terms', len(document.oov_ids))
+            instrumentation.select(None)
+        
+        return result
+    
+    '''
+        Calcula la mejor semejanza (método average) de cada subcriterio con las sentencias de un documento. Un subcriterio
+        aparece en el documento si dicho valor es mayor que 0 y alcanza el threshold_value (ver Score_Tensor).
+        
+        Input:
+            -subcriteria: List. Subcriterios.
+            -processed_text: Document_Matrix. Texto ya procesado.
+            -compiled_criteria: Compiled_Criteria. Criterios compilados que contienen los subcriterios. Si no se indican, los subcriterios se procesan en cada llamada.
+            
+        Output:
+            -Array de floats de 32. Un valor por subcriterio. Es 0 si el subcriterio es irrelevante o el documento está vacío.
+    '''
+    def get_best_similarities(self, subcriteria, processed_text, compiled_criteria=None):
+        result=np.zeros(len(subcriteria), dtype=np.float32)
+        
+        for pos, subcriterion in enumerate(subcriteria):
+            scores=self._score_concept(subcriterion, processed_text, compiled_criteria)
+            
+            if scores is not None and len(scores)>0:
+                result[pos]=scores.max()
+                
         return result
     
+    '''
+        Compila una colección de criterios: preprocesa y vectoriza cada subcriterio una única vez.
+        
+        Input:
+            -criteria: Dict. Claves: criterios. Valores: listas de subcriterios.
+            
+        Output:
+            -Compiled_Criteria. Criterios compilados que pueden utilizarse en check_criterion.
+    '''
+    def compile_criteria(self, criteria):
+        return Compiled_Criteria(criteria=criteria, text_analyzer=self.text_analyzer)
+    
+    '''
+        Establece la instrumentación del módulo y del analizador de textos.
+        
+        Input:
+            -instrumentation: Instrumentation. Si es None, se desactiva.
+    '''
+    def set_instrumentation(self, instrumentation=None):
+        self._instrumentation=NULL_INSTRUMENTATION if instrumentation is None else instrumentation
+        self.text_analyzer.set_instrumentation(instrumentation)
+    
     '''
         MÉTODOS AUXILIARES
     '''
-    #Busca un concepto (subcriterio) dentro de un texto.
+    #Devuelve la caché de documentos del directorio configurado. None si está desactivada.
+    def _get_document_cache(self):
+        directory=configuration['document_cache_dir']
+        
+        if directory=='':
+            return None
+        
+        #La huella puede cambiar con la configuración (por ejemplo, 'token_lemma_cache'): en ese caso, se utilizan otras entradas.
+        fingerprint=self.text_analyzer.get_fingerprint()
+        
+        if self._document_cache is None or self._document_cache.directory != directory or self._document_cache.fingerprint != fingerprint:
+            self._document_cache=Document_Cache(directory=directory, fingerprint=fingerprint)
+            
+        return self._document_cache
+    
+    #Busca un concepto (subcriterio) dentro de un texto. El resultado se guarda en el documento, de modo que los subcriterios
+    #compartidos por varios criterios se evalúan una única vez por documento.
     def _check_concept(self,
                         concept,
-                        processed_text
+                        processed_text,
+                        compiled_criteria=None
                         ):
         
-        concept_vect, concept_others = self.text_analyzer.transform(concept)
+        key=(concept, configuration['threshold_value'])
+        if not key in processed_text.concept_results:
+            processed_text.concept_results[key]=self._evaluate_concept(concept, processed_text, compiled_criteria)
+            
+            self.subcriteria_statistics.record(concept, processed_text.concept_results[key][0])
+            self._instrumentation.count('subcriteria_evaluated')
+        else:
+            self._instrumentation.count('concept_cache_hits')
+            
+        return processed_text.concept_results[key]
+    
+    #Evalúa la aparición de un concepto (subcriterio) dentro de un texto.
+    def _evaluate_concept(self,
+                          concept,
+                          processed_text,
+                          compiled_criteria=None
+                          ):
+        
+        scores=self._score_concept(concept, processed_text, compiled_criteria)
         
-        if concept_vect == False:
+        if scores is None:
             return False, False
         
-        best=0
-        for line in processed_text:        
-            sent_vect=line[0]    
-            sent_others=line[1]
-            
-            #Utilizamos el método average. Lo indicamos por parámetro de configuración.
-            curr= self.text_analyzer.compare_sentences(concept_vect, concept_others, sent_vect, sent_others)
+        #La primera sentencia que mejora el mejor valor y alcanza el umbral determina el resultado.
+        hits=np.flatnonzero((scores > 0) & (scores >= configuration['threshold_value']))
+        if len(hits)>0:
+            return True, scores[hits[0]]
+        
+        return False, (scores.max() if len(scores)>0 else 0)
+    
+    #Calcula la semejanza de un concepto (subcriterio) con cada sentencia de un texto. Devuelve None si el concepto es irrelevante.
+    def _score_concept(self,
+                       concept,
+                       processed_text,
+                       compiled_criteria=None
+                       ):
+        
+        concept_vect, concept_others= self._get_concept_terms(concept, compiled_criteria)
+        concept_rows=compiled_criteria.get_concept_rows(concept) if compiled_criteria is not None else None
+        
+        if concept_vect is False:
+            return None
+        
+        #Semejanza del concepto con cada sentencia del documento (método average).
+        return self.text_analyzer.compare_concept_with_document(concept_vect, concept_others, processed_text, concept_rows=concept_rows)
     
-            if curr > best:
-                best=curr
     
-                if curr>= configuration['threshold_value']:
-                    return True, curr
+    #Devuelve la representación procesada de un concepto (subcriterio): sus vectores y sus términos fuera del vocabulario.
+    def _get_concept_terms(self, concept, compiled_criteria=None):
+        if compiled_criteria is not None:
+            return compiled_criteria.get_concept(concept)
         
-        return False, best
+        return self.text_analyzer.transform(concept)
     
+    #Coste estimado de evaluar un concepto (subcriterio): número de términos más número de términos fuera del vocabulario
+    #(cada uno de estos se compara con los términos del documento mediante el longest common substring, que es más costoso).
+    #No depende de tiempos medidos, de modo que el orden de los subcriterios es el mismo en cada ejecución y en cada máquina.
+    def _get_concept_cost(self, concept, compiled_criteria=None):
+        concept_vect, concept_others= self._get_concept_terms(concept, compiled_criteria)
+        
+        if concept_vect is False:
+            return 1
+        
+        return 1 + len(concept_vect) + 2*len(concept_others)
     
     #Determina si ya hemos alcanzado un resultado (si no es necesario seguir).
     def _got_result(self,
@@ -2,18 +2,20 @@
 
 '''
     Módulo encargado de la extracción de criterios y subcriterios asociados a los artículos.
+    
+    Las dependencias más pesadas (spacy, nltk, pandas y multi_rake) se importan al utilizarse, de modo que importar el módulo
+    no las carga. El sistema tan solo construye el extractor la primera vez que extrae un criterio (ver System.criteria_extraction).
 '''
 
 #Imports necesarios
-import pandas as pd 
 import re
-import nltk
-import spacy
 import string
 import numpy as np
 from collections import OrderedDict
-from spacy.lang.es.stop_words import STOP_WORDS
-from multi_rake import Rake
+
+
+#Modelo de Spacy utilizado por el extractor. Necesita el pipeline completo (etiquetas POS y separación de sentencias).
+EXTRACTOR_MODEL_TYPE=""
 
 
 '''
@@ -40,11 +42,18 @@ from multi_rake import Rake
 class Criteria_Extractor_Module():
     
     #Inicialización del sistema
-    def __init__(self):
-        self._model= spacy.load("") #modelo de spacy para el análisis del texto.
+    #nlp: pipeline de Spacy ya cargado (por ejemplo, el del modelo lingüístico del sistema, ver Linguistic_Model.get_pipeline). 
+    #Si no se indica, se carga EXTRACTOR_MODEL_TYPE.
+    def __init__(self, nlp=None):
+        import nltk
+        
+        if nlp is None:
+            import spacy
+            nlp=spacy.load(EXTRACTOR_MODEL_TYPE)
+            
+        self._model= nlp #modelo de spacy para el análisis del texto.
         self._tr=TextRank4Keyword(self._model) #Clase para el uso de TextRank    
-        STOPWORDS_DICT = {lang: set(nltk.corpus.stopwords.words(lang)) for lang in nltk.corpus.stopwords.fileids()}
-        self._spanish_stopwords=list(STOPWORDS_DICT['spanish']) #stopwords utilizadas
+        self._spanish_stopwords=list(set(nltk.corpus.stopwords.words('spanish'))) #stopwords utilizadas
 
     '''
         Dado un documento en el que se define un criterio, lo analiza y extrae distinta información relevante para su identificación
@@ -93,6 +102,8 @@ class Criteria_Extractor_Module():
 
     #Extracción de kw mediante RAKE
     def _RAKE_search(self,text, score_threshold=):
+        from multi_rake import Rake
+        
         rake=Rake(min_chars=, #Número mínimo de caracteres que debe tener un término para poder considerarse kw.
               max_words=, #Número máximo de términos que puede contener una potencial kw.
               min_freq=, #Frecuencia mínima de aparición.
@@ -113,6 +124,9 @@ class Criteria_Extractor_Module():
     
     #Extracción analizando la co-ocurrencia de distintos términos del texto (collocations extraction)
     def _collocations_search(self,text):
+        import nltk
+        import pandas as pd
+        
         #Inicialización de los bigramas y trigramas.
         bigramFinder = nltk.collocations.BigramCollocationFinder.from_words(text.split())
         trigramFinder = nltk.collocations.TrigramCollocationFinder.from_words(text.split())
@@ -245,6 +259,8 @@ class TextRank4Keyword():
 
     #Fija las stopwords que va a utilizar la instancia.  
     def _set_stopwords(self, stopwords):
+        from spacy.lang.es.stop_words import STOP_WORDS
+        
         for word in STOP_WORDS.union(set(stopwords)):
             lexeme = self._model.vocab[word]
             lexeme.is_stop = True
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Caché en disco de documentos preprocesados
+
+    Almacena el resultado del preprocesamiento de cada documento (identificadores de sus términos en el modelo de vectorización,
+    límites de sus sentencias y términos fuera del vocabulario), de modo que un documento ya evaluado no vuelve a pasar por el
+    análisis lingüístico (separación, limpieza, Spacy y vectorización).
+
+    Cada documento se identifica por el hash de su contenido junto con la huella del preprocesamiento (modelos, stopwords,
+    perfil del pipeline, etc, ver Text_Analyzer.get_fingerprint). Si cualquiera de ellos cambia, la clave cambia y el documento
+    se vuelve a procesar.
+
+    Cada entrada consta de dos ficheros:
+        -<clave>.npy: Array de enteros de 32. Contiene el número de sentencias, sus límites y los identificadores de los términos.
+        Se carga proyectado en memoria.
+        -<clave>.json: Términos fuera del vocabulario de cada sentencia.
+'''
+
+import hashlib
+import json
+import os
+import warnings
+import numpy as np
+
+
+#Versión del formato de las entradas. Forma parte de la clave.
+DOCUMENT_CACHE_VERSION='1'
+
+
+class Document_Cache():
+
+    def __init__(self,
+                 directory='',      #Directorio en el que se almacenan las entradas.
+                 fingerprint=''     #Huella del preprocesamiento.
+                 ):
+
+        self.directory=directory
+        self.fingerprint=fingerprint
+        self._fingerprint=DOCUMENT_CACHE_VERSION+':'+fingerprint
+
+        self._hits=0
+        self._misses=0
+
+        #Indica si ya se ha avisado de que no pueden escribirse entradas (el aviso tan solo se muestra una vez).
+        self._write_warned=False
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Recupera un documento preprocesado.
+
+        Input:
+            -text: String. Contenido del documento.
+
+        Output:
+            -Tupla (token_ids, offsets, others) si el documento está en la caché. None si no.
+                -token_ids: Array de enteros (proyectado en memoria). Identificadores de los términos del documento.
+                -offsets: Array de enteros. offsets[i] y offsets[i+1] delimitan los términos de la sentencia i.
+                -others: List. Términos fuera del vocabulario de cada sentencia.
+    '''
+    def get(self, text):
+        path=self._get_path(text)
+
+        try:
+            data=np.load(path+'.npy', mmap_mode='r')
+            with open(path+'.json', 'r', encoding='utf-8') as file_pointer:
+                others=json.load(file_pointer)
+        except (OSError, ValueError):
+            self._misses+=1
+            return None
+
+        self._hits+=1
+
+        num_sentences=int(data[0])
+        offsets=np.array(data[1:num_sentences+2], dtype=np.int64)
+
+        return data[num_sentences+2:], offsets, others
+
+    '''
+        Almacena un documento preprocesado.
+
+        Input:
+            -text: String. Contenido del documento.
+            -sentences: List. Lista de tuplas (sent_ids, sent_others), una por sentencia (ver Text_Analyzer.transform_to_ids).
+            Si la entrada no puede escribirse, se muestra un aviso (la primera vez) y no se almacena.
+    '''
+    def put(self, text, sentences):
+        ids, offsets, others= [], [0], []
+        for sent_ids, sent_others in sentences:
+            ids.extend(sent_ids)
+            offsets.append(len(ids))
+            others.append(sent_others)
+
+        data=np.array([len(others)] + offsets + ids, dtype=np.int32)
+
+        path=self._get_path(text)
+
+        #Los ficheros temporales incluyen el identificador del proceso, de modo que varios procesos pueden escribir la misma entrada.
+        suffix='.'+str(os.getpid())+'.tmp'
+
+        #La caché tan solo acelera el preprocesamiento: si no puede escribirse (directorio de solo lectura, disco lleno, etc),
+        #se avisa y la evaluación continúa.
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            #Escribimos en ficheros temporales y los renombramos, de modo que otro proceso nunca vea una entrada a medio escribir.
+            #Los términos se escriben antes que la matriz: una entrada tan solo se considera completa si existen ambos ficheros.
+            with open(path+'.json'+suffix, 'w', encoding='utf-8') as file_pointer:
+                json.dump(others, file_pointer, ensure_ascii=False)
+
+            with open(path+'.npy'+suffix, 'wb') as file_pointer:
+                np.save(file_pointer, data)
+
+            os.replace(path+'.json'+suffix, path+'.json')
+            os.replace(path+'.npy'+suffix, path+'.npy')
+        except OSError as exception:
+            for temporary in (path+'.json'+suffix, path+'.npy'+suffix):
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+
+            if not self._write_warned:
+                self._write_warned=True
+                warnings.warn('No se ha podido escribir en la caché de documentos '+self.directory+': '+str(exception))
+
+    '''
+        Devuelve las estadísticas de uso de la caché.
+
+        Output:
+            -Dict. Claves: 'hits' y 'misses'.
+    '''
+    def get_statistics(self):
+        return {'hits': self._hits, 'misses': self._misses}
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Devuelve la ruta base de la entrada de un documento. Las entradas se reparten en subdirectorios según los dos primeros caracteres de la clave.
+    def _get_path(self, text):
+        key=hashlib.sha1((self._fingerprint+'\0'+text).encode('utf-8', errors='surrogatepass')).hexdigest()
+
+        return os.path.join(self.directory, key[:2], key)
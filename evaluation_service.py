@@ -0,0 +1,501 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Servicio de evaluación
+
+    Mantiene un único System (con los modelos ya cargados) y atiende peticiones HTTP/JSON, de modo que las herramientas
+    interactivas no pagan el coste de arranque del sistema en cada evaluación.
+
+    Las peticiones concurrentes se agrupan en lotes (micro-batching): un único hilo de evaluación toma las peticiones pendientes,
+    espera como mucho 'service_max_wait' segundos a que lleguen más (hasta 'service_max_batch_size' documentos) y evalúa todos
+    los documentos que comparten criterios en una única pasada de preprocesamiento y evaluación (ver System.check_documents).
+    Además, el System tan solo lo utiliza dicho hilo (y las operaciones sobre los criterios, con exclusión mutua), ya que no
+    puede compartirse entre varios hilos.
+
+    Operaciones (todas las respuestas son JSON):
+        -GET /health: estado del servicio.
+        -GET /criteria: criterios almacenados en el sistema.
+        -POST /criteria: {"criteria": {criterio: [subcriterios]}}. Establece los criterios del sistema.
+        -POST /criteria/extract: {"name": criterio, "articles_path": fichero}. Extrae un nuevo criterio (ver System.criteria_extraction).
+        -POST /check: {"text": contenido, "criteria": {...} (opcional)}. Evalúa un documento (ver System.check_document).
+        -POST /check_batch: {"documents": {nombre: contenido} o [contenidos], "criteria": {...} (opcional)}. Evalúa varios documentos.
+        -GET /statistics: percentiles de latencia de cada operación y tamaño medio de los lotes.
+
+    Uso:
+        python evaluation_service.py --model modelo.bin --model-type es_core_news_sm --stopwords stopwords.txt
+                                     [--criteria criterios.txt] [--host 127.0.0.1] [--port 8000]
+'''
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from utilities import configuration
+from collections import deque
+import argparse
+import json
+import queue
+import threading
+import time
+import numpy as np
+
+
+class Evaluation_Service():
+
+    def __init__(self,
+                 system=None,           #System que evalúa los documentos.
+                 max_batch_size=None,   #Número máximo de documentos por lote. Si no se indica, se utiliza el valor de configuración 'service_max_batch_size'.
+                 max_wait=None          #Espera máxima (segundos) para completar un lote. Si no se indica, se utiliza el valor de configuración 'service_max_wait'.
+                 ):
+
+        self._system=system
+        self._max_batch_size=configuration['service_max_batch_size'] if max_batch_size is None else max_batch_size
+        self._max_wait=configuration['service_max_wait'] if max_wait is None else max_wait
+
+        #Exclusión mutua en el acceso al sistema.
+        self._system_lock=threading.Lock()
+
+        #Peticiones de evaluación pendientes. None indica al hilo de evaluación que debe finalizar.
+        self._queue=queue.Queue()
+
+        self._latencies=Latency_Recorder()
+        self._statistics_lock=threading.Lock()
+        self._batches=0
+        self._batched_documents=0
+
+        self._worker=threading.Thread(target=self._run, name='evaluation-service', daemon=True)
+        self._worker.start()
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Evalúa un documento (ver System.check_document). La evaluación se agrupa con las de las demás peticiones concurrentes.
+
+        Input:
+            -text: String. Contenido del documento.
+            -criteria: Dict. Criterios utilizados. Si no se indican, se utilizan los del sistema.
+
+        Output:
+            -Resultado de System.check_document.
+    '''
+    def check_document(self, text, criteria=None):
+        results=self.check_documents([text], criteria)
+
+        #Si no hay criterios, el sistema devuelve un único mensaje de error.
+        return results if isinstance(results, str) else results[0]
+
+    '''
+        Evalúa una colección de documentos (ver System.check_documents). Los documentos se agrupan con los de las demás
+        peticiones concurrentes.
+
+        Input:
+            -texts: List. Contenido de los documentos.
+            -criteria: Dict. Criterios utilizados. Si no se indican, se utilizan los del sistema.
+
+        Output:
+            -List. Un resultado por documento. Si no hay criterios, el mensaje de error correspondiente (String).
+    '''
+    def check_documents(self, texts, criteria=None):
+        if len(texts)==0:
+            return []
+
+        request=_Evaluation_Request(texts, criteria)
+        self._queue.put(request)
+        request.done.wait()
+
+        if request.error is not None:
+            raise request.error
+
+        return request.results
+
+    '''
+        Devuelve los criterios almacenados en el sistema.
+
+        Output:
+            -Dict.
+    '''
+    def get_criteria(self):
+        with self._system_lock:
+            return self._system.get_criteria()
+
+    '''
+        Establece los criterios del sistema.
+
+        Input:
+            -criteria: Dict. Claves: criterios. Valores: listas de subcriterios.
+    '''
+    def set_criteria(self, criteria):
+        with self._system_lock:
+            self._system.set_criteria_dict(criteria)
+
+    '''
+        Extrae un nuevo criterio y lo añade a los del sistema (ver System.criteria_extraction).
+
+        Input:
+            -criteria_name: String. Nombre del criterio.
+            -articles_path: String. Fichero del que se extrae la información del criterio.
+    '''
+    def extract_criteria(self, criteria_name, articles_path):
+        with self._system_lock:
+            self._system.criteria_extraction(criteria_name=criteria_name, articles_path=articles_path)
+
+    '''
+        Registra la latencia de una operación.
+
+        Input:
+            -operation: String. Nombre de la operación.
+            -elapsed: Float. Latencia (segundos).
+    '''
+    def record_latency(self, operation, elapsed):
+        self._latencies.record(operation, elapsed)
+
+    '''
+        Devuelve las estadísticas del servicio.
+
+        Output:
+            -Dict. Claves: 'latencies' (ver Latency_Recorder.get_percentiles), 'batches' (lotes evaluados) y 'mean_batch_size'
+            (documentos por lote).
+    '''
+    def get_statistics(self):
+        with self._statistics_lock:
+            batches, documents= self._batches, self._batched_documents
+
+        return {'latencies': self._latencies.get_percentiles(),
+                'batches': batches,
+                'mean_batch_size': documents/batches if batches>0 else 0}
+
+    '''
+        Finaliza el hilo de evaluación. Las peticiones ya recibidas se evalúan antes de finalizar.
+    '''
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Hilo de evaluación: agrupa las peticiones pendientes en lotes y los evalúa.
+    def _run(self):
+        finished=False
+        while not finished:
+            request=self._queue.get()
+            if request is None:
+                break
+
+            batch, num_documents= [request], len(request.texts)
+            deadline=time.perf_counter()+self._max_wait
+
+            #Esperamos a que lleguen más peticiones hasta completar el lote o agotar la espera.
+            while num_documents < self._max_batch_size:
+                try:
+                    request=self._queue.get(timeout=max(deadline-time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+
+                if request is None:
+                    finished=True
+                    break
+
+                batch.append(request)
+                num_documents+=len(request.texts)
+
+            #Un error inesperado tan solo afecta a las peticiones del lote: el hilo de evaluación sigue atendiendo las demás.
+            try:
+                self._evaluate_batch(batch)
+            except Exception as exception:
+                for request in batch:
+                    if not request.done.is_set():
+                        request.error=exception
+                        request.done.set()
+
+    #Evalúa un lote de peticiones. Las que comparten criterios se evalúan en una única pasada.
+    def _evaluate_batch(self, batch):
+        groups=dict()
+        for request in batch:
+            #Si los criterios no pueden serializarse (por ejemplo, contienen conjuntos), la petición falla por sí sola.
+            try:
+                key=json.dumps(request.criteria, sort_keys=True) if request.criteria else ''
+            except (TypeError, ValueError) as exception:
+                request.error=exception
+                request.done.set()
+                continue
+
+            groups.setdefault(key, []).append(request)
+
+        for requests in groups.values():
+            self._evaluate_group(requests)
+
+    #Evalúa conjuntamente un grupo de peticiones que comparten criterios. Si la evaluación falla, las peticiones se evalúan
+    #de nuevo por separado, de modo que tan solo falla la que ha provocado el error.
+    def _evaluate_group(self, requests):
+        texts=[text for request in requests for text in request.texts]
+
+        try:
+            with self._system_lock:
+                results=self._system.check_documents(criteria=requests[0].criteria or dict(), texts=texts)
+        except Exception as exception:
+            if len(requests) > 1:
+                for request in requests:
+                    self._evaluate_group([request])
+            else:
+                requests[0].error=exception
+                requests[0].done.set()
+            return
+
+        with self._statistics_lock:
+            self._batches+=1
+            self._batched_documents+=len(texts)
+
+        start=0
+        for request in requests:
+            #Si no hay criterios, el sistema devuelve un único mensaje de error.
+            request.results=results if isinstance(results, str) else results[start:start+len(request.texts)]
+            start+=len(request.texts)
+            request.done.set()
+
+
+#Petición de evaluación pendiente. El hilo de evaluación almacena sus resultados (o el error) y la marca como finalizada.
+class _Evaluation_Request():
+
+    def __init__(self, texts, criteria):
+        self.texts=list(texts)
+        self.criteria=criteria
+        self.results=None
+        self.error=None
+        self.done=threading.Event()
+
+
+'''
+    Almacena las latencias recientes de cada operación y calcula sus percentiles.
+'''
+class Latency_Recorder():
+
+    def __init__(self,
+                 window=None    #Número de latencias recientes por operación. Si no se indica, se utiliza el valor de configuración 'service_latency_window'.
+                 ):
+
+        self._window=configuration['service_latency_window'] if window is None else window
+        self._latencies=dict()
+        self._counts=dict()
+        self._lock=threading.Lock()
+
+    '''
+        Registra la latencia de una operación.
+
+        Input:
+            -operation: String. Nombre de la operación.
+            -elapsed: Float. Latencia (segundos).
+    '''
+    def record(self, operation, elapsed):
+        with self._lock:
+            self._latencies.setdefault(operation, deque(maxlen=self._window)).append(elapsed)
+            self._counts[operation]=self._counts.get(operation, 0)+1
+
+    '''
+        Devuelve los percentiles de latencia de cada operación, calculados sobre las latencias recientes.
+
+        Output:
+            -Dict. Claves: operaciones. Valores: diccionarios con el número total de peticiones ('count') y la media, los
+            percentiles 50, 90, 95 y 99 y el máximo de la latencia ('mean', 'p50', 'p90', 'p95', 'p99', 'max'), en milisegundos.
+    '''
+    def get_percentiles(self):
+        with self._lock:
+            latencies={operation: np.array(values) for operation, values in self._latencies.items()}
+            counts=dict(self._counts)
+
+        result=dict()
+        for operation, values in latencies.items():
+            p50, p90, p95, p99= np.percentile(values, [50, 90, 95, 99])*1000
+            result[operation]={'count': counts[operation],
+                               'mean': float(values.mean()*1000),
+                               'p50': float(p50),
+                               'p90': float(p90),
+                               'p95': float(p95),
+                               'p99': float(p99),
+                               'max': float(values.max()*1000)}
+
+        return result
+
+
+#Servidor HTTP que atiende cada petición en un hilo.
+class Service_HTTP_Server(ThreadingMixIn, HTTPServer):
+
+    daemon_threads=True
+
+    #Las herramientas interactivas pueden abrir muchas conexiones a la vez.
+    request_queue_size=128
+
+    def __init__(self, address, service):
+        HTTPServer.__init__(self, address, _Request_Handler)
+        self.service=service
+
+
+#Atiende las peticiones HTTP del servicio (ver la descripción del módulo).
+class _Request_Handler(BaseHTTPRequestHandler):
+
+    protocol_version='HTTP/1.1'
+
+    def do_GET(self):
+        self._handle({'/health': self._health,
+                      '/criteria': self._get_criteria,
+                      '/statistics': self._statistics})
+
+    def do_POST(self):
+        self._handle({'/criteria': self._set_criteria,
+                      '/criteria/extract': self._extract_criteria,
+                      '/check': self._check,
+                      '/check_batch': self._check_batch})
+
+    #Los accesos no se muestran por pantalla.
+    def log_message(self, format, *args):
+        pass
+
+    #Ejecuta la operación asociada a la ruta, envía su respuesta y registra su latencia.
+    def _handle(self, routes):
+        start=time.perf_counter()
+        path=self.path.split('?')[0].rstrip('/') or '/'
+
+        #El contenido se lee siempre (también en las respuestas de error), de modo que la conexión puede reutilizarse.
+        try:
+            length=int(self.headers.get('Content-Length', 0))
+            if length<0:
+                raise ValueError(str(length))
+        except ValueError:
+            #No sabemos dónde termina el contenido: la conexión no puede reutilizarse.
+            self.close_connection=True
+            self._send(400, {'error': 'Petición no válida: Content-Length incorrecto.'})
+            return
+
+        self._content=self.rfile.read(length) if length>0 else b''
+
+        if not path in routes:
+            self._send(404, {'error': 'Operación desconocida: '+path})
+            return
+
+        try:
+            status, body= routes[path]()
+        except (ValueError, KeyError, TypeError) as exception:
+            status, body= 400, {'error': 'Petición no válida: '+str(exception)}
+        except Exception as exception:
+            status, body= 500, {'error': str(exception)}
+
+        self._send(status, body)
+        self.server.service.record_latency(self.command+' '+path, time.perf_counter()-start)
+
+    #Devuelve el contenido (JSON) de la petición.
+    def _read_body(self):
+        body=json.loads(self._content.decode('utf-8')) if len(self._content)>0 else dict()
+
+        if not isinstance(body, dict):
+            raise ValueError('el contenido debe ser un objeto JSON.')
+
+        return body
+
+    #Envía una respuesta JSON.
+    def _send(self, status, body):
+        content=json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _health(self):
+        return 200, {'status': 'ok'}
+
+    def _get_criteria(self):
+        return 200, {'criteria': self.server.service.get_criteria()}
+
+    def _statistics(self):
+        return 200, self.server.service.get_statistics()
+
+    def _set_criteria(self):
+        criteria=self._read_body()['criteria']
+        self.server.service.set_criteria(criteria)
+        return 200, {'criteria': self.server.service.get_criteria()}
+
+    def _extract_criteria(self):
+        body=self._read_body()
+        self.server.service.extract_criteria(body['name'], body['articles_path'])
+        return 200, {'criteria': self.server.service.get_criteria()}
+
+    def _check(self):
+        body=self._read_body()
+        result=self.server.service.check_document(_check_text(body['text']), body.get('criteria'))
+
+        return _result_response(result, 'result')
+
+    def _check_batch(self):
+        body=self._read_body()
+        documents=body['documents']
+
+        if isinstance(documents, dict):
+            results=self.server.service.check_documents([_check_text(text) for text in documents.values()], body.get('criteria'))
+            if not isinstance(results, str):
+                results=dict(zip(documents.keys(), results))
+        elif isinstance(documents, list):
+            results=self.server.service.check_documents([_check_text(text) for text in documents], body.get('criteria'))
+        else:
+            raise ValueError('documents debe ser una lista o un objeto JSON.')
+
+        return _result_response(results, 'results')
+
+
+#Comprueba que el contenido de un documento es una cadena de caracteres.
+def _check_text(text):
+    if not isinstance(text, str):
+        raise ValueError('el contenido de cada documento debe ser una cadena de caracteres.')
+
+    return text
+
+#Construye la respuesta de una evaluación. Si el sistema no tiene criterios, devuelve un error.
+def _result_response(result, key):
+    if isinstance(result, str) and result.startswith('No se han especificado'):
+        return 400, {'error': result}
+
+    return 200, {key: result}
+
+
+'''
+    Crea el servicio de evaluación y atiende peticiones hasta que se interrumpe.
+
+    Input:
+        -system: System que evalúa los documentos.
+        -host: String. Dirección en la que escucha el servidor.
+        -port: Int. Puerto en el que escucha el servidor.
+'''
+def serve(system, host='127.0.0.1', port=8000):
+    service=Evaluation_Service(system=system)
+    server=Service_HTTP_Server((host, port), service)
+
+    print('Servicio de evaluación escuchando en http://'+host+':'+str(port))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    from system import System
+
+    parser=argparse.ArgumentParser(description='Servicio HTTP/JSON de evaluación de documentos.')
+    parser.add_argument('--model', required=True, help='Modelo de vectorización pre-entrenado.')
+    parser.add_argument('--model-type', default='es_core_news_sm', help='Modelo de Spacy.')
+    parser.add_argument('--stopwords', required=True, help='Fichero de stopwords.')
+    parser.add_argument('--criteria', default='', help='Fichero de criterios.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    arguments=parser.parse_args()
+
+    serve(System(pre_trained_model_file=arguments.model,
+                 model_type=arguments.model_type,
+                 stopwords_file=arguments.stopwords,
+                 criteria_file=arguments.criteria),
+          host=arguments.host,
+          port=arguments.port)
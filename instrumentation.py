@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Instrumentación del sistema
+
+    Mide el tiempo de cada etapa del procesamiento y cuenta los sucesos relevantes (comparaciones, finalizaciones anticipadas,
+    términos fuera del vocabulario, aciertos de las cachés, etc) de cada documento evaluado. Permite saber en qué se emplea el
+    tiempo de una ejecución lenta.
+
+    Etapas medidas:
+        -language_detection: análisis del idioma de los documentos (Remodeling_Module).
+        -sentence_processing: limpieza y lematización de las sentencias (Text_Analyzer). Incluye spacy.
+        -spacy: lematización mediante el pipeline de Spacy (Linguistic_Model).
+        -vectorization: búsqueda de los términos en el vocabulario del modelo (Text_Analyzer).
+        -cosine: semejanza de cosenos entre los términos del vocabulario (Similarity_Engine).
+        -lcs: semejanza entre los términos fuera del vocabulario (Similarity_Engine).
+
+    Contadores:
+        -validity_cache_hits, validity_cache_misses: veredictos de validez obtenidos de la caché o calculados.
+        -document_cache_hits, document_cache_misses: documentos obtenidos de la caché en disco o preprocesados.
+        -sentences, terms, oov_terms: sentencias, términos y términos fuera del vocabulario del documento.
+        -criteria, subcriteria_evaluated, concept_cache_hits: criterios evaluados, subcriterios evaluados y subcriterios cuyo
+        resultado ya se conocía (compartidos por varios criterios).
+        -early_exits: criterios cuyo resultado se decidió sin evaluar todos sus subcriterios.
+        -sentence_comparisons: comparaciones entre un subcriterio y una sentencia.
+
+    Cada documento tiene un informe (ver get_reports) con sus etapas y contadores y con la proporción de términos fuera del
+    vocabulario (oov_rate). Las etapas que se ejecutan por lotes (la lematización de las sentencias de varios documentos) se
+    reparten entre los documentos del lote en proporción a su número de sentencias.
+
+    Además, pueden registrarse funciones (hooks) que reciben cada suceso en el momento en que se produce.
+
+    Si la instrumentación está desactivada, los componentes utilizan NULL_INSTRUMENTATION, cuyos métodos no hacen nada, de modo
+    que su coste es prácticamente nulo.
+'''
+
+import json
+import time
+
+
+class Instrumentation():
+
+    #Los componentes solo calculan los contadores más costosos si la instrumentación está activada.
+    enabled=True
+
+    def __init__(self,
+                 hooks=()       #Funciones hook(event, name, value, document). Ver add_hook.
+                 ):
+
+        self._hooks=list(hooks)
+
+        #Informes de los documentos de la última ejecución. Claves: nombres de los documentos.
+        self._reports=dict()
+
+        #Informes de los documentos del lote actual (por posición) e informe del documento actual.
+        self._batch=list()
+        self._current=None
+
+        #Tiempo de las etapas ejecutadas sin documento actual (por lotes). Se reparte entre los documentos mediante distribute.
+        self._pending=dict()
+
+        #Totales de todas las ejecuciones.
+        self._totals={'stages': dict(), 'counters': dict()}
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Registra una función que recibe cada suceso en el momento en que se produce.
+
+        Input:
+            -hook: Función hook(event, name, value, document).
+                -event: String. 'stage' (etapa finalizada), 'counter' (contador incrementado) o 'document' (documento evaluado).
+                -name: String. Nombre de la etapa o del contador. Nombre del documento en los sucesos 'document'.
+                -value: Tiempo de la etapa (segundos), incremento del contador o informe del documento, respectivamente.
+                -document: String. Nombre del documento actual. None si no hay ninguno.
+    '''
+    def add_hook(self, hook):
+        self._hooks.append(hook)
+
+    '''
+        Comienza una nueva ejecución: descarta los informes de la anterior.
+    '''
+    def start_run(self):
+        self._reports=dict()
+        self._batch=list()
+        self._current=None
+        self._pending=dict()
+
+    '''
+        Establece los documentos del lote actual. Los componentes identifican cada documento por su posición en el lote (ver select).
+
+        Input:
+            -names: List. Nombres de los documentos.
+    '''
+    def begin_batch(self, names):
+        self._batch=[self._reports.setdefault(name, _new_report(name)) for name in names]
+        self._current=None
+        self._pending=dict()
+
+    '''
+        Finaliza el lote actual. Las etapas y contadores posteriores tan solo se asignan al total.
+    '''
+    def end_batch(self):
+        self.begin_batch([])
+
+    '''
+        Selecciona el documento actual: las etapas y contadores posteriores se asignan a él.
+
+        Input:
+            -pos: Int. Posición del documento en el lote. Si es None (o no forma parte del lote), no hay documento actual.
+    '''
+    def select(self, pos):
+        self._current=self._batch[pos] if pos is not None and pos < len(self._batch) else None
+
+    '''
+        Mide el tiempo de una etapa.
+
+        Input:
+            -name: String. Nombre de la etapa.
+
+        Output:
+            -Gestor de contexto (with). Al salir de él, el tiempo se asigna al documento actual o, si no hay ninguno, queda
+            pendiente de repartir (ver distribute).
+    '''
+    def stage(self, name):
+        return _Stage_Timer(self, name)
+
+    '''
+        Incrementa un contador del documento actual (y del total).
+
+        Input:
+            -name: String. Nombre del contador.
+            -value: Int. Incremento.
+    '''
+    def count(self, name, value=1):
+        _add(self._totals['counters'], name, value)
+
+        document=None
+        if self._current is not None:
+            _add(self._current['counters'], name, value)
+            document=self._current['document']
+
+        self._notify('counter', name, value, document)
+
+    '''
+        Reparte el tiempo de las etapas pendientes entre los documentos del lote.
+
+        Input:
+            -weights: Dict. Claves: posiciones de los documentos en el lote. Valores: peso de cada documento (por ejemplo, su número de sentencias).
+    '''
+    def distribute(self, weights):
+        total=sum(weights.values())
+
+        if total > 0:
+            for pos, weight in weights.items():
+                if pos < len(self._batch):
+                    for name, elapsed in self._pending.items():
+                        _add(self._batch[pos]['stages'], name, elapsed*weight/total)
+
+        self._pending=dict()
+
+    '''
+        Indica que la evaluación del documento actual ha finalizado. Notifica su informe a los hooks.
+    '''
+    def complete(self):
+        if self._current is not None:
+            self._notify('document', self._current['document'], _summarize(self._current), self._current['document'])
+
+    '''
+        Devuelve los informes de los documentos de la última ejecución.
+
+        Output:
+            -List. Un diccionario por documento (incluidos los no válidos), en el orden en que se analizan. Claves: 'document' (nombre), 'stages' (segundos por etapa),
+            'counters' (contadores) y 'oov_rate' (proporción de términos fuera del vocabulario).
+    '''
+    def get_reports(self):
+        return [_summarize(report) for report in self._reports.values()]
+
+    '''
+        Devuelve el informe de un documento de la última ejecución.
+
+        Input:
+            -name: String. Nombre del documento.
+
+        Output:
+            -Dict. Ver get_reports. None si el documento no se ha evaluado.
+    '''
+    def get_report(self, name):
+        return _summarize(self._reports[name]) if name in self._reports else None
+
+    '''
+        Devuelve los totales de todas las ejecuciones.
+
+        Output:
+            -Dict. Claves: 'stages', 'counters' y 'oov_rate' (ver get_reports).
+    '''
+    def get_summary(self):
+        return _summarize(self._totals)
+
+    '''
+        Almacena los informes de los documentos de la última ejecución y los totales en un fichero JSON.
+
+        Input:
+            -filename: String. Ubicación del fichero.
+    '''
+    def export_json(self, filename):
+        with open(filename, 'w', encoding='utf-8') as file_pointer:
+            json.dump({'documents': self.get_reports(), 'summary': self.get_summary()}, file_pointer, ensure_ascii=False, indent=2)
+
+    '''
+        Descarta los informes y los totales.
+    '''
+    def reset(self):
+        self.start_run()
+        self._totals={'stages': dict(), 'counters': dict()}
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Asigna el tiempo de una etapa al documento actual (o lo deja pendiente de repartir) y al total.
+    def _add_time(self, name, elapsed):
+        _add(self._totals['stages'], name, elapsed)
+
+        document=None
+        if self._current is not None:
+            _add(self._current['stages'], name, elapsed)
+            document=self._current['document']
+        else:
+            _add(self._pending, name, elapsed)
+
+        self._notify('stage', name, elapsed, document)
+
+    #Notifica un suceso a los hooks.
+    def _notify(self, event, name, value, document):
+        for hook in self._hooks:
+            hook(event, name, value, document)
+
+
+'''
+    Instrumentación desactivada. Ofrece la misma interfaz que Instrumentation, pero no hace nada.
+'''
+class Null_Instrumentation():
+
+    enabled=False
+
+    def add_hook(self, hook):
+        pass
+
+    def start_run(self):
+        pass
+
+    def begin_batch(self, names):
+        pass
+
+    def end_batch(self):
+        pass
+
+    def select(self, pos):
+        pass
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def count(self, name, value=1):
+        pass
+
+    def distribute(self, weights):
+        pass
+
+    def complete(self):
+        pass
+
+    def get_reports(self):
+        return []
+
+    def get_report(self, name):
+        return None
+
+    def get_summary(self):
+        return _summarize({'stages': dict(), 'counters': dict()})
+
+    def export_json(self, filename):
+        with open(filename, 'w', encoding='utf-8') as file_pointer:
+            json.dump({'documents': [], 'summary': self.get_summary()}, file_pointer, indent=2)
+
+    def reset(self):
+        pass
+
+
+#Mide el tiempo de una etapa (ver Instrumentation.stage).
+class _Stage_Timer():
+
+    __slots__=('_instrumentation', '_name', '_start')
+
+    def __init__(self, instrumentation, name):
+        self._instrumentation=instrumentation
+        self._name=name
+
+    def __enter__(self):
+        self._start=time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._instrumentation._add_time(self._name, time.perf_counter()-self._start)
+        return False
+
+
+#Gestor de contexto que no hace nada. Lo comparten todas las etapas de la instrumentación desactivada.
+class _Null_Stage():
+
+    __slots__=()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE=_Null_Stage()
+
+#Instrumentación que utilizan los componentes de forma predeterminada.
+NULL_INSTRUMENTATION=Null_Instrumentation()
+
+
+#Crea el informe vacío de un documento.
+def _new_report(name):
+    return {'document': name, 'stages': dict(), 'counters': dict()}
+
+#Copia un informe y le añade la proporción de términos fuera del vocabulario.
+def _summarize(report):
+    result={key: dict(value) if isinstance(value, dict) else value for key, value in report.items()}
+
+    terms=result['counters'].get('terms', 0)
+    result['oov_rate']=result['counters'].get('oov_terms', 0)/terms if terms > 0 else 0.0
+
+    return result
+
+#Incrementa el valor de una clave de un diccionario.
+def _add(dictionary, key, value):
+    dictionary[key]=dictionary.get(key, 0)+value
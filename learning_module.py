@@ -8,6 +8,9 @@
         -Autoconfiguración del sistema.
 '''
 
+from utilities import configuration
+import numpy as np
+
 class Learning_Module():
     
     
@@ -46,14 +49,20 @@ class Learning_Module():
         Input:
             -results: List. Lista con los resultados obtenidos en la ejecución previa. Cada elemento de la lista consistirá en una tupla con los resultados asociados a cada criterio.
             -expected_results: List. Lista con los resultados esperados. Cada elemento de la lista consistirá en una tupla con las evaluaciones asociadas a cada criterio de cada documento.
+            -resolution: Float. Separación entre los valores umbral candidatos (0.01: valores entre 0 y 1 con dos decimales). Si es 0,
+            se busca el valor exacto entre todos los reales de 0 a 1. Si no se indica, se utiliza el valor de configuración 'threshold_resolution'.
+            
+        Output:
+            -Dict. Claves: posición de cada criterio. Valores: kw_threshold_value asociado. En caso de empate, se escoge el valor más alto.
     '''
     def get_best_kw_threshold_values(self,
                                      results=list(),
-                                     expected_results=list()
+                                     expected_results=list(),
+                                     resolution=None
                                      ):
         
         num_crit=len(expected_results[0]) #Obtenemos el número de criterios a tratar.
-        num_docs=len(results)
+        resolution=configuration['threshold_resolution'] if resolution is None else resolution
     
         percentages, expected= self._prepare_best_kw_value_analysis(results, expected_results, num_crit)
     
@@ -62,27 +71,7 @@ class Learning_Module():
         
         for crit in range(num_crit):
             #Para cada criterio, vemos el valor de kw_treshold value que da una precisión mayor.
-            best_value, best_acc=0, 0
-            
-            #Probamos valores entre 0 y 100.
-            for value in range(101):
-                acc=0                            
-                for pos in range(num_docs):
-                    percentage=percentages[crit][pos]*100
-                    expected_value=expected[crit][pos]
-                         
-                    #Cálculos asociados a la accuracy
-                    if percentage>=value and expected_value=='OK':
-                        acc+=1
-                    elif percentage < value and expected_value=='KO':
-                        acc+=1   
-                
-                #Asociados a la accuracy
-                if acc >= best_acc:
-                    best_value=value
-                    best_acc=acc
-            
-            thresholds[crit]=best_value/100         
+            thresholds[crit]=self._get_best_threshold(percentages.get(crit, []), expected.get(crit, []), resolution)
                 
         return thresholds
     
@@ -175,6 +164,33 @@ class Learning_Module():
                     
         return results
     
+    #Devuelve el valor umbral que maximiza la accuracy de un criterio.
+    #Los porcentajes de los documentos OK y KO se ordenan una única vez. Para cada valor candidato, el número de aciertos se obtiene
+    #mediante búsqueda binaria: OK con porcentaje >= valor más KO con porcentaje < valor.
+    def _get_best_threshold(self, percentages, expected, resolution):
+        percentages=np.array(percentages, dtype=np.float64)
+        expected=np.array(expected, dtype=object)
+        
+        if resolution > 0:
+            #Los valores candidatos son k/steps, con k entero. Se compara porcentaje*steps >= k, como en la búsqueda original (steps=100).
+            steps=int(round(1/resolution))
+            percentages=percentages*steps
+            candidates=np.arange(steps+1, dtype=np.float64)
+        else:
+            #La accuracy tan solo cambia en los porcentajes obtenidos. El valor más alto de cada tramo constante es uno de ellos (o 1).
+            steps=1
+            candidates=np.union1d(percentages[(percentages >= 0) & (percentages <= 1)], [0, 1])
+        
+        ok=np.sort(percentages[expected=='OK'])
+        ko=np.sort(percentages[expected=='KO'])
+        
+        acc=len(ok) - np.searchsorted(ok, candidates, side='left') + np.searchsorted(ko, candidates, side='left')
+        
+        #En caso de empate, se escoge el valor más alto.
+        best=len(candidates) - 1 - int(np.argmax(acc[::-1]))
+        
+        return float(candidates[best])/steps
+    
     def _prepare_best_kw_value_analysis(self, results, expected_results, num_crit):
         percentages=dict()   #X listas. una para cada criterio.
         expected=dict()      #X listas. una para cada criterio.
@@ -12,10 +12,31 @@
 
     Requisitos extra:
     -pip install spacy-langdetect
+    
+    El modelo utiliza dos pipelines de Spacy independientes:
+        -Lematización: el modelo de Spacy indicado, cargado según un perfil que determina qué componentes se desactivan. 
+        El perfil 'lemmatize' (predeterminado) conserva tan solo los componentes necesarios para obtener los lemas.
+        -Detección del idioma: un pipeline vacío del mismo idioma al que se añade el detector de idioma. Tan solo se carga
+        la primera vez que se utiliza detect_language.
+    
+    langdetect es probabilístico. La primera vez que se detecta un idioma (detect_language o detect_language_fast), se fija su 
+    semilla (DetectorFactory.seed, global) para que el veredicto sobre un mismo texto sea siempre el mismo. Importar el módulo
+    no la modifica.
 '''
 
 import spacy
 from spacy_langdetect import LanguageDetector
+from langdetect import detect_langs, DetectorFactory
+from langdetect.lang_detect_exception import LangDetectException
+from utilities import configuration, LRU_Cache
+from instrumentation import NULL_INSTRUMENTATION
+
+
+#Componentes que se desactivan en cada perfil del pipeline de lematización.
+PIPELINE_PROFILES={
+    'lemmatize': ['parser', 'ner', 'senter', 'textcat', 'entity_linker', 'entity_ruler'],
+    'full': []
+}
 
 
 class Linguistic_Model():
@@ -24,17 +45,30 @@ class Linguistic_Model():
     '''
         model_type: modelo de spacy utilizado. De forma predeterminada, utiliza el modelo 'es_core_news_sm'.
         stopwords_file: ubicación del fichero de stopwords que utilizará el sistema.
+        pipeline_profile: perfil del pipeline de lematización (ver PIPELINE_PROFILES).
+        nlp: pipeline ya cargado (por ejemplo, un lematizador sustituto en las pruebas de rendimiento). Si se indica, no se carga model_type.
+        Debe ofrecer la misma interfaz que un pipeline de Spacy: llamada, pipe y lang, con tokens que incluyan text, lemma_, whitespace_ e i.
     '''
     def __init__(self, 
                  model_type='',
-                 stopwords_file=''
+                 stopwords_file='',
+                 pipeline_profile='lemmatize',
+                 nlp=None
                 ):
         
-        self._nlp=spacy.load(model_type)
-        self._nlp.add_pipe(LanguageDetector(), name='language_detector', last=True)
+        self._nlp=spacy.load(model_type, disable=PIPELINE_PROFILES[pipeline_profile]) if nlp is None else nlp
+        self._model_type=model_type
+        self._pipeline_profile=pipeline_profile
+        self._language_nlp=None  #Pipeline de detección del idioma. Se carga la primera vez que se utiliza.
+        
+        #Caché término -> lema (incluye el espacio final). Permite lematizar sin Spacy si todos los términos ya se han visto.
+        self._lemma_cache=LRU_Cache(max_size=configuration['lemma_cache_size'])
         
         #Representado como diccionario para tener un tiempo de acceso menor.
         self._stopwords=self._load_stopwords(file=stopwords_file)
+        
+        #Instrumentación (ver Instrumentation). Mide el tiempo empleado por Spacy.
+        self.instrumentation=NULL_INSTRUMENTATION
 
     '''
         MÉTODOS PRINCIPALES`
@@ -50,8 +84,27 @@ class Linguistic_Model():
             -String. Cadena de caracteres que identifica el lenguaje del texto.
     '''
     def detect_language(self,text=''):
-        doc=self._nlp(text)
+        doc=self._get_language_pipeline()(text)
         return doc._.language['language'] 
+    
+    '''
+        Dado un texto, identifica el idioma sin pasar por Spacy. Utiliza directamente el mismo detector (langdetect) que el 
+        pipeline de detección del idioma, de modo que el resultado es el mismo, pero evita la tokenización. La primera llamada 
+        fija la semilla de langdetect (ver la descripción del módulo).
+        
+        Input:
+            -text: String. Texto del cual queremos obtener el idioma.
+        
+        Output:
+            -String. Cadena de caracteres que identifica el lenguaje del texto. Cadena vacía si no se puede identificar (p.e: el texto no contiene letras).
+    '''
+    def detect_language_fast(self,text=''):
+        _seed_language_detector()
+        
+        try:
+            return str(detect_langs(text)[0].lang)
+        except LangDetectException:
+            return ''
 
 
 
@@ -65,12 +118,86 @@ class Linguistic_Model():
             -String. Frase lemanizada.
     '''
     def lemmatize_using_spacy(self,sentence):
+        cached=self._lemmatize_from_cache(sentence)
+        if cached is not None:
+            return cached
+        
         result=''
-        for token in self._nlp(sentence):
+        doc=self._nlp(sentence)
+        for token in doc:
             result+=token.lemma_ + ' '
+            
+        self._store_lemmas(doc)
 
         return result
     
+    '''
+        Lematiza una colección de textos procesándolos por lotes (nlp.pipe), lo que evita el coste fijo de una llamada a Spacy por texto.
+        
+        Input:
+            -sentences: List. Frases a lematizar.
+            -batch_size: Int. Número de frases por lote. Si no se indica, se utiliza el valor de configuración 'spacy_batch_size'.
+            
+        Output:
+            -List. Frases lematizadas, en el mismo orden. Cada una coincide con el resultado de lemmatize_using_spacy.
+    '''
+    def lemmatize_many(self, sentences, batch_size=None):
+        batch_size= configuration['spacy_batch_size'] if batch_size is None else batch_size
+        
+        result=[self._lemmatize_from_cache(sentence) for sentence in sentences]
+        pending=[pos for pos, lemmatized in enumerate(result) if lemmatized is None]
+        
+        with self.instrumentation.stage('spacy'):
+            for pos, doc in zip(pending, self._nlp.pipe([sentences[x] for x in pending], batch_size=batch_size)):
+                result[pos]=''.join(token.lemma_ + ' ' for token in doc)
+                self._store_lemmas(doc)
+            
+        return result
+    
+    '''
+        Devuelve el pipeline de lematización si puede compartirse con otro componente que necesita el modelo indicado 
+        completo (por ejemplo, el extractor de criterios), evitando cargar el mismo modelo dos veces.
+        
+        Input:
+            -model_type: String. Modelo de Spacy que necesita el otro componente.
+            
+        Output:
+            -Pipeline de Spacy. None si el modelo es distinto o el perfil del pipeline desactiva algún componente.
+    '''
+    def get_pipeline(self, model_type):
+        if model_type == self._model_type and not PIPELINE_PROFILES[self._pipeline_profile]:
+            return self._nlp
+        
+        return None
+    
+    '''
+        Devuelve una descripción del pipeline de lematización que lo identifica (clase, idioma, nombre y versión del modelo y
+        componentes activos). Incluye los pipelines indicados mediante nlp.
+        
+        Output:
+            -String.
+    '''
+    def get_pipeline_identity(self):
+        nlp=self._nlp
+        meta=getattr(nlp, 'meta', None) or dict()
+        
+        fields=[type(nlp).__module__+'.'+type(nlp).__qualname__,
+                str(getattr(nlp, 'lang', '')),
+                str(meta.get('name', '')),
+                str(meta.get('version', '')),
+                ','.join(getattr(nlp, 'pipe_names', []))]
+        
+        return '|'.join(fields)
+    
+    '''
+        Devuelve las estadísticas de uso de la caché de lemas.
+        
+        Output:
+            -Dict. Ver LRU_Cache.get_statistics.
+    '''
+    def get_cache_statistics(self):
+        return self._lemma_cache.get_statistics()
+    
     '''
         Devuelve las stopwords utilizadas por el sistema.
         Los devuelve como diccionario para reducir el tiempo de búsqueda y acceso.
@@ -84,6 +211,49 @@ class Linguistic_Model():
     '''
         MÉTODOS INTERNOS
     '''
+    #Lematiza una frase a partir de la caché de lemas, sin utilizar Spacy. Devuelve None si no es posible.
+    def _lemmatize_from_cache(self, sentence):
+        if not configuration['token_lemma_cache']:
+            return None
+        
+        words=sentence.split()
+        
+        #Tan solo se admiten frases con un único espacio entre términos (Spacy genera tokens adicionales para el resto de espacios).
+        if len(words)==0 or not sentence in (' '.join(words), ' '.join(words)+' '):
+            return None
+        
+        result=''
+        for word in words:
+            lemmas=self._lemma_cache.get(word)
+            if lemmas is None:
+                return None
+            result+=lemmas
+            
+        return result
+    
+    #Almacena en la caché los lemas de cada término (delimitado por espacios) de un documento de Spacy.
+    def _store_lemmas(self, doc):
+        if not configuration['token_lemma_cache']:
+            return
+        
+        word, lemmas='', ''
+        for token in doc:
+            word+=token.text
+            lemmas+=token.lemma_ + ' '
+            
+            if token.whitespace_ or token.i == len(doc)-1:
+                self._lemma_cache.put(word, lemmas)
+                word, lemmas='', ''
+    
+    #Devuelve el pipeline de detección del idioma. Lo crea (y fija la semilla de langdetect) si todavía no existe.
+    def _get_language_pipeline(self):
+        if self._language_nlp is None:
+            _seed_language_detector()
+            self._language_nlp=spacy.blank(self._nlp.lang)
+            self._language_nlp.add_pipe(LanguageDetector(), name='language_detector', last=True)
+            
+        return self._language_nlp
+    
     #Carga las stopwords del fichero donde están ubicados.
     def _load_stopwords(self, file=''):
         stopwords=dict()
@@ -96,3 +266,16 @@ class Linguistic_Model():
         return stopwords
         
         
+
+
+#Indica si ya se ha fijado la semilla de langdetect.
+_detector_seeded=False
+
+#Fija la semilla de langdetect (probabilístico) para que el veredicto sobre un mismo texto sea siempre el mismo. Tan solo
+#se hace una vez, al construir el primer detector, y no al importar el módulo.
+def _seed_language_detector():
+    global _detector_seeded
+    
+    if not _detector_seeded:
+        DetectorFactory.seed=0
+        _detector_seeded=True
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Motor de semejanza entre términos fuera del vocabulario
+
+    Compara términos que no tienen representación en el espacio vectorial (acrónimos, anglicismos, códigos, etc) atendiendo
+    al longest common substring entre ellos. El resultado es el porcentaje (entre 0 y 1) de caracteres comunes, atendiendo a
+    la media de los caracteres de ambos términos.
+
+    En lugar de rellenar la tabla de sufijos completa, la longitud del longest common substring se obtiene mediante una
+    búsqueda binaria sobre la longitud: existe una subcadena común de longitud k si algún fragmento de longitud k del término
+    más corto aparece entre los del más largo. Cada paso utiliza memoria lineal y las comparaciones las realiza Python
+    internamente (conjuntos de cadenas).
+
+    Los resultados de cada par de términos se almacenan en una caché LRU, de modo que se reutilizan entre sentencias y documentos.
+
+    Además, los términos fuera del vocabulario de cada documento se indexan por sus n-gramas de caracteres (NGram_Index). Si dos
+    términos comparten algún n-grama de longitud k pero ninguno de longitud k+1, su longest common substring mide exactamente k.
+    Por lo tanto, tan solo es necesario calcularlo para los pares que comparten algún n-grama de la longitud máxima del índice.
+'''
+
+from utilities import configuration, LRU_Cache
+import numpy as np
+
+
+class OOV_Similarity_Engine():
+
+    def __init__(self,
+                 cache_size=None    #Número máximo de pares almacenados. Si no se indica, se utiliza el valor de configuración 'oov_cache_size'.
+                 ):
+
+        self._cache=LRU_Cache(max_size=configuration['oov_cache_size'] if cache_size is None else cache_size)
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Compara dos términos atendiendo al longest common substring entre ellos.
+
+        Input:
+            -x: String. Primer término.
+            -y: String. Segundo término.
+
+        Output:
+            -Float. Porcentaje (entre 0 y 1) de caracteres comunes, atendiendo a la media de los caracteres de ambos términos.
+    '''
+    def similarity(self, x, y):
+        #La semejanza es simétrica: ambos órdenes comparten la misma entrada de la caché.
+        key=(x, y) if x <= y else (y, x)
+
+        result=self._cache.get(key)
+        if result is None:
+            result=longest_common_substring_length(x, y)/((len(x)+len(y))/2)
+            self._cache.put(key, result)
+
+        return result
+
+    '''
+        Compara un término con una colección de términos.
+
+        Input:
+            -term: String. Término a comparar.
+            -candidates: List. Términos con los que se compara.
+            -index: NGram_Index. Índice de n-gramas de los candidatos. Si se indica, tan solo se compara explícitamente con los
+            candidatos cuyo resultado no puede deducirse del índice.
+
+        Output:
+            -Array de numpy (float64). Semejanza del término con cada candidato, en el mismo orden.
+    '''
+    def similarities(self, term, candidates, index=None):
+        if index is not None:
+            return self._similarities_using_index(term, candidates, index)
+
+        result=np.zeros(len(candidates), dtype=np.float64)
+
+        for pos, candidate in enumerate(candidates):
+            result[pos]=self.similarity(term, candidate)
+
+        return result
+
+    '''
+        Devuelve las estadísticas de uso de la caché de pares.
+
+        Output:
+            -Dict. Ver LRU_Cache.get_statistics.
+    '''
+    def get_cache_statistics(self):
+        return self._cache.get_statistics()
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Compara un término con los candidatos de un índice de n-gramas. El resultado es el mismo que el de la comparación explícita.
+    def _similarities_using_index(self, term, candidates, index):
+        common=index.get_common_lengths(term)
+
+        #Si el n-grama común más largo es menor que los del índice, coincide con el longest common substring.
+        result=common/((len(term)+index.lengths)/2)
+
+        for pos in np.flatnonzero(common==index.max_n):
+            result[pos]=self.similarity(term, candidates[pos])
+
+        return result
+
+
+'''
+    Índice invertido de n-gramas de caracteres sobre una colección de términos.
+
+    Para cada longitud entre 1 y max_n, asocia cada n-grama con las posiciones de los términos que lo contienen.
+'''
+class NGram_Index():
+
+    def __init__(self,
+                 terms=list(),  #Términos indexados.
+                 max_n=None     #Longitud máxima de los n-gramas. Si no se indica, se utiliza el valor de configuración 'oov_ngram_size'.
+                 ):
+
+        self.max_n=configuration['oov_ngram_size'] if max_n is None else max_n
+        self.lengths=np.array([len(term) for term in terms], dtype=np.float64)
+
+        self._index=[dict() for _ in range(self.max_n+1)]
+        for pos, term in enumerate(terms):
+            for n in range(1, self.max_n+1):
+                for ngram in _get_ngrams(term, n):
+                    self._index[n].setdefault(ngram, []).append(pos)
+
+    '''
+        Determina, para cada término indexado, la longitud del n-grama más largo (hasta max_n) que comparte con el término introducido.
+
+        Input:
+            -term: String.
+
+        Output:
+            -Array de numpy (float64). Un valor entre 0 y max_n por cada término indexado.
+    '''
+    def get_common_lengths(self, term):
+        result=np.zeros(len(self.lengths), dtype=np.float64)
+
+        for n in range(1, self.max_n+1):
+            positions=[pos for ngram in _get_ngrams(term, n) for pos in self._index[n].get(ngram, ())]
+
+            #Un término que no comparte ningún n-grama de longitud n tampoco comparte ninguno más largo.
+            if len(positions)==0:
+                break
+
+            result[positions]=n
+
+        return result
+
+
+#Devuelve los n-gramas de caracteres (sin repeticiones) de un término.
+def _get_ngrams(term, n):
+    return {term[i:i+n] for i in range(len(term)-n+1)}
+
+
+'''
+    Calcula la longitud del longest common substring de dos cadenas de caracteres.
+
+    Input:
+        -x: String.
+        -y: String.
+
+    Output:
+        -Int. Longitud de la subcadena común más larga.
+'''
+def longest_common_substring_length(x, y):
+    if len(x) > len(y):
+        x, y= y, x
+
+    if len(x)==0:
+        return 0
+
+    if x in y:
+        return len(x)
+
+    #Búsqueda binaria: si existe una subcadena común de longitud k, también existe una de longitud k-1.
+    low, high= 0, len(x)-1
+    while low < high:
+        size=(low+high+1)//2
+        fragments={x[i:i+size] for i in range(len(x)-size+1)}
+
+        if any(y[j:j+size] in fragments for j in range(len(y)-size+1)):
+            low=size
+        else:
+            high=size-1
+
+    return low
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Módulo de ejecución en paralelo
+
+    Reparte la evaluación (y el filtrado) de una colección de documentos entre varios procesos.
+
+    Cada proceso carga los modelos una única vez, al crearse, y los reutiliza en todas las tareas que recibe. Si los procesos
+    se crean mediante fork, heredan directamente el sistema que los crea, sin volver a cargar nada.
+
+    Los documentos se agrupan en bloques atendiendo a su longitud: los más largos se envían primero y en bloques más pequeños,
+    de modo que ningún proceso se queda evaluando un documento largo mientras los demás esperan. Los resultados se devuelven
+    en el orden original de los documentos, igual que en la ejecución secuencial.
+'''
+
+from utilities import configuration
+import multiprocessing
+
+
+#Sistema que heredan los procesos creados mediante fork.
+_inherited_system=None
+
+#Sistema utilizado por el proceso actual (en los procesos de trabajo) y últimos criterios compilados.
+_worker_system=None
+_worker_compiled_criteria=None
+
+
+class Parallel_Executor():
+
+    def __init__(self,
+                 system=None,               #System que crea los procesos.
+                 system_arguments=dict(),   #Parámetros con los que se construye un System en cada proceso (si no se utiliza fork).
+                 workers=1,                 #Número de procesos.
+                 chunk_size=None            #Número máximo de documentos por bloque. Si no se indica, se utiliza el valor de configuración 'chunk_size'.
+                 ):
+
+        global _inherited_system
+
+        self.workers=workers
+        self._chunk_size=configuration['chunk_size'] if chunk_size is None else chunk_size
+
+        _inherited_system=system
+        try:
+            self._pool=multiprocessing.Pool(processes=workers,
+                                            initializer=_init_worker,
+                                            initargs=(system_arguments, dict(configuration)))
+        finally:
+            _inherited_system=None
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Evalúa una colección de documentos en base a una serie de criterios.
+
+        Input:
+            -criteria: Dict. Criterios utilizados.
+            -texts: List. Contenido de los documentos.
+            -Los demás parámetros son los de System.multiple_executions.
+
+        Output:
+            -List. Resultados de cada documento, en el mismo orden que los textos introducidos.
+    '''
+    def evaluate(self,
+                 criteria,
+                 texts,
+                 autoconfigure_flag=False,
+                 get_found=False,
+                 clean=True
+                 ):
+
+        flags={'autoconfigure_flag': autoconfigure_flag, 'get_found': get_found, 'clean': clean}
+        tasks=[(criteria, [(pos, texts[pos]) for pos in chunk], flags, dict(configuration)) for chunk in self._get_chunks(texts)]
+
+        return self._run(_evaluate_chunk, tasks, len(texts))
+
+    '''
+        Calcula la mejor semejanza de cada documento con cada subcriterio (ver System.build_score_tensor).
+
+        Input:
+            -criteria: Dict. Criterios utilizados.
+            -texts: List. Contenido de los documentos.
+
+        Output:
+            -List. Un array de floats de 32 por documento (un valor por subcriterio distinto), en el mismo orden que los textos introducidos.
+    '''
+    def score(self, criteria, texts):
+        tasks=[(criteria, [(pos, texts[pos]) for pos in chunk], dict(configuration)) for chunk in self._get_chunks(texts)]
+
+        return self._run(_score_chunk, tasks, len(texts))
+
+    '''
+        Determina la validez (ver Remodeling_Module.check_text_validity) de una colección de documentos.
+
+        Input:
+            -texts: List. Contenido de los documentos.
+
+        Output:
+            -List. Un Boolean por documento, en el mismo orden que los textos introducidos.
+    '''
+    def check_validity(self, texts):
+        tasks=[([(pos, texts[pos]) for pos in chunk], dict(configuration)) for chunk in self._get_chunks(texts)]
+
+        return self._run(_check_validity_chunk, tasks, len(texts))
+
+    '''
+        Finaliza los procesos.
+    '''
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Ejecuta las tareas y coloca cada resultado en la posición original de su documento.
+    def _run(self, function, tasks, num_results):
+        results=[None]*num_results
+
+        for chunk_results in self._pool.imap_unordered(function, tasks):
+            for pos, result in chunk_results:
+                results[pos]=result
+
+        return results
+
+    #Agrupa las posiciones de los documentos en bloques, de los más largos a los más cortos.
+    #Cada bloque acumula, como mucho, una fracción del total de caracteres, de modo que los documentos largos forman bloques propios.
+    def _get_chunks(self, texts):
+        order=sorted(range(len(texts)), key=lambda pos: -len(texts[pos]))
+        target=max(1, sum(len(text) for text in texts)//(self.workers*4))
+
+        chunks, current, size= list(), list(), 0
+        for pos in order:
+            current.append(pos)
+            size+=len(texts[pos])
+
+            if size >= target or len(current) >= self._chunk_size:
+                chunks.append(current)
+                current, size= list(), 0
+
+        if len(current)>0:
+            chunks.append(current)
+
+        return chunks
+
+
+'''
+    FUNCIONES DE LOS PROCESOS DE TRABAJO
+'''
+
+#Inicializa un proceso de trabajo: reutiliza el sistema heredado o construye uno nuevo (carga los modelos una única vez).
+def _init_worker(system_arguments, configuration_values):
+    global _worker_system
+
+    configuration.update(configuration_values)
+
+    if _inherited_system is not None:
+        _worker_system=_inherited_system
+    else:
+        from system import System
+        _worker_system=System(**system_arguments)
+
+#Devuelve los criterios compilados del proceso actual. Los criterios se compilan una única vez por proceso mientras no cambien.
+def _get_worker_compiled_criteria(criteria):
+    global _worker_compiled_criteria
+
+    if _worker_compiled_criteria is None or not _worker_compiled_criteria.matches(criteria):
+        _worker_compiled_criteria=_worker_system._get_compiled_criteria(criteria)
+
+    return _worker_compiled_criteria
+
+#Evalúa un bloque de documentos. Devuelve una lista de tuplas (posición, resultado).
+def _evaluate_chunk(task):
+    criteria, documents, flags, configuration_values= task
+    configuration.update(configuration_values)
+
+    results=_worker_system._evaluate_documents(criteria,
+                                               [text for _, text in documents],
+                                               compiled_criteria=_get_worker_compiled_criteria(criteria),
+                                               **flags)
+
+    return [(pos, result) for (pos, _), result in zip(documents, results)]
+
+#Calcula las semejanzas de un bloque de documentos. Devuelve una lista de tuplas (posición, array de semejanzas).
+def _score_chunk(task):
+    criteria, documents, configuration_values= task
+    configuration.update(configuration_values)
+
+    results=_worker_system._score_documents(criteria,
+                                            [text for _, text in documents],
+                                            compiled_criteria=_get_worker_compiled_criteria(criteria))
+
+    return [(pos, result) for (pos, _), result in zip(documents, results)]
+
+#Determina la validez de un bloque de documentos. Devuelve una lista de tuplas (posición, Boolean).
+def _check_validity_chunk(task):
+    documents, configuration_values= task
+    configuration.update(configuration_values)
+
+    return [(pos, _worker_system._rm.check_text_validity(text)) for pos, text in documents]
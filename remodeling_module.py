@@ -10,9 +10,19 @@
     
     Los documentos no válidos son aquellos que son muy cortos (de forma predeterminada, aquellos documentos con menos de 50 términos) o que no están en español.
     
+    Para identificar el idioma tan solo se analizan los primeros términos del documento. Los veredictos se almacenan en una caché
+    indexada por el hash del contenido, de modo que un documento ya analizado (en la misma ejecución o, si se indica el fichero 
+    de caché en la configuración, en una ejecución anterior) no vuelve a analizarse.
+    
 '''
 
-from utilities import configuration
+from utilities import configuration, LRU_Cache
+from instrumentation import NULL_INSTRUMENTATION
+import hashlib
+import itertools
+import json
+import os
+import re
 
 class Remodeling_Module():
 
@@ -22,6 +32,17 @@ class Remodeling_Module():
         
         self._text_analyzer=text_analyzer
         
+        #Caché de veredictos de validez. Claves: hash del contenido (y del tamaño mínimo). Valores: Boolean.
+        #Tiene un tamaño máximo ('validity_cache_size'), de modo que la memoria no crece con el número de documentos analizados.
+        #El fichero de la configuración ('validity_cache_file') se carga la primera vez que se utiliza (ver _get_validity_cache).
+        self._validity_cache=LRU_Cache(max_size=configuration['validity_cache_size'])
+        self._validity_cache_file=None
+        
+        #Veredictos que todavía no se han almacenado en el fichero.
+        self._new_verdicts=dict()
+        
+        #Instrumentación (ver Instrumentation). Mide la detección del idioma y los aciertos de la caché de veredictos.
+        self.instrumentation=NULL_INSTRUMENTATION
         
         
     '''
@@ -39,6 +60,8 @@ class Remodeling_Module():
             -csv_file_content: String. Ubicación del fichero csv que incluye el contenido de los documentos a utilizar.
             -csv_file_evaluation: String. Ubicación del fichero csv que incluye las evaluaciones asociadas a los documentos a utilizar.
             -separator: String. Símbolo que sirve de separador dentro de los ficheros csv.
+            -validity_checker: Función que, dada una lista de textos, devuelve su validez (lista de Boolean). Permite, por ejemplo,
+            evaluarla en paralelo. Si no se indica, se utiliza check_text_validity.
             
         Output:
             -files_evals: Dict. Diccionario cuyas claves son los nombres de los ficheros y los valores las evaluaciones asociadas a cada criterio.
@@ -50,7 +73,8 @@ class Remodeling_Module():
     def prepare_and_filter_docs(self,
                                 csv_file_content='',
                                 csv_file_evaluations='',
-                                separator=';'
+                                separator=';',
+                                validity_checker=None
                                ):
         
         #dict. claves: nombres de los docs. valores: evaluaciones (lista de OK/KO) por criterio.
@@ -67,7 +91,7 @@ class Remodeling_Module():
             files[x]=files_contents[x]
                 
         #filtramos los documentos.
-        correct=self._filter_unvalid_files(files=files)
+        correct=self._filter_unvalid_files(files=files, validity_checker=validity_checker)
         
         files_evals=dict()
         files_cont=dict()
@@ -91,19 +115,46 @@ class Remodeling_Module():
             -Boolean. True si es válido. False si no.
     '''
     def check_text_validity(self,text):
-        size=0
-        words=''
+        min_text_size=configuration['min_text_size']
+        key=self._get_validity_key(text, min_text_size)
+        valid=self._get_validity_cache().get(key)
+        
+        if valid is not None:
+            self.instrumentation.count('validity_cache_hits')
+            return valid
+        
+        self.instrumentation.count('validity_cache_misses')
+        
+        with self.instrumentation.stage('language_detection'):
+            #Tan solo se recorren los primeros min_text_size términos del documento.
+            words=[x.group() for x in itertools.islice(re.finditer(r'\S+', text), min_text_size)] if min_text_size > 0 else []
             
-        paragraphs=text.split('\n')
-        for x in paragraphs:
-            for y in x.split():
-                size+=1
-                words+=y+' '
-                
-                if size == configuration['min_text_size'] and self._check_language(words.lower()):
-                    return True
-         
-        return False
+            valid= min_text_size > 0 and len(words) == min_text_size and self._check_language((' '.join(words) + ' ').lower())
+        
+        self._store_verdict(key, valid)
+        
+        return valid
+    
+    '''
+        Almacena los nuevos veredictos de validez en el fichero indicado en la configuración ('validity_cache_file').
+        Si no se ha indicado ningún fichero o no hay veredictos nuevos, no hace nada.
+        
+        Los veredictos se añaden al final del fichero (un objeto JSON por línea), de modo que nunca se pierden los de las
+        ejecuciones anteriores ni los de otros procesos que utilizan el mismo fichero.
+    '''
+    def save_validity_cache(self):
+        filename=configuration['validity_cache_file']
+        
+        if filename=='' or len(self._new_verdicts)==0:
+            return
+        
+        #Los ficheros del formato anterior (un único objeto JSON) no terminan con un salto de línea.
+        separator='\n' if os.path.exists(filename) and not _ends_with_newline(filename) else ''
+        
+        with open(filename, 'a', encoding='utf-8') as file_pointer:
+            file_pointer.write(separator+json.dumps(self._new_verdicts)+'\n')
+            
+        self._new_verdicts=dict()
     
     '''
         Obtiene los resultados obtenidos si hubiesemos aplicado una colección filtrada de criterios.
@@ -145,38 +196,103 @@ class Remodeling_Module():
         return filtered_results
         
     #Devuelve dos listas con los NOMBRES de los docs correctos y los incorrectos.
+    #validity_checker: función opcional que, dada una lista de textos, devuelve su validez. Solo se utiliza para los textos que no están en la caché.
     def filter_files(self,
-                       files=dict()
+                       files=dict(),
+                       validity_checker=None
                        ):
         correct=list()
         incorrect=list()
         
-        for filename, filecontent in files.items():
+        verdicts=self.check_texts_validity(list(files.values()), validity_checker)
+        
+        for filename, valid in zip(files.keys(), verdicts):
             
-            if self.check_text_validity(filecontent):
+            if valid:
                 correct.append(filename)
             else:
                 incorrect.append(filename)
+        
+        self.save_validity_cache()
                 
         return correct, incorrect
     
     #Lee el contenido de los textos a partir del csv correspondiente.
     #Presupone que el contenido del csv incluye una cabecera.
     def read_text_content_from_csv(self,csv_file='', separator=''):
+        #Diccionario cuyas claves serán el nombre del fichero y el valor será el contenido del mismo.
+        return dict(self.iter_text_content_from_csv(csv_file=csv_file, separator=separator))
+    
+    #Lee el contenido de los textos del csv línea a línea, sin cargar el fichero completo en memoria.
+    #Devuelve un generador de tuplas (nombre del fichero, contenido), en el orden del csv. Presupone que el csv incluye una cabecera.
+    def iter_text_content_from_csv(self, csv_file='', separator=''):
         with open(csv_file, 'r', encoding='latin-1') as f:
-            csv_content=f.read()
+            next(f, None) #Descartamos la cabecera
             
-        result=dict() #Diccionario cuyas claves serán el nombre del fichero y el valor será el contenido del mismo.
-        files= csv_content.split('\n')
-        files.pop(0) #Eliminamos la cabecera
-        
-        for file in files:            
-            fields= file.split(separator)
+            for line in f:
+                fields= line.rstrip('\n').split(separator)
+                
+                if len(fields) > 1: #Si no es una línea vacía (la última).
+                    yield fields[2], fields[3]
     
-            if len(fields) > 1: #Si no es una línea vacía (la última).
-                result[fields[2]]=fields[3]
+    '''
+        Lee las evaluaciones esperadas de una colección de documentos.
+        
+        Input:
+            -csv_file: String. Ubicación del csv de evaluaciones (mismo formato que el utilizado en la autoconfiguración).
+            -separator: String. Separador utilizado en el csv.
+            
+        Output:
+            -Dict. Claves: nombres de los documentos. Valores: lista de evaluaciones (OK/KO), una por criterio.
+    '''
+    def read_evaluations_from_csv(self, csv_file='', separator=';'):
+        return self._read_csv_files_evaluations(csv_file=csv_file, separator=separator)
     
-        return result           
+    '''
+        Dada una colección de textos, evalúa la validez de cada uno (ver check_text_validity).
+        
+        Input:
+            -texts: List. Textos a evaluar.
+            -validity_checker: Función que, dada una lista de textos, devuelve su validez (lista de Boolean). Tan solo se
+            utiliza con los textos cuyo veredicto no está en la caché. Si no se indica, se utiliza check_text_validity.
+            
+        Output:
+            -List. Un Boolean por texto, en el mismo orden.
+    '''
+    def check_texts_validity(self, texts, validity_checker=None):
+        instrumentation=self.instrumentation
+        
+        if validity_checker is None:
+            result=list()
+            for pos, text in enumerate(texts):
+                instrumentation.select(pos)
+                result.append(self.check_text_validity(text))
+                
+            instrumentation.select(None)
+            return result
+        
+        min_text_size=configuration['min_text_size']
+        keys=[self._get_validity_key(text, min_text_size) for text in texts]
+        validity_cache=self._get_validity_cache()
+        result=[validity_cache.get(key) for key in keys]
+        pending=[pos for pos, valid in enumerate(result) if valid is None]
+        
+        if instrumentation.enabled:
+            for pos, valid in enumerate(result):
+                instrumentation.select(pos)
+                instrumentation.count('validity_cache_hits' if valid is not None else 'validity_cache_misses')
+            instrumentation.select(None)
+        
+        #Los textos se analizan conjuntamente: el tiempo se reparte entre ellos a partes iguales.
+        with instrumentation.stage('language_detection'):
+            verdicts=validity_checker([texts[pos] for pos in pending])
+        instrumentation.distribute({pos: 1 for pos in pending})
+        
+        for pos, valid in zip(pending, verdicts):
+            result[pos]=valid
+            self._store_verdict(keys[pos], valid)
+            
+        return result
     
     
     '''
@@ -238,15 +354,53 @@ class Remodeling_Module():
         
     #Devuelve si el lenguaje del texto es el adecuado (español).
     def _check_language(self,text):
-        res=self._text_analyzer.detect_language(text)
+        res=self._text_analyzer.detect_language(text, fast=True)
         return res =='es'
     
+    #Devuelve la clave de un texto en la caché de veredictos de validez.
+    def _get_validity_key(self, text, min_text_size):
+        return hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest() + ':' + str(min_text_size)
+    
+    #Devuelve la caché de veredictos de validez. Si el fichero indicado en la configuración no se ha cargado todavía (por
+    #ejemplo, porque se ha indicado después de construir el módulo), añade sus veredictos a la caché.
+    def _get_validity_cache(self):
+        filename=configuration['validity_cache_file']
+        
+        if filename!=self._validity_cache_file:
+            self._validity_cache_file=filename
+            
+            if filename!='' and os.path.exists(filename):
+                with open(filename, 'r', encoding='utf-8') as file_pointer:
+                    for line in file_pointer:
+                        #Se ignoran las líneas incompletas (por ejemplo, de una escritura interrumpida).
+                        try:
+                            verdicts=json.loads(line)
+                        except ValueError:
+                            continue
+                        
+                        for key, valid in verdicts.items():
+                            self._validity_cache.put(key, valid)
+        
+        return self._validity_cache
+    
+    #Almacena un veredicto en la caché. Si se ha indicado un fichero, se añadirá a él en el siguiente save_validity_cache.
+    #Los veredictos pendientes tampoco superan el tamaño de la caché: al alcanzarlo, se almacenan en el fichero.
+    def _store_verdict(self, key, valid):
+        self._validity_cache.put(key, valid)
+        
+        if configuration['validity_cache_file']!='':
+            self._new_verdicts[key]=valid
+            
+            if len(self._new_verdicts) >= max(configuration['validity_cache_size'], 1):
+                self.save_validity_cache()
+    
     #files: diccionario cuyas claves son los nombres de los ficheros y los valores su contenido.    
     #Devuelve una lista con los nombres de los documentos correctos. Contiene los NOMBRES de los CORRECTOS.
     def _filter_unvalid_files(self,
-                             files=dict()
+                             files=dict(),
+                             validity_checker=None
                              ):
-        correct, incorrect =self.filter_files(files=files)
+        correct, incorrect =self.filter_files(files=files, validity_checker=validity_checker)
                 
         if len(incorrect)!=0:
             print('Los siguientes documentos no son válidos:')
@@ -254,4 +408,15 @@ class Remodeling_Module():
             for x in incorrect:
                 print('-'+ x)
         
-        return correct    
\ No newline at end of file
+        return correct    
+
+
+#Determina si un fichero (no vacío) termina con un salto de línea.
+def _ends_with_newline(filename):
+    with open(filename, 'rb') as file_pointer:
+        file_pointer.seek(0, os.SEEK_END)
+        if file_pointer.tell()==0:
+            return True
+        
+        file_pointer.seek(-1, os.SEEK_END)
+        return file_pointer.read(1)==b'\n'
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Tensor de semejanzas
+
+    Almacena, para cada documento de una colección y cada subcriterio, la mejor semejanza (método average) obtenida entre el
+    subcriterio y las sentencias del documento. Es una matriz densa de floats de 32 (num_documentos x num_subcriterios).
+
+    Un subcriterio aparece en un documento si su mejor semejanza es mayor que 0 y alcanza el threshold_value. Por lo tanto, a
+    partir del tensor pueden obtenerse los resultados de la evaluación (con cualquier threshold_value, kw_threshold_value y
+    subconjunto de los subcriterios) sin volver a procesar los documentos ni a calcular ninguna semejanza. Esto permite repetir
+    la autoconfiguración del sistema (ver System.retune) en milisegundos.
+
+    El tensor puede almacenarse en disco (save) y cargarse posteriormente (load_score_tensor).
+'''
+
+from utilities import configuration
+import json
+import numpy as np
+
+
+class Score_Tensor():
+
+    def __init__(self,
+                 documents=list(),      #Nombres de los documentos (filas).
+                 criteria=dict(),       #Criterios evaluados. Cada subcriterio distinto es una columna, en orden de aparición.
+                 scores=None            #Matriz de floats de 32 con la mejor semejanza de cada documento y subcriterio.
+                 ):
+
+        self.documents=list(documents)
+        self.criteria=criteria
+        self.subcriteria=get_subcriteria(criteria)
+        self.scores=np.zeros((len(self.documents), len(self.subcriteria)), dtype=np.float32) if scores is None else scores
+
+        self._columns={subcriterion: pos for pos, subcriterion in enumerate(self.subcriteria)}
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Determina qué subcriterios aparecen en cada documento.
+
+        Input:
+            -threshold_value: Float. Valor umbral de semejanza. Si no se indica, se utiliza el valor de configuración 'threshold_value'.
+
+        Output:
+            -Matriz de Booleans (num_documentos x num_subcriterios).
+    '''
+    def get_found(self, threshold_value=None):
+        threshold_value=configuration['threshold_value'] if threshold_value is None else threshold_value
+
+        #La comparación se realiza en floats de 32, igual que el almacenamiento de las semejanzas.
+        return (self.scores > 0) & (self.scores >= np.float32(threshold_value))
+
+    '''
+        Obtiene los resultados de la evaluación de los documentos en base a una colección de criterios, con el mismo formato que
+        System.multiple_executions con autoconfigure_flag=True, get_found=True y clean=False.
+
+        Input:
+            -criteria: Dict. Colección de criterios. Sus subcriterios deben formar parte del tensor.
+            -threshold_value: Float. Valor umbral de semejanza. Si no se indica, se utiliza el valor de configuración 'threshold_value'.
+            -kw_threshold_value: Dict. Valores umbral de cada criterio (por posición). Si no se indica, se utiliza el valor de configuración.
+
+        Output:
+            -List. Una lista por documento. Cada una contiene, para cada criterio, la tupla (OK/KO, porcentaje de subcriterios encontrados, subcriterios encontrados).
+    '''
+    def get_results(self, criteria, threshold_value=None, kw_threshold_value=None):
+        kw_threshold_value=configuration['kw_threshold_value'] if kw_threshold_value is None else kw_threshold_value
+        found=self.get_found(threshold_value)
+
+        #Columnas de los subcriterios de cada criterio y valor umbral asociado.
+        columns=[[self._columns[subcriterion] for subcriterion in subcriteria] for subcriteria in criteria.values()]
+        thresholds=[kw_threshold_value.get(pos, configuration['default_threshold']) for pos in range(len(criteria))]
+
+        results=list()
+        for doc in range(len(self.documents)):
+            doc_results=list()
+
+            for crit, subcriteria in enumerate(criteria.values()):
+                found_concepts=[subcriterion for subcriterion, column in zip(subcriteria, columns[crit]) if found[doc, column]]
+                percentage=len(found_concepts)/len(subcriteria)
+
+                doc_results.append(('OK' if percentage >= thresholds[crit] else 'KO', percentage, found_concepts))
+
+            results.append(doc_results)
+
+        return results
+
+    '''
+        Devuelve el tensor restringido a una colección de documentos.
+
+        Input:
+            -documents: List. Nombres de los documentos, que deben formar parte del tensor.
+
+        Output:
+            -Score_Tensor. Sus filas siguen el orden indicado.
+    '''
+    def select(self, documents):
+        rows={document: pos for pos, document in enumerate(self.documents)}
+
+        return Score_Tensor(documents=documents,
+                            criteria=self.criteria,
+                            scores=self.scores[[rows[document] for document in documents]])
+
+    '''
+        Almacena el tensor en disco (formato .npz de numpy).
+
+        Input:
+            -filename: String. Ubicación del fichero.
+    '''
+    def save(self, filename):
+        with open(filename, 'wb') as file_pointer:
+            np.savez(file_pointer,
+                     documents=np.array(self.documents, dtype=str),
+                     criteria=np.array(json.dumps(self.criteria, ensure_ascii=False)),
+                     scores=self.scores)
+
+
+'''
+    Carga un tensor almacenado mediante Score_Tensor.save.
+
+    Input:
+        -filename: String. Ubicación del fichero.
+
+    Output:
+        -Score_Tensor.
+'''
+def load_score_tensor(filename):
+    with np.load(filename) as data:
+        return Score_Tensor(documents=data['documents'].tolist(),
+                            criteria=json.loads(str(data['criteria'])),
+                            scores=data['scores'])
+
+'''
+    Devuelve los subcriterios distintos de una colección de criterios, en orden de aparición.
+
+    Input:
+        -criteria: Dict. Claves: criterios. Valores: listas de subcriterios.
+
+    Output:
+        -List.
+'''
+def get_subcriteria(criteria):
+    return list(dict.fromkeys(subcriterion for subcriteria in criteria.values() for subcriterion in subcriteria))
@@ -11,8 +11,12 @@
         5- Elimina los espacios en blanco redundantes.
         6- Elimina las stopwords.
         7- Elimina los términos con un único caracter.
+        
+    Los resultados se almacenan en una caché LRU indexada por la sentencia normalizada (el resultado de los pasos 1-3), 
+    de modo que las sentencias repetidas no vuelven a lematizarse.
 '''
 import re
+from utilities import configuration, LRU_Cache
 
 class Text_Preprocessing_Module():
     
@@ -21,6 +25,9 @@ class Text_Preprocessing_Module():
         
         self.linguistic_model=linguistic_model    
         
+        #Caché sentencia normalizada -> sentencia procesada. Las sentencias normalizadas son las previas a la lematización.
+        self._sentence_cache=LRU_Cache(max_size=configuration['sentence_cache_size'])
+        
     '''
         MÉTODO PRINCIPAL
     '''
@@ -40,10 +47,79 @@ class Text_Preprocessing_Module():
         if sentence.isspace() or sentence=='':
             return False
         
+        sentence=self.__normalize(sentence)
+        
+        result=self._sentence_cache.get(sentence)
+        if result is None:
+            result=self.__finish_processing(self.__lemmatize(sentence))
+            self._sentence_cache.put(sentence, result)
+        
+        return result
+    
+    '''
+        Procesa una colección de sentencias. Es equivalente a aplicar process_sentence sobre cada una de ellas, pero la 
+        lematización se realiza por lotes.
+        
+        Input:
+            -sentences: List. Sentencias a procesar.
+            -batch_size: Int. Número de sentencias por lote de lematización. Si no se indica, se utiliza el valor de configuración.
+            
+        Output:
+            -List. Un elemento por sentencia: la sentencia procesada o False si su contenido es irrelevante.
+    '''
+    def process_sentences(self, sentences, batch_size=None):
+        result=[False]*len(sentences)
+        
+        #Sentencias normalizadas que no están en la caché, junto a las posiciones en las que aparecen.
+        pending=dict()
+        for pos, sentence in enumerate(sentences):
+            if sentence.isspace() or sentence=='':
+                continue
+            
+            sentence=self.__normalize(sentence)
+            
+            if sentence in pending:
+                pending[sentence].append(pos)
+                continue
+            
+            cached=self._sentence_cache.get(sentence)
+            if cached is None:
+                pending[sentence]=[pos]
+            else:
+                result[pos]=cached
+        
+        lemmatized=self.linguistic_model.lemmatize_many(list(pending.keys()), batch_size=batch_size)
+        
+        for (sentence, positions), lemmatized_sentence in zip(pending.items(), lemmatized):
+            processed=self.__finish_processing(lemmatized_sentence)
+            self._sentence_cache.put(sentence, processed)
+            
+            for pos in positions:
+                result[pos]=processed
+                
+        return result
+    
+    '''
+        Devuelve las estadísticas de uso de las cachés del preprocesamiento.
+        
+        Output:
+            -Dict. Claves: 'sentences' (caché de sentencias) y 'lemmas' (caché de lemas por término). Valores: ver LRU_Cache.get_statistics.
+    '''
+    def get_cache_statistics(self):
+        return {'sentences': self._sentence_cache.get_statistics(),
+                'lemmas': self.linguistic_model.get_cache_statistics()}
+    
+    '''
+        MÉTODOS AUXILIARES
+    '''
+    #Transformaciones previas a la lematización. Su resultado determina por completo el de la sentencia procesada.
+    def __normalize(self,sentence):
         sentence=self.__lower_text(sentence)
         sentence=self.__erase_numeric_words(sentence)
-        sentence=self.__erase_strange_signs(sentence)
-        sentence=self.__lemmatize(sentence)
+        return self.__erase_strange_signs(sentence)
+    
+    #Transformaciones posteriores a la lematización. Devuelve False si el resultado es irrelevante.
+    def __finish_processing(self,sentence):
         sentence=self.__erase_useless_whitespaces(sentence)
         sentence=self.__remove_stopwords(sentence)
         sentence=self.__remove_single_character_words(sentence)
@@ -53,9 +129,6 @@ class Text_Preprocessing_Module():
         
         return sentence
     
-    '''
-        MÉTODOS AUXILIARES
-    '''
     #Elimina los términos numéricos
     def __erase_numeric_words(self,text):
         return re.sub(r'\w*\d\w*', '', text)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Índice del vocabulario compartido entre procesos
+
+    La matriz del modelo de vectorización se proyecta en memoria en modo de solo lectura (ver words_model), de modo que los
+    procesos de una misma máquina ya comparten sus páginas. El vocabulario, en cambio, se carga en cada proceso como una
+    lista de términos y un diccionario término -> fila, que con vocabularios grandes ocupan cientos de MB por proceso.
+
+    Este módulo almacena el vocabulario en un único fichero binario que contiene una tabla hash (direccionamiento abierto
+    con sondeo lineal sobre el crc32 de cada término) y los propios términos (UTF-8). El fichero se proyecta en memoria en
+    modo de solo lectura, de modo que todos los procesos comparten una única copia del índice y ninguno construye objetos
+    por término. A cambio, cada búsqueda es algo más lenta que en un diccionario.
+
+    Formato (enteros de 64 bits):
+        -Cabecera: identificador del formato, número de términos, tamaño de la tabla y tamaño de los términos (bytes).
+        -offsets (num_términos+1): límites de cada término dentro de los términos.
+        -table (tamaño de la tabla, potencia de 2): fila de cada posición de la tabla. -1 si está vacía.
+        -Términos: concatenación de todos los términos codificados en UTF-8.
+'''
+
+import mmap
+import os
+import zlib
+import numpy as np
+
+
+VOCABULARY_INDEX_EXTENSION='.vindex'
+
+#Identificador del formato ('VIDX', versión 1).
+_FORMAT_ID=0x5649445801
+_HEADER_SIZE=4
+
+
+class Shared_Vocabulary_Index():
+
+    def __init__(self,
+                 filename=''    #Ubicación del fichero del índice (ver build_vocabulary_index).
+                 ):
+
+        with open(filename, 'rb') as file_pointer:
+            self._mmap=mmap.mmap(file_pointer.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header=memoryview(self._mmap)[:_HEADER_SIZE*8].cast('q')
+        format_id, num_words, table_size= header[0], header[1], header[2]
+        header.release()
+
+        if format_id != _FORMAT_ID:
+            self._mmap.close()
+            raise ValueError('El fichero '+filename+' no es un índice de vocabulario válido.')
+
+        self._num_words=num_words
+        self._mask=table_size-1
+        self._words_start=(_HEADER_SIZE+num_words+1+table_size)*8
+
+        #Vistas (sin copia) sobre los enteros del fichero.
+        self._ints=memoryview(self._mmap)[:self._words_start].cast('q')
+        self._offsets=self._ints[_HEADER_SIZE:_HEADER_SIZE+num_words+1]
+        self._table=self._ints[_HEADER_SIZE+num_words+1:]
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Devuelve la fila de un término (igual que un diccionario término -> fila).
+
+        Input:
+            -word: String. Término.
+
+        Output:
+            -Int. Fila del término. Si no forma parte del vocabulario, lanza un KeyError.
+    '''
+    def __getitem__(self, word):
+        pos=self._find(word.encode('utf-8', 'surrogatepass'))
+
+        if pos < 0:
+            raise KeyError(word)
+
+        return pos
+
+    def __contains__(self, word):
+        return self._find(word.encode('utf-8', 'surrogatepass')) >= 0
+
+    def __len__(self):
+        return self._num_words
+
+    '''
+        Devuelve la fila de un término o el valor indicado si no forma parte del vocabulario.
+    '''
+    def get(self, word, default=None):
+        pos=self._find(word.encode('utf-8', 'surrogatepass'))
+        return default if pos < 0 else pos
+
+    '''
+        Devuelve el término que ocupa una fila.
+
+        Input:
+            -pos: Int. Fila.
+
+        Output:
+            -String.
+    '''
+    def get_word(self, pos):
+        return self._get_bytes(pos).decode('utf-8', 'surrogatepass')
+
+    '''
+        Libera la proyección del fichero. El índice no puede utilizarse después.
+    '''
+    def close(self):
+        self._offsets.release()
+        self._table.release()
+        self._ints.release()
+        self._mmap.close()
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Devuelve la fila de un término codificado. -1 si no forma parte del vocabulario.
+    def _find(self, key):
+        slot=zlib.crc32(key) & self._mask
+
+        while True:
+            pos=self._table[slot]
+
+            if pos < 0 or self._get_bytes(pos) == key:
+                return pos
+
+            slot=(slot+1) & self._mask
+
+    #Devuelve un término codificado.
+    def _get_bytes(self, pos):
+        return self._mmap[self._words_start+self._offsets[pos]:self._words_start+self._offsets[pos+1]]
+
+
+'''
+    Genera el fichero del índice de un vocabulario.
+
+    Input:
+        -filename: String. Ubicación del fichero.
+        -words: List. Términos del vocabulario, en el orden de las filas de la matriz. Si un término aparece varias veces, el
+        índice devuelve su última fila (igual que un diccionario).
+'''
+def build_vocabulary_index(filename, words):
+    encoded=[word.encode('utf-8', 'surrogatepass') for word in words]
+
+    table_size=1
+    while table_size < 2*len(encoded):
+        table_size*=2
+    mask=table_size-1
+
+    table=[-1]*table_size
+    for pos, key in enumerate(encoded):
+        slot=zlib.crc32(key) & mask
+
+        while table[slot] >= 0 and encoded[table[slot]] != key:
+            slot=(slot+1) & mask
+
+        table[slot]=pos
+
+    offsets=np.zeros(len(encoded)+1, dtype=np.int64)
+    np.cumsum([len(key) for key in encoded], out=offsets[1:])
+
+    header=np.array([_FORMAT_ID, len(encoded), table_size, offsets[-1]], dtype=np.int64)
+
+    #Escribimos en un fichero temporal y lo renombramos, de modo que otro proceso nunca vea un índice a medio escribir.
+    temporary=filename+'.'+str(os.getpid())+'.tmp'
+    with open(temporary, 'wb') as file_pointer:
+        file_pointer.write(header.tobytes())
+        file_pointer.write(offsets.tobytes())
+        file_pointer.write(np.array(table, dtype=np.int64).tobytes())
+        file_pointer.write(b''.join(encoded))
+
+    os.replace(temporary, filename)
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Motor de semejanza entre conceptos y documentos
+
+    Calcula, de forma vectorizada, la semejanza entre un concepto (subcriterio) y todas las sentencias de un documento.
+
+    En lugar de comparar término a término, apila los vectores de todos los términos del documento en una única matriz
+    contigua de floats de 32 y guarda el desplazamiento en el que empieza cada sentencia. Como los vectores del modelo
+    de vectorización están normalizados, la semejanza de cosenos se reduce al producto escalar. De esta forma, evaluar
+    un concepto consiste en un único producto de matrices y un máximo por segmentos (uno por sentencia).
+
+    Si el documento se ha generado a partir de los identificadores (filas) de sus términos en el modelo de vectorización y el
+    concepto está compilado, la semejanza de cada término del concepto con todo el vocabulario ya está calculada (ver
+    Compiled_Criteria). En ese caso, no es necesario realizar ningún producto: basta con seleccionar los valores asociados a
+    los términos del documento.
+
+    El resultado es el mismo que el que se obtiene con el método average del módulo de análisis de texto.
+'''
+
+from oov_similarity import NGram_Index
+from instrumentation import NULL_INSTRUMENTATION
+import sys
+import numpy as np
+
+
+'''
+    Representación de un documento procesado como una matriz de vectores.
+
+    Se construye mediante build_document_matrix (a partir de la lista de sentencias procesadas, tuplas de la forma 
+    (vectores, otros)) o build_document_matrix_from_ids (a partir de los identificadores de los términos). Para mantener 
+    la compatibilidad con el formato original, puede recorrerse como si fuese la lista de sentencias procesadas.
+
+    Si se conocen los identificadores de los términos, el documento tan solo almacena arrays compactos: los identificadores
+    (enteros de 32), los límites de las sentencias y la tabla de términos fuera del vocabulario (cadenas internadas). La matriz
+    de vectores se extrae de la matriz del modelo la primera vez que se necesita (el motor de semejanza no la necesita si el
+    concepto está compilado). El documento puede serializarse (pickle): la matriz del modelo no forma parte del resultado y
+    se vuelve a asociar mediante set_vectors.
+'''
+class Document_Matrix():
+
+    __slots__=('token_ids', 'offsets', 'oov_terms', 'oov_ids', 'oov_offsets', 'concept_results', '_vectors', '_matrix', '_oov_index')
+
+    def __init__(self,
+                 matrix=None,       #Matriz (num_términos x dimensión) con los vectores (normalizados) de todos los términos del documento.
+                 offsets=None,      #offsets[i] es la fila en la que empiezan los términos de la sentencia i. offsets[i+1] es la fila en la que terminan.
+                 others=list(),     #Lista con los términos fuera del vocabulario de cada sentencia.
+                 token_ids=None,    #Fila de cada término en la matriz del modelo de vectorización. None si se desconoce.
+                 vectors=None       #Matriz del modelo de vectorización. Si se indica junto con token_ids, matrix se obtiene de ella cuando se necesita.
+                 ):
+
+        self.token_ids=None if token_ids is None else np.asarray(token_ids, dtype=np.int32)
+        self.offsets=np.zeros(1, dtype=np.int32) if offsets is None else np.asarray(offsets, dtype=np.int32)
+
+        self._vectors=vectors
+        self._matrix=matrix
+
+        #Términos fuera del vocabulario (sin repeticiones) y, para cada sentencia, las posiciones de sus términos en dicha lista.
+        #Siguen el mismo esquema que la matriz: oov_ids contiene las posiciones de todas las sentencias y oov_offsets sus límites.
+        self.oov_terms, self.oov_ids, self.oov_offsets= self._index_others(others)
+
+        #Índice de n-gramas de caracteres de los términos fuera del vocabulario. Se construye la primera vez que se necesita.
+        self._oov_index=None
+
+        #Resultados de los conceptos ya evaluados en el documento. Lo gestiona el Criteria_Checker.
+        self.concept_results=dict()
+
+    def __len__(self):
+        return len(self.offsets)-1
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self[pos]
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self[x] for x in range(len(self))[pos]]
+
+        pos=range(len(self))[pos]
+        return list(self.matrix[self.offsets[pos]:self.offsets[pos+1]]), self._get_others(pos)
+
+    #Serialización (pickle). Se excluyen la matriz del modelo y los datos que pueden volver a calcularse.
+    def __getstate__(self):
+        return {'token_ids': self.token_ids, 'offsets': self.offsets, 'oov_terms': self.oov_terms, 'oov_ids': self.oov_ids,
+                'oov_offsets': self.oov_offsets, 'matrix': self._matrix if self.token_ids is None else None}
+
+    def __setstate__(self, state):
+        self.token_ids=state['token_ids']
+        self.offsets=state['offsets']
+        self.oov_terms=[sys.intern(term) for term in state['oov_terms']]
+        self.oov_ids=state['oov_ids']
+        self.oov_offsets=state['oov_offsets']
+        self._vectors=None
+        self._matrix=state['matrix']
+        self._oov_index=None
+        self.concept_results=dict()
+
+    '''
+        Matriz (num_términos x dimensión) con los vectores de todos los términos del documento.
+    '''
+    @property
+    def matrix(self):
+        if self._matrix is None:
+            if self.token_ids is None or len(self.token_ids)==0:
+                self._matrix=np.zeros((0,0), dtype=np.float32)
+            else:
+                self._matrix=np.ascontiguousarray(self.model_vectors[self.token_ids], dtype=np.float32)
+
+        return self._matrix
+
+    '''
+        Matriz del modelo de vectorización a la que hacen referencia los identificadores de los términos (no es una copia).
+    '''
+    @property
+    def model_vectors(self):
+        if self._vectors is None:
+            raise ValueError('La matriz del modelo de vectorización no está asociada al documento (ver set_vectors).')
+
+        return self._vectors
+
+    '''
+        Lista con los términos fuera del vocabulario de cada sentencia.
+    '''
+    @property
+    def others(self):
+        return [self._get_others(pos) for pos in range(len(self))]
+
+    '''
+        Índice de n-gramas de caracteres de los términos fuera del vocabulario. Permite evitar las comparaciones innecesarias.
+    '''
+    @property
+    def oov_index(self):
+        if self._oov_index is None:
+            self._oov_index=NGram_Index(self.oov_terms)
+
+        return self._oov_index
+
+    '''
+        Número de términos del documento que forman parte del vocabulario.
+    '''
+    @property
+    def num_terms(self):
+        return int(self.offsets[-1])
+
+    '''
+        Asocia la matriz del modelo de vectorización al documento (por ejemplo, después de deserializarlo).
+
+        Input:
+            -vectors: Matriz de floats de 32 del modelo de vectorización. Debe ser la misma con la que se obtuvieron los identificadores.
+    '''
+    def set_vectors(self, vectors):
+        self._vectors=vectors
+
+    '''
+        Indica si el documento necesita la matriz del modelo de vectorización para obtener sus vectores.
+    '''
+    def needs_vectors(self):
+        return self._matrix is None and self._vectors is None and self.token_ids is not None and len(self.token_ids)>0
+
+    #Devuelve los términos fuera del vocabulario de una sentencia.
+    def _get_others(self, pos):
+        return [self.oov_terms[x] for x in self.oov_ids[self.oov_offsets[pos]:self.oov_offsets[pos+1]]]
+
+    #Agrupa los términos fuera del vocabulario del documento, de modo que cada término distinto se compara una única vez.
+    #Los términos se internan: los documentos que comparten un término comparten una única cadena.
+    def _index_others(self, others):
+        terms, ids, offsets= dict(), [], [0]
+        for sent_others in others:
+            for term in sent_others:
+                ids.append(terms.setdefault(term, len(terms)))
+            offsets.append(len(ids))
+
+        return [sys.intern(term) for term in terms], np.array(ids, dtype=np.int32), np.array(offsets, dtype=np.int32)
+
+
+'''
+    Construye la representación matricial de un documento a partir de sus sentencias procesadas.
+
+    Input:
+        -processed_text: List. Lista de tuplas (sent_vect, sent_others), una por sentencia.
+
+    Output:
+        -Document_Matrix.
+'''
+def build_document_matrix(processed_text):
+    vectors, offsets, others= [], [0], []
+    for sent_vect, sent_others in processed_text:
+        vectors.extend(sent_vect)
+        offsets.append(offsets[-1]+len(sent_vect))
+        others.append(sent_others)
+
+    matrix=np.ascontiguousarray(np.array(vectors, dtype=np.float32)) if len(vectors)>0 else None
+
+    return Document_Matrix(matrix=matrix, offsets=offsets, others=others)
+
+'''
+    Construye la representación matricial de un documento a partir de los identificadores de sus términos.
+
+    Input:
+        -sentences: List. Lista de tuplas (sent_ids, sent_others), una por sentencia. sent_ids contiene las filas de los términos en la matriz del modelo.
+        -vectors: Matriz de floats de 32 del modelo de vectorización.
+
+    Output:
+        -Document_Matrix. Conserva los identificadores de los términos. Los vectores se obtienen de la matriz del modelo cuando se necesitan.
+'''
+def build_document_matrix_from_ids(sentences, vectors):
+    ids, offsets, others= [], [0], []
+    for sent_ids, sent_others in sentences:
+        ids.extend(sent_ids)
+        offsets.append(len(ids))
+        others.append(sent_others)
+
+    return build_document_matrix_from_arrays(ids, offsets, others, vectors)
+
+'''
+    Construye la representación matricial de un documento a partir de los identificadores de todos sus términos y de los
+    límites de sus sentencias (por ejemplo, los almacenados en la caché de documentos).
+
+    Input:
+        -token_ids: Array de enteros. Filas de los términos del documento en la matriz del modelo, sentencia a sentencia.
+        -offsets: Array de enteros. offsets[i] y offsets[i+1] delimitan los términos de la sentencia i.
+        -others: List. Términos fuera del vocabulario de cada sentencia.
+        -vectors: Matriz de floats de 32 del modelo de vectorización.
+
+    Output:
+        -Document_Matrix.
+'''
+def build_document_matrix_from_arrays(token_ids, offsets, others, vectors):
+    return Document_Matrix(offsets=offsets, others=others, token_ids=token_ids, vectors=vectors)
+
+
+class Similarity_Engine():
+
+    def __init__(self,
+                 oov_engine=None    #OOV_Similarity_Engine utilizado para comparar los términos fuera del vocabulario.
+                 ):
+
+        self._oov_engine=oov_engine
+
+        #Instrumentación (ver Instrumentation). Mide la semejanza de cosenos y la de los términos fuera del vocabulario.
+        self.instrumentation=NULL_INSTRUMENTATION
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Calcula la semejanza entre un concepto y cada una de las sentencias de un documento.
+
+        Input:
+            - concept_vect: vector con los vectores que representan los términos del concepto. También admite una matriz con un vector por fila.
+            - concept_others: vector con los términos del concepto que no pueden representarse como vectores.
+            - document: Document_Matrix. Documento en el que se busca el concepto.
+            - concept_rows: List. Semejanza precalculada de cada término del concepto con todo el vocabulario (Similarity_Row).
+            Tan solo se utiliza si el documento conserva los identificadores de sus términos.
+
+        Output:
+            - Array de numpy con un valor real entre 0 y 1 por cada sentencia del documento. Cada valor coincide con el que
+            devolvería el método average del módulo de análisis de texto para dicha sentencia.
+    '''
+    def score_sentences(self,
+                        concept_vect,
+                        concept_others,
+                        document,
+                        concept_rows=None
+                        ):
+
+        num_sentences=len(document)
+        scores=np.zeros(num_sentences, dtype=np.float64)
+
+        if num_sentences==0:
+            return scores
+
+        instrumentation=self.instrumentation
+        instrumentation.count('sentence_comparisons', num_sentences)
+
+        with instrumentation.stage('cosine'):
+            scores+=self._score_vectors(concept_vect, document, concept_rows)
+
+        with instrumentation.stage('lcs'):
+            scores+=self._score_others(concept_others, document)
+
+        return scores/(len(concept_vect)+len(concept_others))
+
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Suma, para cada sentencia, la semejanza máxima (de cosenos) de cada término del concepto con los términos de la sentencia.
+    def _score_vectors(self, concept_vect, document, concept_rows=None):
+        result=np.zeros(len(document), dtype=np.float64)
+
+        if len(concept_vect)==0 or document.num_terms==0:
+            return result
+
+        #Semejanza de cosenos de cada término del concepto con cada término del documento.
+        if concept_rows is not None and document.token_ids is not None:
+            similarities=np.array([row.gather(document.token_ids, document.model_vectors) for row in concept_rows])
+        else:
+            similarities=np.dot(np.asarray(concept_vect, dtype=np.float32), document.matrix.T)
+
+        #Máximo por sentencia. Las sentencias sin términos vectorizados no participan (su máximo es 0).
+        starts=document.offsets[:-1]
+        non_empty=document.offsets[1:] > starts
+
+        if not non_empty.any():
+            return result
+
+        best=np.fmax.reduceat(similarities, starts[non_empty], axis=1)
+
+        #Los valores negativos no superan el mejor valor inicial (0).
+        best=np.fmax(best, 0)
+        result[non_empty]=best.sum(axis=0, dtype=np.float64)
+
+        return result
+
+    #Suma, para cada sentencia, la semejanza máxima de cada término del concepto fuera del vocabulario con los términos de la sentencia que tampoco están en él.
+    def _score_others(self, concept_others, document):
+        result=np.zeros(len(document), dtype=np.float64)
+
+        if len(concept_others)==0 or len(document.oov_terms)==0:
+            return result
+
+        starts=document.oov_offsets[:-1]
+        non_empty=document.oov_offsets[1:] > starts
+
+        for x in concept_others:
+            #Cada término distinto del documento se compara una única vez con el término del concepto.
+            term_scores=self._oov_engine.similarities(x, document.oov_terms, index=document.oov_index)
+
+            #Las semejanzas no son negativas, de modo que el máximo por sentencia coincide con el de la búsqueda secuencial.
+            result[non_empty]+=np.maximum.reduceat(term_scores[document.oov_ids], starts[non_empty])
+
+        return result
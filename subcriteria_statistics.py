@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Estadísticas de los subcriterios
+
+    Al evaluar un criterio, el sistema deja de buscar subcriterios en cuanto el resultado está decidido (ver
+    Criteria_Checker._got_result). El número de subcriterios evaluados depende, por lo tanto, del orden en el que se buscan.
+
+    Este módulo aprende, para cada subcriterio, su probabilidad de aparición (a partir de la autoconfiguración o de las
+    evaluaciones realizadas). Junto con el coste estimado de cada subcriterio (que depende de su número de términos y de
+    términos fuera del vocabulario, ver Criteria_Checker), ordena los subcriterios de un criterio de modo que el resultado
+    se decida lo antes posible:
+        -Si se espera que el criterio se cumpla, primero los subcriterios con mayor probabilidad de aparición por unidad de coste.
+        -Si no, primero los subcriterios con mayor probabilidad de no aparecer por unidad de coste.
+
+    La probabilidad de aparición depende del threshold_value, de modo que se aprende por separado para cada valor. El coste
+    no se mide (no depende de la máquina ni de la carga), de modo que, con la misma información, el orden es siempre el mismo.
+
+    El orden no modifica si el criterio se cumple o no. Además, cuenta los subcriterios evaluados por documento.
+'''
+
+from utilities import configuration
+
+
+class Subcriteria_Statistics():
+
+    def __init__(self):
+        #Claves: tuplas (subcriterio, threshold_value). Valores: lista [apariciones, evaluaciones].
+        self._hits=dict()
+
+        self._documents=0
+        self._evaluated_subcriteria=0
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Registra la evaluación de un subcriterio en un documento.
+
+        Input:
+            -subcriterion: String. Subcriterio evaluado.
+            -found: Boolean. Determina si el subcriterio aparece en el documento.
+    '''
+    def record(self, subcriterion, found):
+        hits=self._get_hits(subcriterion)
+        hits[0]+=1 if found else 0
+        hits[1]+=1
+
+        self._evaluated_subcriteria+=1
+
+    '''
+        Aprende la probabilidad de aparición de los subcriterios a partir de los resultados de una colección de documentos.
+
+        Input:
+            -subcriteria: List. Subcriterios.
+            -found: Matriz de Booleans (num_documentos x num_subcriterios), obtenida con el threshold_value actual. Ver Score_Tensor.get_found.
+    '''
+    def learn(self, subcriteria, found):
+        num_hits=found.sum(axis=0)
+
+        for pos, subcriterion in enumerate(subcriteria):
+            hits=self._get_hits(subcriterion)
+            hits[0]+=int(num_hits[pos])
+            hits[1]+=found.shape[0]
+
+    '''
+        Ordena los subcriterios de un criterio de modo que su resultado se decida lo antes posible.
+
+        Input:
+            -subcriteria: List. Subcriterios del criterio.
+            -threshold: Float. kw_threshold_value del criterio.
+            -costs: List. Coste estimado (positivo) de evaluar cada subcriterio, en el mismo orden.
+            -evaluated: Set. Subcriterios cuyo resultado ya se conoce en el documento. Como no tienen coste, se colocan primero.
+
+        Output:
+            -List. Los mismos subcriterios, reordenados.
+    '''
+    def order(self, subcriteria, threshold, costs, evaluated=frozenset()):
+        probabilities=[self._get_probability(subcriterion) for subcriterion in subcriteria]
+
+        #Si el número esperado de apariciones alcanza el necesario, lo más probable es que el criterio se cumpla.
+        expect_found=sum(probabilities) >= threshold*len(subcriteria)
+
+        def priority(pos):
+            probability=probabilities[pos] if expect_found else 1-probabilities[pos]
+            return (not subcriteria[pos] in evaluated, -probability/costs[pos])
+
+        return [subcriteria[pos] for pos in sorted(range(len(subcriteria)), key=priority)]
+
+    '''
+        Registra la evaluación de un nuevo documento.
+    '''
+    def register_document(self):
+        self._documents+=1
+
+    '''
+        Devuelve los contadores de subcriterios evaluados.
+
+        Output:
+            -Dict. Claves: 'documents' (documentos evaluados), 'evaluated_subcriteria' (subcriterios evaluados) y
+            'subcriteria_per_document' (media de subcriterios evaluados por documento).
+    '''
+    def get_counters(self):
+        return {'documents': self._documents,
+                'evaluated_subcriteria': self._evaluated_subcriteria,
+                'subcriteria_per_document': self._evaluated_subcriteria/self._documents if self._documents>0 else 0}
+
+    '''
+        Reinicia los contadores de subcriterios evaluados. No modifica las estadísticas aprendidas.
+    '''
+    def reset_counters(self):
+        self._documents=0
+        self._evaluated_subcriteria=0
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Devuelve las apariciones y evaluaciones de un subcriterio con el threshold_value actual.
+    def _get_hits(self, subcriterion):
+        return self._hits.setdefault((subcriterion, configuration['threshold_value']), [0, 0])
+
+    #Probabilidad de aparición con el threshold_value actual, con suavizado de Laplace (0.5 si no hay información).
+    def _get_probability(self, subcriterion):
+        hits, evaluations= self._hits.get((subcriterion, configuration['threshold_value']), (0, 0))
+        return (hits+1)/(evaluations+2)
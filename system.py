@@ -12,10 +12,14 @@
 from learning_module import Learning_Module
 from remodeling_module import Remodeling_Module
 from criteria_checker import Criteria_Checker
-from criteria_extractor_module import Criteria_Extractor_Module 
-from utilities import read_criteria, configuration 
+from criteria_extractor_module import Criteria_Extractor_Module, EXTRACTOR_MODEL_TYPE
+from parallel_execution import Parallel_Executor
+from score_tensor import Score_Tensor, get_subcriteria
+from instrumentation import NULL_INSTRUMENTATION
+from utilities import read_criteria, configuration, iter_blocks, LRU_Cache
 import json
 import os
+import numpy as np
 
 class System():    
     def __init__(self,
@@ -25,7 +29,9 @@ class System():
                criteria_file='',
                configuration_file='',
                kw_threshold_value={},
-               min_text_size=
+               min_text_size=,
+               nlp=None,                #Pipeline de Spacy ya cargado (ver Linguistic_Model). Si se indica, no se carga model_type.
+               pipeline_profile='lemmatize'     #Perfil del pipeline de Spacy (ver Linguistic_Model). Con 'full', el extractor de criterios lo comparte.
                ):
 
         configuration['configuration_file']=configuration_file
@@ -34,16 +40,41 @@ class System():
         
         self._criteria= read_criteria(criteria_file) if criteria_file!='' else ''
         
+        #Parámetros necesarios para construir un sistema equivalente en otro proceso (ejecución en paralelo).
+        #Un pipeline indicado mediante nlp no se incluye: tan solo lo heredan los procesos creados mediante fork.
+        self._system_arguments={'pre_trained_model_file': pre_trained_model_file,
+                                'model_type': model_type,
+                                'stopwords_file': stopwords_file,
+                                'pipeline_profile': pipeline_profile,
+                                'min_text_size': min_text_size}
+        self._parallel_executor=None
+        
+        #Último tensor de semejanzas calculado en la autoconfiguración (ver retune).
+        self._score_tensor=None
+        
+        #Instrumentación de las evaluaciones (ver set_instrumentation). Desactivada de forma predeterminada.
+        self._instrumentation=NULL_INSTRUMENTATION
+        
         
         #Inicialización de los demás componentes del sistema.
         self._cc=Criteria_Checker(pre_trained_model_file=pre_trained_model_file,
                                  model_type=model_type,
-                                 stopwords_file=stopwords_file)
+                                 stopwords_file=stopwords_file,
+                                 pipeline_profile=pipeline_profile,
+                                 nlp=nlp)
         
         self._rm= Remodeling_Module(text_analyzer=self._cc.text_analyzer)
         
         self._lm= Learning_Module()
-        self._cem= Criteria_Extractor_Module()
+        
+        #El extractor de criterios se construye la primera vez que se utiliza (ver _get_criteria_extractor).
+        self._cem= None
+        
+        #Criterios compilados de los criterios externos (distintos de los del sistema) utilizados recientemente.
+        self._compiled_criteria_cache=LRU_Cache(max_size=configuration['compiled_criteria_cache_size'])
+        
+        #Los subcriterios se procesan una única vez, al establecer los criterios.
+        self._compile_stored_criteria()
 
 
     '''
@@ -77,7 +108,7 @@ class System():
         print('La información extraída se almacenará en el sistema. El nombre del criterio asociado es ', criteria_name)
         
 
-        new_crit=self._cem.criteria_extract(criteria_name=criteria_name,
+        new_crit=self._get_criteria_extractor().criteria_extract(criteria_name=criteria_name,
                                    articles_path=articles_path
                                    )
     
@@ -86,6 +117,7 @@ class System():
             self._criteria = dict()
 
         self._criteria.update(new_crit)
+        self._compile_stored_criteria()
                
     '''
         Reestablece la configuración del sistema a su versión predeterminada.
@@ -111,6 +143,7 @@ class System():
         configuration['min_text_size']=min_text_size
         
         self._criteria=''
+        self._compile_stored_criteria()
     
     
     '''
@@ -127,6 +160,7 @@ class System():
     '''
     def set_criteria(self, criteria_file):
         self._criteria=read_criteria(criteria_file)
+        self._compile_stored_criteria()
         
         print('Establecidos los criterios presentes en el documento ', criteria_file)
     
@@ -173,9 +207,68 @@ class System():
                                         text=text,
                                         autoconfigure_flag=False,
                                         get_found=False,
-                                        clean=True)        
+                                        clean=True,
+                                        compiled_criteria=self._get_compiled_criteria(criteria))        
         else:
             return "El documento introducido no es válido."
+    
+    '''
+        Evalúa una colección de documentos, igual que check_document sobre cada uno de ellos, pero todos los documentos se 
+        preprocesan y evalúan conjuntamente (en una única pasada). Permite agrupar las peticiones de varios usuarios (ver 
+        Evaluation_Service).
+        
+        Input:
+            -criteria: diccionario Python. Criterios utilizados (ver check_document).
+            -texts: List. Contenido de los documentos.
+            
+        Output:
+            -List. Un resultado por documento, en el mismo orden, con la forma descrita en la salida del método "check_document".
+            Si el documento no es válido, el mensaje correspondiente.
+            
+            Si no se han especificado los criterios, devuelve el mensaje de error correspondiente (String).
+    '''
+    def check_documents(self,
+                        criteria=dict(),
+                        texts=list()
+                        ):
+        
+        criteria=self._init_criteria(criteria)
+        
+        if criteria=='':
+            return 'No se han especificado los criterios para realizar la evaluación.'
+        
+        verdicts=self._rm.check_texts_validity(texts)
+        valid=[pos for pos, correct in enumerate(verdicts) if correct]
+        
+        results=["El documento introducido no es válido."]*len(texts)
+        evaluated=self._evaluate_documents(criteria,
+                                           [texts[pos] for pos in valid],
+                                           compiled_criteria=self._get_compiled_criteria(criteria),
+                                           clean=True)
+        
+        for pos, result in zip(valid, evaluated):
+            results[pos]=result
+            
+        return results
+    
+    '''
+        Devuelve los criterios almacenados en el sistema.
+        
+        Output:
+            -Dict. Claves: criterios. Valores: listas de subcriterios. Vacío si el sistema no tiene criterios.
+    '''
+    def get_criteria(self):
+        return dict() if self._criteria=='' else {name: list(subcriteria) for name, subcriteria in self._criteria.items()}
+    
+    '''
+        Modifica los criterios que se utilizan para realizar las evaluaciones a partir de un diccionario (ver set_criteria).
+        
+        Input:
+            -criteria: Dict. Claves: criterios. Valores: listas de subcriterios. Si está vacío, el sistema se queda sin criterios.
+    '''
+    def set_criteria_dict(self, criteria):
+        self._criteria={name: list(subcriteria) for name, subcriteria in criteria.items()} if len(criteria)>0 else ''
+        self._compile_stored_criteria()
   
     
     '''
@@ -194,6 +287,9 @@ class System():
             
             -separator: String. Separador utilizado para delimitar los campos del csv indicado.
             
+            -workers: Int. Número de procesos que evalúan los documentos. Si no se indica, se utiliza el valor de configuración 'workers'.
+            Los procesos se crean la primera vez que se utilizan y se reutilizan en las siguientes ejecuciones (ver close_workers).
+            
         Los demás parámetros consisten en parámetros de funcionamiento interno del sistema, de modo que para el uso
         de un usuario, no son relevantes.
         
@@ -212,7 +308,8 @@ class System():
                             autoconfigure_flag=False,
                             get_found=False,
                             filtered=False,
-                            clean=True
+                            clean=True,
+                            workers=None
                             ):        
         
         #Vemos si utilizamos los criterios del sistema o unos externos.
@@ -224,9 +321,16 @@ class System():
         if csv_file_content !='':
             files_content= self._rm.read_text_content_from_csv(csv_file=csv_file_content,separator=separator)
 
+        executor=self._get_parallel_executor(workers)
+        
+        self._instrumentation.start_run()
+        
         #Filtramos
         if not filtered:
-            correct_filenames, incorrect=self._rm.filter_files(files=files_content)
+            self._instrumentation.begin_batch(list(files_content.keys()))
+            correct_filenames, incorrect=self._rm.filter_files(files=files_content,
+                                                               validity_checker=executor.check_validity if executor is not None else None)
+            self._instrumentation.end_batch()
             
             if clean and len(incorrect)>0:
                 print('Los siguientes documentos no son válidos:')
@@ -236,17 +340,71 @@ class System():
             correct_filenames=list(files_content.keys())
             
             
-        results=list()
-        for filename in correct_filenames:
-            results.append(self._check_criteria(criteria,
-                                               files_content[filename],
-                                               autoconfigure_flag=autoconfigure_flag,
-                                               get_found=get_found, 
-                                               clean=clean))
-        return results
+        texts=[files_content[filename] for filename in correct_filenames]
+        
+        if executor is not None:
+            return executor.evaluate(criteria,
+                                     texts,
+                                     autoconfigure_flag=autoconfigure_flag,
+                                     get_found=get_found,
+                                     clean=clean)
+            
+        return self._evaluate_documents(criteria,
+                                        texts,
+                                        compiled_criteria=self._get_compiled_criteria(criteria),
+                                        autoconfigure_flag=autoconfigure_flag,
+                                        get_found=get_found,
+                                        clean=clean,
+                                        names=correct_filenames)
                     
     
     
+    '''
+        Evalúa una colección de documentos en modo streaming: los documentos se leen, filtran, preprocesan y evalúan por bloques,
+        y los resultados se devuelven de uno en uno a medida que se obtienen. La memoria utilizada no depende del tamaño de la 
+        colección, de modo que permite evaluar exportaciones de gran tamaño.
+        
+        Input:
+            -criteria: diccionario Python. Criterios utilizados (ver multiple_executions).
+            
+            -csv_file_content: String. Nombre/ubicación del fichero csv que contiene los contenidos de los ficheros que se desean evaluar.
+            Se lee línea a línea.
+            
+            -separator: String. Separador utilizado para delimitar los campos del csv indicado.
+            
+            -documents: Iterable de tuplas (nombre, contenido). Alternativa al csv: documentos a evaluar.
+            
+            -clean: Boolean. Formato de los resultados (ver multiple_executions). Si es True, se muestran los documentos no válidos.
+            
+            -workers: Int. Número de procesos que evalúan los documentos (ver multiple_executions).
+            
+        Output:
+            -Generador de tuplas (nombre del documento, resultado), en el orden de lectura. Cada resultado tiene la forma descrita en 
+            la salida del método "check_document". Los documentos no válidos se omiten.
+            
+            A diferencia de multiple_executions, los documentos repetidos (mismo nombre) se evalúan cada vez que aparecen.
+    '''
+    def stream_executions(self,
+                          criteria=dict(),
+                          csv_file_content='',
+                          separator='#',
+                          documents=None,
+                          clean=True,
+                          workers=None
+                          ):
+        
+        #Vemos si utilizamos los criterios del sistema o unos externos.
+        criteria=self._init_criteria(criteria)
+        
+        if criteria=='':
+            return 'No se han especificado los criterios para realizar la evaluación.'
+        
+        if csv_file_content !='':
+            documents=self._rm.iter_text_content_from_csv(csv_file=csv_file_content, separator=separator)
+        
+        return self._stream_results(criteria, documents if documents is not None else [], clean, self._get_parallel_executor(workers))
+    
+    
     '''
         Autoconfigura el sistema en base a una colección de documentos y los criterios que se desea que utilice
         para realizar evaluaciones en el futuro.
@@ -270,12 +428,18 @@ class System():
             colección que se desea utilizar para realizar la autoconfiguración.
             
             -separator: String. Separator que delimita los campos de ambos csvs introducidos. Es un único separador para ambos csvs (csv_file_contents y csv_file_evaluations)  
+            
+            -workers: Int. Número de procesos que evalúan los documentos (ver multiple_executions).
+            
+            -score_tensor_file: String. Si se indica, el tensor de semejanzas calculado se almacena en dicha ubicación (ver retune).
     '''
     def autoconfigure(self, 
                     criteria=dict(),
                     csv_file_contents='',
                     csv_file_evaluations='',
-                    separator='#'       #Un único separador para
+                    separator='#',       #Un único separador para
+                    workers=None,
+                    score_tensor_file=''
                     ):
               
         
@@ -285,32 +449,327 @@ class System():
         if criteria=='':
             return 'No se han especificado los criterios para realizar la evaluación.'
     
+        executor=self._get_parallel_executor(workers)
+    
         files_evals, files_cont=self._rm.prepare_and_filter_docs(csv_file_content=csv_file_contents,
                                                        csv_file_evaluations=csv_file_evaluations,
-                                                       separator=separator)
+                                                       separator=separator,
+                                                       validity_checker=executor.check_validity if executor is not None else None)
         
-        results=self.multiple_executions(criteria=criteria,
-                                files_content=files_cont,
-                                autoconfigure_flag=True,
-                                get_found=True,
-                                filtered=True,
-                                clean=False)
+        #Las semejanzas se calculan una única vez. El resto de la autoconfiguración se realiza a partir del tensor.
+        self._score_tensor=self.build_score_tensor(criteria=criteria,
+                                                   files_content=files_cont,
+                                                   filtered=True,
+                                                   workers=workers)
+        
+        if score_tensor_file!='':
+            self._score_tensor.save(score_tensor_file)
+        
+        self.retune(files_evals=files_evals)
+    
+    '''
+        Calcula el tensor de semejanzas de una colección de documentos: la mejor semejanza de cada documento con cada subcriterio 
+        (ver Score_Tensor). A partir del tensor pueden obtenerse los resultados de la evaluación con cualquier configuración sin 
+        volver a procesar los documentos.
+        
+        Input:
+            -criteria: diccionario Python. Criterios utilizados (ver multiple_executions).
+            -csv_file_content: String. Nombre/ubicación del fichero csv que contiene los contenidos de los documentos.
+            -separator: String. Separador utilizado para delimitar los campos del csv indicado.
+            -workers: Int. Número de procesos que evalúan los documentos (ver multiple_executions).
+            
+        Output:
+            -Score_Tensor. Sus filas son los documentos válidos de la colección.
+    '''
+    def build_score_tensor(self,
+                           criteria=dict(),
+                           csv_file_content='',
+                           separator='#',
+                           
+                           files_content=dict(),     #Flags de funcionamiento interno. Ignorar.
+                           filtered=False,
+                           workers=None
+                           ):
+        
+        #Vemos si utilizamos los criterios del sistema o unos externos.
+        criteria=self._init_criteria(criteria)
+        
+        if criteria=='':
+            return 'No se han especificado los criterios para realizar la evaluación.'
+        
+        if csv_file_content !='':
+            files_content= self._rm.read_text_content_from_csv(csv_file=csv_file_content,separator=separator)
+            
+        executor=self._get_parallel_executor(workers)
+        
+        if not filtered:
+            correct_filenames, _=self._rm.filter_files(files=files_content,
+                                                       validity_checker=executor.check_validity if executor is not None else None)
+        else:
+            correct_filenames=list(files_content.keys())
+            
+        texts=[files_content[filename] for filename in correct_filenames]
+        
+        if executor is not None:
+            rows=executor.score(criteria, texts)
+        else:
+            rows=self._score_documents(criteria, texts, compiled_criteria=self._get_compiled_criteria(criteria))
+            
+        scores=np.zeros((len(texts), len(get_subcriteria(criteria))), dtype=np.float32)
+        for pos, row in enumerate(rows):
+            scores[pos]=row
+        
+        return Score_Tensor(documents=correct_filenames, criteria=criteria, scores=scores)
+    
+    '''
+        Repite la autoconfiguración del sistema a partir de un tensor de semejanzas, sin volver a procesar los documentos ni a
+        calcular ninguna semejanza. Permite, por ejemplo, probar distintos threshold_value en milisegundos.
+        
+        Input:
+            -score_tensor: Score_Tensor. Tensor de semejanzas (ver build_score_tensor y load_score_tensor). Si no se indica, se utiliza
+            el calculado en la última autoconfiguración.
+            
+            -csv_file_evaluations: String. Ubicación/nombre del fichero csv que almacena las evaluaciones asociadas a cada documento. Tan
+            solo se utilizan los documentos que forman parte del tensor.
+            
+            -separator: String. Separador del csv de evaluaciones.
+            
+            -threshold_value: Float. Si se indica, se establece como nuevo threshold_value del sistema antes de la autoconfiguración.
+            
+        Los subcriterios se filtran a partir de los criterios con los que se calculó el tensor.
+    '''
+    def retune(self,
+               score_tensor=None,
+               csv_file_evaluations='',
+               separator='#',
+               threshold_value=None,
+               
+               files_evals=dict()      #Flags de funcionamiento interno. Ignorar.
+               ):
+        
+        score_tensor=self._score_tensor if score_tensor is None else score_tensor
+        
+        if score_tensor is None:
+            return 'No se ha calculado el tensor de semejanzas.'
+        
+        if csv_file_evaluations!='':
+            files_evals=self._rm.read_evaluations_from_csv(csv_file=csv_file_evaluations, separator=separator)
+            
+        if threshold_value is not None:
+            configuration['threshold_value']=threshold_value
+            
+        score_tensor=score_tensor.select([x for x in score_tensor.documents if x in files_evals])
+        expected=[files_evals[x] for x in score_tensor.documents]
+        
+        criteria=score_tensor.criteria
+        results=score_tensor.get_results(criteria)
+        
+        #La probabilidad de aparición de cada subcriterio se utiliza para ordenarlos en las evaluaciones posteriores.
+        self._cc.subcriteria_statistics.learn(score_tensor.subcriteria, score_tensor.get_found())
         
         #Primero analizamos las kw útiles y extraemos las kw útiles.
-        new_criteria= self._lm.analyze_kw(expected=list(files_evals.values()), 
+        new_criteria= self._lm.analyze_kw(expected=expected, 
                                           criteria=criteria,
                                           execution_results=results)
         new_results=self._rm.filter_using_criteria(results, new_criteria)
         
         self._criteria=new_criteria
-        configuration['kw_threshold_value']=self._lm.get_best_kw_threshold_values(results=new_results,expected_results= list(files_evals.values())).copy()
+        self._compile_stored_criteria()
+        configuration['kw_threshold_value']=self._lm.get_best_kw_threshold_values(results=new_results,expected_results=expected).copy()
         
         print('Sistema autoconfigurado correctamente.')
     
+    '''
+        Devuelve los contadores de subcriterios evaluados por documento (ver Subcriteria_Statistics.get_counters).
+        
+        Input:
+            -reset: Boolean. Si es True, los contadores se reinician después de consultarlos.
+            
+        Output:
+            -Dict.
+    '''
+    def get_subcriteria_counters(self, reset=False):
+        counters=self._cc.subcriteria_statistics.get_counters()
+        
+        if reset:
+            self._cc.subcriteria_statistics.reset_counters()
+            
+        return counters
+    
+    '''
+        Activa o desactiva la instrumentación de las evaluaciones: tiempo de cada etapa (detección del idioma, Spacy, vectorización,
+        semejanza de cosenos, semejanza de términos fuera del vocabulario) y contadores (comparaciones, finalizaciones anticipadas, 
+        términos fuera del vocabulario, aciertos de las cachés, etc) de cada documento. Ver Instrumentation.
+        
+        Los informes se obtienen en las evaluaciones realizadas en el proceso actual (multiple_executions y stream_executions sin
+        procesos adicionales). Desactivada, su coste es prácticamente nulo.
+        
+        Input:
+            -instrumentation: Instrumentation. Si es None, se desactiva.
+    '''
+    def set_instrumentation(self, instrumentation=None):
+        self._instrumentation=NULL_INSTRUMENTATION if instrumentation is None else instrumentation
+        
+        self._cc.set_instrumentation(instrumentation)
+        self._rm.instrumentation=self._instrumentation
+    
+    '''
+        Devuelve los informes de la instrumentación de los documentos de la última evaluación (ver Instrumentation.get_reports).
+        
+        Output:
+            -List. Un diccionario por documento. Vacía si la instrumentación está desactivada.
+    '''
+    def get_document_reports(self):
+        return self._instrumentation.get_reports()
+    
+    '''
+        Devuelve los totales de la instrumentación y las estadísticas de las cachés del sistema.
+        
+        Output:
+            -Dict. Claves: 'stages', 'counters', 'oov_rate' (ver Instrumentation.get_summary) y 'caches' (aciertos y fallos de 
+            cada caché, ver Text_Analyzer.get_cache_statistics).
+    '''
+    def get_instrumentation_summary(self):
+        summary=self._instrumentation.get_summary()
+        summary['caches']=self._cc.text_analyzer.get_cache_statistics()
+        
+        return summary
+    
+    '''
+        Almacena los informes de los documentos de la última evaluación y el resumen de la instrumentación en un fichero JSON.
+        
+        Input:
+            -filename: String. Ubicación del fichero.
+    '''
+    def export_document_reports(self, filename):
+        with open(filename, 'w', encoding='utf-8') as file_pointer:
+            json.dump({'documents': self.get_document_reports(), 'summary': self.get_instrumentation_summary()}, 
+                      file_pointer, ensure_ascii=False, indent=2)
+    
+    '''
+        Finaliza los procesos utilizados en la ejecución en paralelo (si existen).
+    '''
+    def close_workers(self):
+        if self._parallel_executor is not None:
+            self._parallel_executor.close()
+            self._parallel_executor=None
+    
     '''
         MÉTODOS INTERNOS
     '''
     
+    #Devuelve el extractor de criterios. Lo crea si todavía no existe, reutilizando el pipeline de Spacy del sistema si es posible.
+    def _get_criteria_extractor(self):
+        if self._cem is None:
+            self._cem=Criteria_Extractor_Module(nlp=self._cc.text_analyzer.get_pipeline(EXTRACTOR_MODEL_TYPE))
+            
+        return self._cem
+    
+    #Devuelve el ejecutor en paralelo con el número de procesos indicado. Devuelve None si la ejecución es secuencial.
+    def _get_parallel_executor(self, workers=None):
+        workers=configuration['workers'] if workers is None else workers
+        
+        if workers <= 1:
+            return None
+        
+        if self._parallel_executor is not None and self._parallel_executor.workers != workers:
+            self.close_workers()
+        
+        if self._parallel_executor is None:
+            self._parallel_executor=Parallel_Executor(system=self,
+                                                      system_arguments=self._system_arguments,
+                                                      workers=workers)
+            
+        return self._parallel_executor
+    
+    #Generador de los resultados de stream_executions. Cada bloque se filtra y evalúa conjuntamente (en paralelo si se indica un ejecutor).
+    def _stream_results(self, criteria, documents, clean, executor=None):
+        if executor is None:
+            compiled_criteria=self._get_compiled_criteria(criteria)
+            block_size=configuration['documents_batch_size']
+        else:
+            block_size=executor.workers*configuration['chunk_size']
+        
+        self._instrumentation.start_run()
+        
+        try:
+            for block in iter_blocks(documents, block_size):
+                self._instrumentation.begin_batch([filename for filename, _ in block])
+                verdicts=self._rm.check_texts_validity([text for _, text in block],
+                                                       validity_checker=executor.check_validity if executor is not None else None)
+                self._instrumentation.end_batch()
+                
+                valid=[document for document, correct in zip(block, verdicts) if correct]
+                
+                if clean:
+                    for (filename, _), correct in zip(block, verdicts):
+                        if not correct:
+                            print('El documento ', filename, ' no es válido.')
+                
+                texts=[text for _, text in valid]
+                
+                if executor is not None:
+                    results=executor.evaluate(criteria, texts, clean=clean)
+                else:
+                    results=self._evaluate_documents(criteria, texts, compiled_criteria=compiled_criteria, clean=clean,
+                                                     names=[filename for filename, _ in valid])
+                    
+                #Los veredictos del bloque se almacenan en el fichero: no se acumulan durante toda la exportación.
+                self._rm.save_validity_cache()
+                
+                for (filename, _), result in zip(valid, results):
+                    yield filename, result
+        finally:
+            self._rm.save_validity_cache()
+    
+    #Calcula, en el proceso actual, la mejor semejanza de cada documento con cada subcriterio distinto de los criterios.
+    def _score_documents(self, criteria, texts, compiled_criteria=None):
+        subcriteria=get_subcriteria(criteria)
+        batch_size=configuration['documents_batch_size']
+        
+        results=list()
+        for start in range(0, len(texts), batch_size):
+            for processed_text in self._cc.pre_process_texts(texts[start:start+batch_size]):
+                results.append(self._cc.get_best_similarities(subcriteria, processed_text, compiled_criteria))
+                
+        return results
+    
+    #Evalúa una colección de documentos en el proceso actual. Los documentos se preprocesan por bloques para lematizar sus sentencias conjuntamente.
+    def _evaluate_documents(self,
+                            criteria,
+                            texts,
+                            compiled_criteria=None,
+                            autoconfigure_flag=False,
+                            get_found=False,
+                            clean=True,
+                            names=None
+                            ):
+        
+        batch_size=configuration['documents_batch_size']
+        instrumentation=self._instrumentation
+        
+        #Los informes de la instrumentación se identifican por el nombre del documento (o por su posición si no se indica).
+        names=list(range(len(texts))) if names is None else names
+            
+        results=list()
+        for start in range(0, len(texts), batch_size):
+            batch=texts[start:start+batch_size]
+            instrumentation.begin_batch(names[start:start+batch_size])
+            
+            for pos, (text, processed_text) in enumerate(zip(batch, self._cc.pre_process_texts(batch))):
+                instrumentation.select(pos)
+                results.append(self._check_criteria(criteria,
+                                                   text,
+                                                   autoconfigure_flag=autoconfigure_flag,
+                                                   get_found=get_found, 
+                                                   clean=clean,
+                                                   compiled_criteria=compiled_criteria,
+                                                   processed_text=processed_text))
+                instrumentation.complete()
+                
+        instrumentation.end_batch()
+        return results
+    
     #Devuelve los criterios que utilizará el sistema en función de si los introducidos están vacíos, el sistema 
     #almacena algunos, etc.
     def _init_criteria(self,criteria_dict):
@@ -322,6 +781,28 @@ class System():
         
         return criteria_dict.copy()
     
+    #Compila (preprocesa y vectoriza una única vez) los criterios almacenados en el sistema.
+    def _compile_stored_criteria(self):
+        self._compiled_criteria= self._cc.compile_criteria(self._criteria) if self._criteria!='' else None
+    
+    #Devuelve los criterios compilados asociados a los criterios introducidos. Reutiliza los del sistema si coinciden y, si no,
+    #los de los criterios externos utilizados recientemente.
+    def _get_compiled_criteria(self, criteria):
+        if self._compiled_criteria is not None and self._compiled_criteria.matches(criteria):
+            return self._compiled_criteria
+        
+        try:
+            key=json.dumps(criteria, sort_keys=True)
+        except (TypeError, ValueError):
+            return self._cc.compile_criteria(criteria)
+        
+        compiled_criteria=self._compiled_criteria_cache.get(key)
+        if compiled_criteria is None:
+            compiled_criteria=self._cc.compile_criteria(criteria)
+            self._compiled_criteria_cache.put(key, compiled_criteria)
+        
+        return compiled_criteria
+    
     #Evalúa si un documento cumple con un cierto criterio.
     def _check_criteria(self,
                        criteria=dict(),
@@ -329,10 +810,15 @@ class System():
                        
                        autoconfigure_flag=False,  #Flags de autoconfiguración. Ignorar.
                        get_found=False,
-                       clean=False
+                       clean=False,
+                       compiled_criteria=None,
+                       processed_text=None
                        ):
-                 
-        processed_text= self._cc.pre_process_text(text)
+        
+        if processed_text is None:
+            processed_text= self._cc.pre_process_text(text)
+            
+        self._cc.subcriteria_statistics.register_document()
 
         pos, results= 0, list()                        
         for criterion_name, subcriteria in criteria.items():               
@@ -340,7 +826,9 @@ class System():
                                        subcriteria, 
                                        processed_text, 
                                        autoconfigure_flag=autoconfigure_flag,
-                                       get_found=get_found)
+                                       get_found=get_found,
+                                       compiled_criteria=compiled_criteria,
+                                       adaptive_order=clean)
             
             
             if clean:
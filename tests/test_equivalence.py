@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Pruebas de equivalencia
+
+    Comprueban que las versiones optimizadas del sistema obtienen los mismos resultados que los algoritmos originales (ver
+    benchmarks/reference_implementations):
+        -Longest common substring de los términos fuera del vocabulario.
+        -Semejanza de un concepto con las sentencias de un documento: compare_sentences y el motor vectorizado (criterios sin
+        compilar, compilados, con filas top-k y documentos deserializados).
+        -Búsqueda ordenada de los kw_threshold_value.
+        -Resultados obtenidos a partir del tensor de semejanzas (Score_Tensor) frente a check_criterion.
+        -Orden adaptativo de los subcriterios: el veredicto OK/KO es el mismo que con el orden del fichero.
+
+    Se ejecutan sin el modelo de Spacy y sin el modelo de Word2vec: utilizan el lematizador sustituto y un modelo de vectorización
+    sintético reducido (ver benchmarks/synthetic_data).
+
+    Uso:
+        python -m pytest tests
+'''
+
+import os
+import sys
+
+TESTS_DIR=os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), 'benchmarks'))
+
+from synthetic_data import Synthetic_Corpus_Generator, Stub_Lemmatizer
+from reference_implementations import reference_compare_sentences, reference_longest_common_substring, reference_best_kw_threshold_values
+from criteria_checker import Criteria_Checker
+from learning_module import Learning_Module
+from oov_similarity import longest_common_substring_length
+from score_tensor import Score_Tensor, get_subcriteria
+from utilities import configuration
+import pickle
+import random
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+
+#Tolerancia en las semejanzas: el motor vectorizado trabaja en floats de 32.
+TOLERANCE=1e-5
+
+
+class Equivalence_Test(unittest.TestCase):
+
+    #El modelo, las stopwords y el corpus se generan una única vez para todas las pruebas.
+    @classmethod
+    def setUpClass(cls):
+        cls.workdir=tempfile.mkdtemp()
+
+        cls.generator=Synthetic_Corpus_Generator(seed=1, words_per_topic=12, acronyms_per_topic=3, dimension=16)
+        model_file=cls.generator.write_embedding_model(os.path.join(cls.workdir, 'model'))
+        stopwords_file=os.path.join(cls.workdir, 'stopwords.txt')
+        cls.generator.write_stopwords(stopwords_file)
+
+        cls.cc=Criteria_Checker(pre_trained_model_file=model_file, stopwords_file=stopwords_file, nlp=Stub_Lemmatizer())
+        cls.ta=cls.cc.text_analyzer
+
+        cls.criteria=cls.generator.generate_criteria(subcriteria_per_criterion=4)
+        cls.texts=[text for text, _ in cls.generator.generate_corpus(num_documents=8, num_sentences=6).values()]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    #Cada prueba parte de la configuración original, aunque modifique los valores umbral.
+    def setUp(self):
+        self._configuration=dict(configuration)
+
+    def tearDown(self):
+        configuration.clear()
+        configuration.update(self._configuration)
+
+    '''
+        PRUEBAS
+    '''
+
+    #Longest common substring frente a la tabla de sufijos completa, incluidos los términos vacíos y sin caracteres comunes.
+    def test_longest_common_substring(self):
+        terms=['', 'a', 'rgpd', 'lopdgdd', 'gdd', 'abcabc', 'cab', 'xyz', 'protección', 'ción']
+        terms+=[term for _, others in self._get_documents()[0] for term in others]
+
+        for x in terms:
+            for y in terms:
+                self.assertEqual(longest_common_substring_length(x, y), reference_longest_common_substring(x, y), (x, y))
+
+    #Semejanza de cada concepto con cada sentencia: compare_sentences y el motor vectorizado frente a la implementación original.
+    def test_compare_sentences(self):
+        concepts=self._get_concepts()
+        compiled=self.cc.compile_criteria(self.criteria)
+
+        for document in self._get_documents():
+            sentences=list(document)
+
+            for subcriterion, (concept_vect, concept_others) in concepts:
+                expected=np.array([reference_compare_sentences(concept_vect, concept_others, sent_vect, sent_others)
+                                   for sent_vect, sent_others in sentences])
+
+                compared=[self.ta.compare_sentences(concept_vect, concept_others, sent_vect, sent_others) for sent_vect, sent_others in sentences]
+                np.testing.assert_allclose(compared, expected, atol=TOLERANCE)
+
+                scores=self.ta.compare_concept_with_document(concept_vect, concept_others, document)
+                np.testing.assert_allclose(scores, expected, atol=TOLERANCE)
+
+                compiled_vect, compiled_others= compiled.get_concept(subcriterion)
+                scores=self.ta.compare_concept_with_document(compiled_vect, compiled_others, document,
+                                                             concept_rows=compiled.get_concept_rows(subcriterion))
+                np.testing.assert_allclose(scores, expected, atol=TOLERANCE)
+
+    #Filas top-k de los criterios compilados: los términos fuera de las k filas se comparan con el modelo completo.
+    def test_compare_sentences_top_k(self):
+        configuration['concept_rows_top_k']=3
+        compiled=self.cc.compile_criteria(self.criteria)
+
+        for document in self._get_documents():
+            sentences=list(document)
+
+            for subcriterion, (concept_vect, concept_others) in self._get_concepts():
+                expected=[reference_compare_sentences(concept_vect, concept_others, sent_vect, sent_others) for sent_vect, sent_others in sentences]
+
+                compiled_vect, compiled_others= compiled.get_concept(subcriterion)
+                scores=self.ta.compare_concept_with_document(compiled_vect, compiled_others, document,
+                                                             concept_rows=compiled.get_concept_rows(subcriterion))
+                np.testing.assert_allclose(scores, expected, atol=TOLERANCE)
+
+    #Documentos deserializados (caché de documentos, procesos de evaluación): no conservan la matriz del modelo.
+    def test_compare_sentences_pickled_document(self):
+        for document in self._get_documents():
+            restored=pickle.loads(pickle.dumps(document))
+
+            for _, (concept_vect, concept_others) in self._get_concepts():
+                np.testing.assert_allclose(self.ta.compare_concept_with_document(concept_vect, concept_others, restored),
+                                           self.ta.compare_concept_with_document(concept_vect, concept_others, document),
+                                           atol=TOLERANCE)
+
+    #Búsqueda ordenada de los kw_threshold_value frente a la búsqueda original (un recorrido del corpus por valor candidato).
+    def test_best_kw_threshold_values(self):
+        rng=random.Random(0)
+        lm=Learning_Module()
+
+        for size in (1, 7, 60):
+            results=[[('OK', rng.randint(0, 6)/6) for _ in range(4)] for _ in range(size)]
+            expected=[[rng.choice(['OK', 'KO']) for _ in range(4)] for _ in range(size)]
+
+            self.assertEqual(lm.get_best_kw_threshold_values(results=results, expected_results=expected, resolution=0.01),
+                             reference_best_kw_threshold_values(results, expected))
+
+    #Los resultados obtenidos a partir del tensor de semejanzas coinciden con los de check_criterion, con cualquier threshold_value.
+    def test_score_tensor_found(self):
+        subcriteria=get_subcriteria(self.criteria)
+        compiled=self.cc.compile_criteria(self.criteria)
+        documents=self._get_documents()
+
+        scores=np.array([self.cc.get_best_similarities(subcriteria, document, compiled) for document in documents], dtype=np.float32)
+        tensor=Score_Tensor(documents=list(range(len(documents))), criteria=self.criteria, scores=scores)
+
+        for threshold_value in (0.3, 0.5, configuration['threshold_value']):
+            configuration['threshold_value']=threshold_value
+
+            for document, results in zip(documents, tensor.get_results(self.criteria)):
+                for pos, subcriteria in enumerate(self.criteria.values()):
+                    verdict, percentage, found= self.cc.check_criterion(pos, subcriteria, document, autoconfigure_flag=True,
+                                                                       get_found=True, compiled_criteria=compiled)
+
+                    self.assertEqual(results[pos], ('OK' if verdict else 'KO', percentage, found))
+
+    #El orden adaptativo de los subcriterios no modifica el veredicto de ningún criterio, con distintos kw_threshold_value.
+    def test_adaptive_order(self):
+        configuration['adaptive_subcriteria_order']=True
+        compiled=self.cc.compile_criteria(self.criteria)
+
+        for kw_threshold_value in ({}, {0: 0.25, 1: 0.5, 2: 0.75, 3: 1.0}, {pos: 0.0 for pos in range(len(self.criteria))}):
+            configuration['kw_threshold_value']=kw_threshold_value
+            self.cc.subcriteria_statistics.reset_counters()
+
+            #Varias pasadas, de modo que el orden adaptativo utilice las estadísticas de las anteriores.
+            for _ in range(3):
+                for document in self._get_documents():
+                    expected=self._check(document, compiled, adaptive=False)
+                    obtained=self._check(document, compiled, adaptive=True)
+
+                    self.assertEqual(obtained, expected)
+                    self.assertTrue(all(isinstance(x, (bool, np.bool_)) for x in obtained))
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Documentos del corpus preprocesados (Document_Matrix), sin resultados de conceptos almacenados.
+    def _get_documents(self):
+        return self.cc.pre_process_texts(self.texts)
+
+    #Subcriterios relevantes de los criterios y su representación procesada.
+    def _get_concepts(self):
+        concepts=[(subcriterion, self.ta.transform(subcriterion)) for subcriterion in get_subcriteria(self.criteria)]
+        return [(subcriterion, concept) for subcriterion, concept in concepts if concept[0] is not False]
+
+    #Veredicto de cada criterio en un documento. Cada evaluación parte del documento sin resultados de conceptos almacenados.
+    def _check(self, document, compiled, adaptive):
+        document.concept_results.clear()
+        self.cc.subcriteria_statistics.register_document()
+
+        verdicts=list()
+        for pos, subcriteria in enumerate(self.criteria.values()):
+            verdict, percentage= self.cc.check_criterion(pos, subcriteria, document, compiled_criteria=compiled, adaptive_order=adaptive)
+            if adaptive:
+                self.assertIsNone(percentage)
+
+            verdicts.append(verdict)
+
+        return verdicts
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,22 +13,37 @@
 '''
 
 from linguistic_model import Linguistic_Model
-from words_model import Words_Vectorization_Model
+from words_model import Words_Vectorization_Model, OOV_ID
 from numpy import dot
-from numpy.linalg import norm
 from sentence_processing import Text_Preprocessing_Module
+from similarity_engine import Similarity_Engine, build_document_matrix, build_document_matrix_from_ids, build_document_matrix_from_arrays
+from oov_similarity import OOV_Similarity_Engine
+from instrumentation import NULL_INSTRUMENTATION
+from utilities import configuration
+import hashlib
+import os
 
 class Text_Analyzer():
     
     def __init__(self, 
                  pre_trained_model_file='',
                  model_type='',
-                 stopwords_file=''
+                 stopwords_file='',
+                 pipeline_profile='lemmatize',  #Perfil del pipeline de Spacy utilizado para lematizar (ver Linguistic_Model).
+                 nlp=None                       #Pipeline de Spacy ya cargado. Si se indica, no se carga model_type (ver Linguistic_Model).
                  ):
         
-        self._linguistic_model=Linguistic_Model(model_type=model_type, stopwords_file=stopwords_file) #Módulo encargado de análisis del texto.
+        self._linguistic_model=Linguistic_Model(model_type=model_type, stopwords_file=stopwords_file, pipeline_profile=pipeline_profile, nlp=nlp) #Módulo encargado de análisis del texto.
         self._words_vectorization_model= Words_Vectorization_Model(pre_trained_model_file= pre_trained_model_file) #Módulo de vectorización 
         self._text_pre_processing_module= Text_Preprocessing_Module(linguistic_model=self._linguistic_model) #Módulo de pre-procesamiento de textos.
+        self._oov_similarity_engine= OOV_Similarity_Engine() #Motor de semejanza entre términos fuera del vocabulario.
+        self._similarity_engine= Similarity_Engine(oov_engine=self._oov_similarity_engine) #Motor de semejanza vectorizado.
+        
+        #Parámetros que determinan el resultado del preprocesamiento (ver get_fingerprint).
+        self._preprocessing_parameters=(pre_trained_model_file, model_type, stopwords_file, pipeline_profile)
+        
+        #Instrumentación (ver Instrumentation y set_instrumentation).
+        self._instrumentation=NULL_INSTRUMENTATION
         
     '''
         MÉTODOS PRINCIPALES
@@ -62,6 +77,83 @@ class Text_Analyzer():
                           ):
         
         return self._compare_sentences_average_mode(concept_vect, concept_others, sent_vect, sent_others)
+    
+    '''
+        Determina en qué grado aparece un concepto en cada una de las sentencias de un documento.
+        
+        Es equivalente a aplicar compare_sentences sobre cada sentencia del documento, pero evalúa todas las sentencias
+        a la vez mediante el motor de semejanza vectorizado.
+        
+        Input:
+            - concept_vect: vector con los vectores que representan los términos del concepto.
+            - concept_others: vector con los términos que no pueden representarse como vectores que contiene el concepto.
+            - document: Document_Matrix. Documento procesado en el que se busca el concepto.
+            - concept_rows: List. Semejanza precalculada de cada término del concepto con el vocabulario (ver Compiled_Criteria). Opcional.
+            
+        Output:
+            - Array de numpy con un valor real entre 0 y 1 por cada sentencia del documento.
+    '''
+    def compare_concept_with_document(self,
+                                      concept_vect,
+                                      concept_others,
+                                      document,
+                                      concept_rows=None
+                                      ):
+        
+        #Documento deserializado: se le vuelve a asociar la matriz del modelo.
+        if document.needs_vectors():
+            self.attach_vectors(document)
+        
+        return self._similarity_engine.score_sentences(concept_vect, concept_others, document, concept_rows=concept_rows)
+    
+    '''
+        Agrupa las sentencias procesadas de un documento en una única matriz que puede utilizar el motor de semejanza.
+        
+        Input:
+            -processed_text: List. Lista de tuplas (sent_vect, sent_others), una por sentencia.
+            
+        Output:
+            -Document_Matrix. Representación matricial del documento.
+    '''
+    def build_document_matrix(self, processed_text):
+        return build_document_matrix(processed_text)
+    
+    '''
+        Agrupa las sentencias de un documento, representadas mediante los identificadores de sus términos (ver transform_to_ids),
+        en una única matriz que puede utilizar el motor de semejanza.
+        
+        Input:
+            -sentences: List. Lista de tuplas (sent_ids, sent_others), una por sentencia.
+            
+        Output:
+            -Document_Matrix. Representación matricial del documento. Conserva los identificadores de los términos.
+    '''
+    def build_document_matrix_from_ids(self, sentences):
+        return build_document_matrix_from_ids(sentences, self._words_vectorization_model.get_vectors())
+    
+    '''
+        Construye la representación matricial de un documento a partir de los identificadores de todos sus términos y de los límites
+        de sus sentencias (ver Document_Cache.get).
+        
+        Input:
+            -token_ids: Array de enteros. Identificadores de los términos del documento.
+            -offsets: Array de enteros. Límites de las sentencias.
+            -others: List. Términos fuera del vocabulario de cada sentencia.
+            
+        Output:
+            -Document_Matrix. Representación matricial del documento. Conserva los identificadores de los términos.
+    '''
+    def build_document_matrix_from_arrays(self, token_ids, offsets, others):
+        return build_document_matrix_from_arrays(token_ids, offsets, others, self._words_vectorization_model.get_vectors())
+    
+    '''
+        Asocia la matriz del modelo de vectorización a un documento que no la tiene (por ejemplo, después de deserializarlo).
+        
+        Input:
+            -document: Document_Matrix. Documento generado con el mismo modelo de vectorización.
+    '''
+    def attach_vectors(self, document):
+        document.set_vectors(self._words_vectorization_model.get_vectors())
             
             
     '''
@@ -100,23 +192,159 @@ class Text_Analyzer():
         #Parte 2: Vectorizamos la frase
         return self._vectorize_sentence(processed_sentence)
     
+    '''
+        Aplica transform sobre una colección de sentencias. El preprocesamiento (y, en particular, la lematización) se realiza por lotes.
+        
+        Input:
+            -sentences: List. Sentencias a transformar.
+            -batch_size: Int. Número de sentencias por lote de lematización. Si no se indica, se utiliza el valor de configuración.
+            
+        Output:
+            -List. Una tupla (vectores, otros) por sentencia, igual a la que devolvería transform. (False, False) si la sentencia es irrelevante.
+    '''
+    def transform_many(self, sentences, batch_size=None):
+        result=list()
+        for processed_sentence in self._text_pre_processing_module.process_sentences(sentences, batch_size=batch_size):
+            result.append(self._vectorize_sentence(processed_sentence) if processed_sentence else (False, False))
+            
+        return result
+    
+    '''
+        Equivalente a transform, pero los términos del vocabulario se representan mediante su identificador (la fila que ocupa su 
+        vector en la matriz del modelo de vectorización) en lugar de mediante su vector.
+        
+        Input:
+            -sentence: String.
+            
+        Output:
+            -Lista de enteros. Identificadores de los términos de la sentencia que forman parte del vocabulario.
+            -Lista. Términos de la sentencia que no forman parte del vocabulario.
+            -Bool. En el caso de que la sentencia introducida no sea relevante, devuelve (False, False).
+    '''
+    def transform_to_ids(self, sentence):
+        processed_sentence= self._text_pre_processing_module.process_sentence(sentence)
+        
+        if not processed_sentence:
+            return False, False
+        
+        return self._identify_sentence(processed_sentence)
+    
+    '''
+        Aplica transform_to_ids sobre una colección de sentencias. El preprocesamiento se realiza por lotes.
+        
+        Input:
+            -sentences: List. Sentencias a transformar.
+            -batch_size: Int. Número de sentencias por lote de lematización. Si no se indica, se utiliza el valor de configuración.
+            
+        Output:
+            -List. Una tupla (identificadores, otros) por sentencia. (False, False) si la sentencia es irrelevante.
+    '''
+    def transform_many_to_ids(self, sentences, batch_size=None):
+        with self._instrumentation.stage('sentence_processing'):
+            processed_sentences=self._text_pre_processing_module.process_sentences(sentences, batch_size=batch_size)
+        
+        result=list()
+        with self._instrumentation.stage('vectorization'):
+            for processed_sentence in processed_sentences:
+                result.append(self._identify_sentence(processed_sentence) if processed_sentence else (False, False))
+            
+        return result
+    
     '''
         Dado un texto, devuelve el lenguaje en el que está escrito.
         
         Input:
             -text. String.
+            -fast: Boolean. Si es True, se utiliza directamente el detector de idioma, sin pasar por el pipeline de Spacy.
             
         Output:
             -String. cadena de caracteres que representa el lenguaje en el que está escrito el texto.
     '''
-    def detect_language(self, text):
+    def detect_language(self, text, fast=False):
+        if fast:
+            return self._linguistic_model.detect_language_fast(text=text)
+        
         return self._linguistic_model.detect_language(text=text)
     
     
+    '''
+        Devuelve las estadísticas de uso de las cachés del preprocesamiento (aciertos, fallos, tamaño, etc).
+        
+        Output:
+            -Dict. Ver Text_Preprocessing_Module.get_cache_statistics. Incluye, además, la caché de pares de términos fuera del vocabulario ('oov_pairs').
+    '''
+    def get_cache_statistics(self):
+        statistics=self._text_pre_processing_module.get_cache_statistics()
+        statistics['oov_pairs']=self._oov_similarity_engine.get_cache_statistics()
+        return statistics
+    
+    '''
+        Devuelve la huella del preprocesamiento: identifica los modelos, las stopwords, el pipeline de lematización (y su perfil) y
+        el modo de lematización utilizados. Dos analizadores con la misma huella transforman un texto en los mismos identificadores
+        y términos.
+        
+        Los ficheros se identifican por su ruta, tamaño y fecha de modificación.
+        
+        Output:
+            -String. Hash hexadecimal.
+    '''
+    def get_fingerprint(self):
+        pre_trained_model_file, model_type, stopwords_file, pipeline_profile= self._preprocessing_parameters
+        
+        #El pipeline de lematización (también si se ha indicado mediante nlp) y la lematización término a término (ver
+        #'token_lemma_cache') determinan los lemas y, por tanto, los identificadores de los términos.
+        fields=[model_type, pipeline_profile, self._get_file_fingerprint(pre_trained_model_file), self._get_file_fingerprint(stopwords_file),
+                self._linguistic_model.get_pipeline_identity(), str(configuration['token_lemma_cache'])]
+        
+        return hashlib.sha1('\n'.join(fields).encode('utf-8', errors='surrogatepass')).hexdigest()
+    
+    '''
+        Establece la instrumentación del analizador y de los componentes que utiliza (modelo lingüístico y motor de semejanza).
+        
+        Input:
+            -instrumentation: Instrumentation. Si es None, se desactiva.
+    '''
+    def set_instrumentation(self, instrumentation=None):
+        instrumentation=NULL_INSTRUMENTATION if instrumentation is None else instrumentation
+        
+        self._instrumentation=instrumentation
+        self._linguistic_model.instrumentation=instrumentation
+        self._similarity_engine.instrumentation=instrumentation
+    
+    '''
+        Devuelve el pipeline de Spacy del analizador si puede compartirse (ver Linguistic_Model.get_pipeline).
+        
+        Input:
+            -model_type: String. Modelo de Spacy que necesita el componente que lo solicita.
+            
+        Output:
+            -Pipeline de Spacy o None.
+    '''
+    def get_pipeline(self, model_type):
+        return self._linguistic_model.get_pipeline(model_type)
+    
+    '''
+        Devuelve el módulo de vectorización utilizado por el sistema.
+        
+        Output:
+            -Words_Vectorization_Model.
+    '''
+    def get_words_vectorization_model(self):
+        return self._words_vectorization_model
+    
+    
     '''
         MÉTODOS INTERNOS
     '''
     
+    #Identifica un fichero por su ruta absoluta, su tamaño y su fecha de modificación.
+    def _get_file_fingerprint(self, filename):
+        if filename=='' or not os.path.exists(filename):
+            return filename
+        
+        stat=os.stat(filename)
+        return os.path.abspath(filename)+':'+str(stat.st_size)+':'+str(stat.st_mtime_ns)
+    
     
     '''
         Dada una sentencia, devuelve dos listas:
@@ -128,18 +356,28 @@ class Text_Analyzer():
             en acrónimos, anglicismos, etc.
     '''     
     def _vectorize_sentence(self,sentence):
-        vector, others= [],[]
-        for word in sentence.split():
-            try:
-                vector.append(self._words_vectorization_model.get_word_vector(word))
-            except:
-                others.append(word)
+        ids, others= self._identify_sentence(sentence)
+        
+        #Los vectores se extraen de la matriz del modelo en una única operación.
+        vector=list(self._words_vectorization_model.get_vectors()[ids]) if len(ids)>0 else []
             
         return vector, others
     
+    #Equivalente a _vectorize_sentence, pero devuelve los identificadores de los términos del vocabulario en lugar de sus vectores.
+    #Todos los términos de la sentencia se buscan en el vocabulario de una vez. Los que no forman parte de él se identifican mediante OOV_ID.
+    def _identify_sentence(self,sentence):
+        words=sentence.split()
+        word_ids=self._words_vectorization_model.get_word_ids(words)
+        
+        ids=[word_id for word_id in word_ids if word_id!=OOV_ID]
+        others=[word for word, word_id in zip(words, word_ids) if word_id==OOV_ID] if len(ids)<len(words) else []
+            
+        return ids, others
+    
     #Dados dos vectores que representan dos términos, calcula su semejanza en base a la semejanza de cosenos.
+    #Los vectores del modelo están normalizados, por lo que basta con el producto escalar.
     def _get_cosine_similarity(self,word1, word2):   
-        return dot(word1,word2)/(norm(word1)*norm(word2))
+        return dot(word1,word2)
     
     '''
         Compara dos términos atendiendo al longest common substring entre ellos.
@@ -148,24 +386,7 @@ class Text_Analyzer():
         a la media de los caracteres de ambos términos.
     '''
     def _compare_longest_common_substring(self,X,Y):
-        m, n=len(X), len(Y)
-        
-        #Sufijos
-        LCSuff = [[0 for k in range(n+1)] for l in range(m+1)] 
-        
-        result = 0 
-        for i in range(m + 1): 
-            for j in range(n + 1): 
-                if (i == 0 or j == 0): 
-                    LCSuff[i][j] = 0
-                elif (X[i-1] == Y[j-1]): 
-                    LCSuff[i][j] = LCSuff[i-1][j-1] + 1
-                    result = max(result, LCSuff[i][j]) 
-                else: 
-                    LCSuff[i][j] = 0
-                    
-        #result almacena el longest common substring.
-        return result/((m+n)/2)
+        return self._oov_similarity_engine.similarity(X,Y)
       
     #Devuelve la semejanza existente entre dos sentencias. Esta semejanza se calcula a partir de la media de la semejanza 
     #máxima existente entre los términos del concepto y los términos de la sentencia en la que se busca dicho concepto.
@@ -10,6 +10,9 @@
     
 '''
 
+from collections import OrderedDict
+import threading
+
 '''
     Valores predeterminados de configuración del sistema
 '''
@@ -20,6 +23,55 @@ configuration['threshold_value']=
 configuration['kw_threshold_value']={}   
 configuration['default_threshold']=
 configuration['min_text_size']=
+
+#Separación entre los kw_threshold_value candidatos durante la autoconfiguración (0: búsqueda exacta).
+configuration['threshold_resolution']=0.01
+
+#Procesamiento por lotes: número de sentencias por llamada a Spacy y número de documentos que se preprocesan conjuntamente.
+configuration['spacy_batch_size']=256
+configuration['documents_batch_size']=32
+
+#Ejecución en paralelo: número de procesos (1: ejecución secuencial) y número máximo de documentos por bloque.
+configuration['workers']=1
+configuration['chunk_size']=64
+
+#Fichero (un objeto json por línea) en el que se almacenan los veredictos de validez de los documentos entre ejecuciones. Vacío: no se almacenan.
+configuration['validity_cache_file']=''
+#Número máximo de veredictos de validez que se conservan en memoria.
+configuration['validity_cache_size']=100000
+
+#Directorio de la caché de documentos preprocesados ('': desactivada).
+configuration['document_cache_dir']=''
+
+#Cachés del preprocesamiento. Número máximo de entradas (0 desactiva la caché).
+configuration['sentence_cache_size']=100000
+configuration['lemma_cache_size']=200000
+#Lematización término a término a partir de la caché (sin Spacy). Tan solo es exacta con lematizadores independientes del contexto (p.e: por tabla).
+configuration['token_lemma_cache']=False
+#Número máximo de pares de términos fuera del vocabulario cuya semejanza se almacena.
+configuration['oov_cache_size']=500000
+#Tamaño máximo de los n-gramas de caracteres del índice de términos fuera del vocabulario de cada documento.
+configuration['oov_ngram_size']=3
+#Semejanza precalculada de los términos de los subcriterios con todo el vocabulario. Se conservan los top_k términos más
+#semejantes (la semejanza con los demás se calcula cuando se necesita). top_k=0: se almacena de forma densa (un float por
+#término del vocabulario y término de los subcriterios, en cada proceso).
+configuration['concept_similarity_rows']=True
+configuration['concept_rows_top_k']=1000
+#Número máximo de criterios externos (distintos de los del sistema) cuya versión compilada se conserva.
+configuration['compiled_criteria_cache_size']=16
+
+#Vocabulario del modelo de vectorización en un índice proyectado en memoria y compartido entre procesos (en lugar de un
+#diccionario por proceso). Reduce la memoria de cada proceso a cambio de búsquedas algo más lentas.
+configuration['shared_vocabulary_index']=False
+
+#Servicio de evaluación: número máximo de documentos por lote, espera máxima (segundos) para completar un lote y número de
+#latencias recientes por operación con las que se calculan los percentiles.
+configuration['service_max_batch_size']=32
+configuration['service_max_wait']=0.005
+configuration['service_latency_window']=10000
+
+#Ordenar los subcriterios de cada criterio según su probabilidad de aparición y su coste (tan solo si se devuelve OK/KO).
+configuration['adaptive_subcriteria_order']=True
         
 
 
@@ -38,6 +90,113 @@ def read_file(filename, encoding='latin-1'):
     with open(filename, "r", encoding=encoding) as myfile:
         return myfile.read()    
     
+'''
+    Caché con política de reemplazo LRU (se descarta el elemento utilizado hace más tiempo).
+
+    Tiene un número máximo de entradas y contabiliza los aciertos y fallos. Puede compartirse entre varios hilos.
+'''
+class LRU_Cache():
+
+    def __init__(self,
+                 max_size=0     #Número máximo de entradas. Si es 0, la caché no almacena nada.
+                 ):
+
+        self._max_size=max_size
+        self._data=OrderedDict()
+        self._lock=threading.Lock()
+
+        self.hits=0
+        self.misses=0
+
+    '''
+        Devuelve el valor asociado a una clave. Si no existe, devuelve el valor por defecto.
+    '''
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits+=1
+                return self._data[key]
+
+            self.misses+=1
+            return default
+
+    '''
+        Almacena un valor. Si se supera el número máximo de entradas, elimina la utilizada hace más tiempo.
+    '''
+    def put(self, key, value):
+        if self._max_size <= 0:
+            return
+
+        with self._lock:
+            self._data[key]=value
+            self._data.move_to_end(key)
+
+            if len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+
+    '''
+        Elimina todas las entradas y reinicia los contadores.
+    '''
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits=0
+            self.misses=0
+
+    '''
+        Devuelve las estadísticas de uso de la caché.
+
+        Output:
+            -Dict. Número de entradas, tamaño máximo, aciertos, fallos y tasa de aciertos.
+    '''
+    def get_statistics(self):
+        total=self.hits+self.misses
+        return {'size': len(self._data),
+                'max_size': self._max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits/total if total > 0 else 0}
+
+    def __len__(self):
+        return len(self._data)
+
+'''
+    Divide un texto en las sentencias que el sistema analiza por separado (por saltos de línea y por puntos).
+
+    Input:
+        -text: String. Texto a dividir.
+
+    Output:
+        -Generador de Strings. Sentencias (sin procesar) del texto.
+'''
+def split_sentences(text):
+    for paragraph in text.split('\n'):
+        for sentence in paragraph.split('.'):
+            yield sentence
+
+'''
+    Agrupa los elementos de un iterable en bloques consecutivos, sin cargarlo completo en memoria.
+
+    Input:
+        -iterable: Iterable. Elementos a agrupar.
+        -size: Int. Número máximo de elementos por bloque.
+
+    Output:
+        -Generador de Lists. Bloques de, como mucho, size elementos, en el orden original.
+'''
+def iter_blocks(iterable, size):
+    block=list()
+    for element in iterable:
+        block.append(element)
+        
+        if len(block) >= size:
+            yield block
+            block=list()
+            
+    if len(block) > 0:
+        yield block
+
 '''
     Lee los criterios (y subcriterios) asociados a un fichero de criterios.
 
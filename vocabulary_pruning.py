@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+'''
+    Módulo de reducción del vocabulario
+
+    La mayor parte de los términos del modelo pre-entrenado de Word2vec nunca aparecen en los documentos ni en los criterios
+    que evalúa el sistema. Este módulo genera un modelo reducido al dominio que contiene tan solo los lemas que aparecen en
+    una colección de documentos y en un fichero de criterios.
+
+    Para obtener los lemas, aplica el mismo preprocesamiento que utiliza el sistema durante la evaluación. El modelo reducido
+    se almacena en el formato binario propio del módulo de vectorización, de modo que puede cargarse directamente
+    (indicando como modelo pre-entrenado la ubicación del fichero .npy generado).
+
+    Uso desde la línea de comandos:
+        python vocabulary_pruning.py <modelo> <model_type> <stopwords> <csv_documentos> <fichero_criterios> <destino> [top_n]
+'''
+
+from collections import Counter
+from remodeling_module import Remodeling_Module
+from utilities import read_criteria, split_sentences
+from words_model import OOV_ID
+import sys
+
+
+class Vocabulary_Pruning_Module():
+
+    def __init__(self,
+                 text_analyzer=''   #Text_Analyzer que se utiliza para preprocesar los textos. Su modelo de vectorización es el que se reduce.
+                 ):
+
+        self._text_analyzer=text_analyzer
+        self._rm=Remodeling_Module(text_analyzer=text_analyzer)
+
+    '''
+        MÉTODOS PRINCIPALES
+    '''
+
+    '''
+        Genera un modelo reducido a partir de una colección de documentos y un fichero de criterios.
+
+        Input:
+            -csv_file_content: String. Ubicación del csv con el contenido de los documentos (mismo formato que el utilizado por el sistema).
+            -criteria_file: String. Ubicación del fichero de criterios. Sus lemas se conservan siempre.
+            -destination: String. Ruta base del modelo reducido. Se generan los ficheros <destination>.npy y <destination>.vocab.
+            -separator: String. Separador utilizado en el csv.
+            -top_n: Int. Si es mayor que 0, tan solo se conservan los top_n lemas más frecuentes de los documentos (además de los de los criterios).
+
+        Output:
+            -Int. Número de términos del modelo reducido.
+    '''
+    def build_domain_vocabulary(self,
+                                csv_file_content='',
+                                criteria_file='',
+                                destination='',
+                                separator='#',
+                                top_n=0
+                                ):
+
+        frequencies=Counter()
+        if csv_file_content!='':
+            #Los documentos se recorren uno a uno: el corpus completo nunca se carga en memoria.
+            for _, text in self._rm.iter_text_content_from_csv(csv_file=csv_file_content, separator=separator):
+                frequencies.update(self._get_lemmas(text))
+
+        criteria_lemmas=list()
+        if criteria_file!='':
+            for subcriteria in read_criteria(criteria_file).values():
+                #Cada subcriterio se procesa completo, igual que al compilar los criterios (los lemas dependen del contexto).
+                for subcriterion in subcriteria:
+                    processed=self._text_analyzer.preprocess(subcriterion)
+
+                    if processed:
+                        criteria_lemmas.extend(processed.split())
+
+        words_model=self._text_analyzer.get_words_vectorization_model()
+
+        #Ordenamos por frecuencia, de modo que los términos más frecuentes ocupan las primeras filas del modelo reducido.
+        document_lemmas=[word for word, _ in frequencies.most_common()]
+        if top_n > 0:
+            word_ids=words_model.get_word_ids(document_lemmas)
+            document_lemmas=[word for word, word_id in zip(document_lemmas, word_ids) if word_id!=OOV_ID][:top_n]
+
+        words=list(dict.fromkeys(criteria_lemmas + document_lemmas))
+
+        return words_model.save_vocabulary_subset(destination, words)
+
+    '''
+        MÉTODOS AUXILIARES
+    '''
+
+    #Devuelve los lemas de un texto, aplicando el preprocesamiento del sistema sentencia a sentencia.
+    def _get_lemmas(self, text):
+        result=list()
+        for sentence in split_sentences(text):
+            processed=self._text_analyzer.preprocess(sentence)
+
+            if processed:
+                result.extend(processed.split())
+
+        return result
+
+
+if __name__ == '__main__':
+    from text_analyzer import Text_Analyzer
+
+    model_file, model_type, stopwords_file, csv_file, criteria_file, destination= sys.argv[1:7]
+    top_n=int(sys.argv[7]) if len(sys.argv) > 7 else 0
+
+    ta=Text_Analyzer(pre_trained_model_file=model_file, model_type=model_type, stopwords_file=stopwords_file)
+    num_words=Vocabulary_Pruning_Module(text_analyzer=ta).build_domain_vocabulary(csv_file_content=csv_file,
+                                                                                 criteria_file=criteria_file,
+                                                                                 destination=destination,
+                                                                                 top_n=top_n)
+
+    print('Modelo reducido almacenado en ', destination, '. Número de términos: ', num_words)
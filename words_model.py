@@ -9,18 +9,60 @@
     
     Esta representación (una posición en el espacio vectorial) es la que se utilizará para comparar las distintas palabras que componene los textos.
     
+    Al cargar el modelo, todos los vectores se normalizan (norma 1) y se almacenan en una única matriz contigua de floats de 32,
+    junto a un índice que asocia cada término con su fila. De esta forma, la semejanza de cosenos entre dos términos se reduce
+    a un producto escalar.
+    
+    Para evitar analizar el formato de texto de Word2vec en cada arranque, la primera carga genera una caché en un formato 
+    binario propio junto al fichero original:
+        -<fichero>.npy: matriz de floats de 32 con los vectores normalizados.
+        -<fichero>.vocab: vocabulario, un término por línea (en el orden de las filas de la matriz).
+    
+    Las cargas posteriores proyectan la matriz en memoria (memory-map) en modo de solo lectura, de modo que el arranque es 
+    casi inmediato y las páginas se comparten entre los procesos de una misma máquina.
+    
+    Opcionalmente (configuración 'shared_vocabulary_index'), el vocabulario tampoco se carga en cada proceso: se utiliza un 
+    índice binario proyectado en memoria (<fichero>.vindex, ver shared_vocabulary) que comparten todos los procesos. Así,
+    varios procesos de evaluación ocupan, en cuanto al modelo, prácticamente la misma memoria que uno solo.
+    
+    Gensim tan solo se importa cuando es necesario analizar el formato de texto de Word2vec, de modo que los modelos en formato
+    binario propio (.npy) pueden cargarse sin él.
+    
 '''
 
 
-from gensim.models import KeyedVectors
+from shared_vocabulary import Shared_Vocabulary_Index, build_vocabulary_index, VOCABULARY_INDEX_EXTENSION
+from utilities import configuration
+import numpy as np
+import os
+import warnings
+
+
+NATIVE_MATRIX_EXTENSION='.npy'
+NATIVE_VOCABULARY_EXTENSION='.vocab'
+
+#Identificador de los términos que no forman parte del vocabulario (ver get_word_ids).
+OOV_ID=-1
 
 class Words_Vectorization_Model():
     
     def __init__(self, 
-                 pre_trained_model_file=''  #Ubicación del texto que almacena el modelo pre-entrenado de Word2vec.
+                 pre_trained_model_file='', #Ubicación del texto que almacena el modelo pre-entrenado de Word2vec. También admite un modelo en formato propio (.npy).
+                 use_cache=True             #Determina si se utiliza (y genera) la caché binaria del modelo.
                  ):
         
-        self.model=self.__load_pre_trained_model(filename=pre_trained_model_file)
+        #Matriz (num_términos x dimensión) con los vectores normalizados e índice término -> fila.
+        prefix=self.__get_native_prefix(pre_trained_model_file, use_cache) if configuration['shared_vocabulary_index'] else None
+        index=self.__load_shared_index(prefix) if prefix is not None else None
+        
+        if index is not None:
+            #El índice se comparte entre procesos: la lista de términos no se carga (ver _get_word).
+            self._vectors=np.load(prefix+NATIVE_MATRIX_EXTENSION, mmap_mode='r')
+            self._index=index
+            self._words=None
+        else:
+            self._vectors, self._words=self.__load_vectors(filename=pre_trained_model_file, use_cache=use_cache)
+            self._index={word: pos for pos, word in enumerate(self._words)}
         
         
     '''
@@ -33,10 +75,43 @@ class Words_Vectorization_Model():
                 -word: String. Término del cual queremos obtener el vector asociado.
                 
             Output:
-                -Vector de floats de 32: vector en el espacio vectorial definido por el modelo pre-entrenado que identifica unívocamente el término introducido. 
+                -Vector de floats de 32: vector (normalizado) en el espacio vectorial definido por el modelo pre-entrenado que identifica unívocamente el término introducido. 
+                Es una vista sobre la matriz del modelo, no una copia.
     '''
     def get_word_vector(self,word):
-        return self.model[word]
+        return self._vectors[self._index[word]]
+    
+    '''
+        Dada una cadena de caracteres, devuelve la fila que ocupa su vector en la matriz del modelo.
+            Input:
+                -word: String. Término del cual queremos obtener la fila asociada.
+                
+            Output:
+                -Int. Fila de la matriz del modelo. Si el término no forma parte del vocabulario, lanza un KeyError.
+    '''
+    def get_word_id(self,word):
+        return self._index[word]
+    
+    '''
+        Dada una colección de términos, devuelve la fila que ocupa el vector de cada uno de ellos en la matriz del modelo.
+        A diferencia de get_word_id, los términos que no forman parte del vocabulario no lanzan ninguna excepción.
+            Input:
+                -words: Iterable de strings. Términos (por ejemplo, los de una sentencia).
+                
+            Output:
+                -List de enteros. Fila de cada término, en el mismo orden. OOV_ID si el término no forma parte del vocabulario.
+    '''
+    def get_word_ids(self, words):
+        get=self._index.get
+        return [get(word, OOV_ID) for word in words]
+    
+    '''
+        Devuelve la matriz con los vectores normalizados de todos los términos del vocabulario.
+            Output:
+                -Matriz de floats de 32 (num_términos x dimensión). Cada fila es el vector normalizado de un término.
+    '''
+    def get_vectors(self):
+        return self._vectors
     
     '''
         Dado un vector del espacio vectorial, devuelve su cadena de caracteres asociada.
@@ -47,13 +122,182 @@ class Words_Vectorization_Model():
                 -String. Cadena de caracteres que representa el vector introducido.
     '''
     def get_original_word(self, word_vector):
-        #Devolvemos el primer elemento
-        return self.model.wv.most_similar(positive=[word_vector])[0][0]
+        #Devolvemos el término más semejante (semejanza de cosenos).
+        similarities=np.dot(self._vectors, word_vector/np.linalg.norm(word_vector))
+        return self._get_word(int(np.argmax(similarities)))
+        
+    '''
+        Almacena, en el formato binario propio del sistema, un modelo reducido que contiene tan solo los términos indicados.
+        El modelo resultante puede cargarse directamente indicando la ubicación del fichero <prefix>.npy.
+            Input:
+                -prefix: String. Ruta base del modelo reducido. Se generan los ficheros <prefix>.npy y <prefix>.vocab.
+                -words: Iterable. Términos que se desean conservar. Se ignoran los que no forman parte del vocabulario.
+                
+            Output:
+                -Int. Número de términos almacenados.
+    '''
+    def save_vocabulary_subset(self, prefix, words):
+        kept=[word for word in words if word in self._index]
+        rows=[self._index[word] for word in kept]
         
+        save_native_model(prefix, kept, self._vectors[rows] if len(rows)>0 else np.zeros((0, self._vectors.shape[1]), dtype=np.float32))
+        return len(kept)
+    
+    '''
+        Libera el índice compartido del vocabulario (si se utiliza). El modelo no puede utilizarse después.
+    '''
+    def close(self):
+        if isinstance(self._index, Shared_Vocabulary_Index):
+            self._index.close()
+    
     '''
         MÉTODOS AUXILIARES
     '''
+    #Devuelve el término que ocupa una fila de la matriz.
+    def _get_word(self, pos):
+        return self._words[pos] if self._words is not None else self._index.get_word(pos)
+    
+    #Devuelve la ruta base del modelo en formato binario propio (generándolo si es necesario). None si no se utiliza dicho formato.
+    def __get_native_prefix(self, filename, use_cache):
+        if filename.endswith(NATIVE_MATRIX_EXTENSION):
+            return filename[:-len(NATIVE_MATRIX_EXTENSION)]
+        
+        if not use_cache:
+            return None
+        
+        if not self.__valid_cache(filename):
+            self.__load_vectors(filename=filename, use_cache=use_cache)
+            
+        #Si la caché no ha podido generarse (ver __load_vectors), no se utiliza el formato binario propio.
+        return filename if self.__valid_cache(filename) else None
+    
+    #Carga el índice compartido del vocabulario. None si no puede generarse (por ejemplo, el directorio del modelo es de solo lectura).
+    def __load_shared_index(self, prefix):
+        try:
+            return load_vocabulary_index(prefix)
+        except OSError as exception:
+            warnings.warn('No se ha podido generar el índice compartido del vocabulario '+prefix+': '+str(exception))
+            return None
+    
+    #Carga los vectores normalizados y el vocabulario. Utiliza la caché binaria si existe y está actualizada.
+    def __load_vectors(self, filename='', use_cache=True):
+        if filename.endswith(NATIVE_MATRIX_EXTENSION):
+            return load_native_model(filename[:-len(NATIVE_MATRIX_EXTENSION)])
+        
+        if use_cache and self.__valid_cache(filename):
+            return load_native_model(filename)
+        
+        vectors, words=self.__build_normalized_store(self.__load_pre_trained_model(filename=filename))
+        
+        if use_cache:
+            #Si la caché no puede generarse (por ejemplo, el directorio del modelo es de solo lectura), se utiliza el modelo en memoria.
+            try:
+                save_native_model(filename, words, vectors)
+            except OSError as exception:
+                warnings.warn('No se ha podido generar la caché binaria del modelo '+filename+': '+str(exception))
+                return vectors, words
+            
+            return load_native_model(filename)
+        
+        return vectors, words
+    
+    #Determina si la caché binaria asociada al fichero existe y es posterior al propio fichero.
+    def __valid_cache(self, filename):
+        matrix_file=filename+NATIVE_MATRIX_EXTENSION
+        vocabulary_file=filename+NATIVE_VOCABULARY_EXTENSION
+        
+        if not (os.path.exists(matrix_file) and os.path.exists(vocabulary_file)):
+            return False
+        
+        if not os.path.exists(filename):
+            return True
+        
+        return min(os.path.getmtime(matrix_file), os.path.getmtime(vocabulary_file)) >= os.path.getmtime(filename)
+    
     #Carga el modelo pre-entrenado de Word2Vec
     def __load_pre_trained_model(self,filename=''):
+        from gensim.models import KeyedVectors
+        
         return KeyedVectors.load_word2vec_format(filename, binary=False)
     
+    #Genera la matriz de vectores normalizados y el vocabulario (ordenado por filas) a partir del modelo cargado.
+    def __build_normalized_store(self, model):
+        words=list(model.index_to_key) if hasattr(model, 'index_to_key') else list(model.index2word)
+        
+        vectors=np.array(model.vectors, dtype=np.float32, order='C')
+        norms=np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms==0]=1   #Los vectores nulos se mantienen nulos.
+        vectors/=norms
+        
+        return vectors, words
+
+
+'''
+    Almacena un modelo en el formato binario propio del sistema.
+    
+    Input:
+        -prefix: String. Ruta base del modelo. Se generan los ficheros <prefix>.npy y <prefix>.vocab.
+        -words: List. Términos del vocabulario, en el orden de las filas de la matriz.
+        -vectors: Matriz de floats de 32 (num_términos x dimensión).
+'''
+def save_native_model(prefix, words, vectors):
+    matrix_file=prefix+NATIVE_MATRIX_EXTENSION
+    vocabulary_file=prefix+NATIVE_VOCABULARY_EXTENSION
+    
+    #Escribimos en ficheros temporales y los renombramos, de modo que otro proceso nunca vea una caché a medio escribir.
+    #Los ficheros temporales son propios de cada proceso: varios procesos pueden generar la caché a la vez.
+    suffix='.'+str(os.getpid())+'.tmp'
+    
+    try:
+        with open(matrix_file+suffix, 'wb') as file_pointer:
+            np.save(file_pointer, np.ascontiguousarray(vectors, dtype=np.float32))
+            
+        with open(vocabulary_file+suffix, 'w', encoding='utf-8') as file_pointer:
+            for word in words:
+                file_pointer.write(word+'\n')
+                
+        os.replace(matrix_file+suffix, matrix_file)
+        os.replace(vocabulary_file+suffix, vocabulary_file)
+    finally:
+        for temporary in (matrix_file+suffix, vocabulary_file+suffix):
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+'''
+    Carga un modelo almacenado en el formato binario propio del sistema.
+    
+    Input:
+        -prefix: String. Ruta base del modelo (sin extensión).
+        -mmap: Boolean. Si es True, la matriz se proyecta en memoria en modo de solo lectura en lugar de leerse.
+        
+    Output:
+        -Matriz de floats de 32 (num_términos x dimensión).
+        -List. Términos del vocabulario, en el orden de las filas de la matriz.
+'''
+def load_native_model(prefix, mmap=True):
+    vectors=np.load(prefix+NATIVE_MATRIX_EXTENSION, mmap_mode='r' if mmap else None)
+    
+    with open(prefix+NATIVE_VOCABULARY_EXTENSION, 'r', encoding='utf-8') as file_pointer:
+        words=file_pointer.read().split('\n')[:-1]
+        
+    return vectors, words
+
+'''
+    Carga el índice compartido del vocabulario de un modelo en formato binario propio. Si no existe o es anterior al
+    vocabulario, lo genera.
+    
+    Input:
+        -prefix: String. Ruta base del modelo (sin extensión).
+        
+    Output:
+        -Shared_Vocabulary_Index.
+'''
+def load_vocabulary_index(prefix):
+    index_file=prefix+VOCABULARY_INDEX_EXTENSION
+    vocabulary_file=prefix+NATIVE_VOCABULARY_EXTENSION
+    
+    if not os.path.exists(index_file) or os.path.getmtime(index_file) < os.path.getmtime(vocabulary_file):
+        with open(vocabulary_file, 'r', encoding='utf-8') as file_pointer:
+            build_vocabulary_index(index_file, file_pointer.read().split('\n')[:-1])
+            
+    return Shared_Vocabulary_Index(index_file)